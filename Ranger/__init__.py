@@ -3,6 +3,12 @@ __license__ = 'BSD'
 
 # Make imports
 from Ranger.src.Range.Range import Range
+from Ranger.src.Range.RangeFactory import RangeFactory
+from Ranger.src.Range.InternPool import InternPool
 from Ranger.src.Collections.RangeSet import RangeSet
 from Ranger.src.Collections.RangeMap import RangeMap
 from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
+from Ranger.src.Collections.IntervalTree import IntervalTree
+from Ranger.src.Collections.NCList import NCList
+from Ranger.src.Collections.CoverageMap import CoverageMap
+from Ranger.src.Collections.RangeArray import RangeArray
@@ -0,0 +1,431 @@
+from bisect import bisect_left as _bisectLeft, bisect_right as _bisectRight
+from itertools import islice
+
+class ChunkedList(object):
+    """ Class used to represent a list as a sequence of bounded-size chunks.
+    A positional index (a Fenwick tree over the chunk lengths) is kept
+    alongside the chunks, so locating, inserting and removing an element at
+    an arbitrary position costs O(log n) plus the size of one chunk, rather
+    than the O(n) element shift of a plain list
+    """
+    def __init__(self, iterable = None, load = 512):
+        """ Instantiates a ChunkedList
+
+        Parameters
+        ----------
+        iterable : Iterable, optional
+            Elements to start off the list with
+        load : int
+            Target number of elements per chunk. Chunks are split once
+            they grow to twice this size and merged with a neighbour once
+            they fall below half of it
+
+        Raises
+        ------
+        ValueError
+            If the load is less than 4
+        """
+        if load < 4:
+            raise ValueError("Chunk load must be at least 4")
+        self._load = load
+        self._chunks = []
+        self._len = 0
+        self._tree = [0]
+        self._treeTop = 0
+        if iterable is not None:
+            self.extend(iterable)
+    def __len__(self):
+        return self._len
+    def __iter__(self):
+        for chunk in self._chunks:
+            for item in chunk:
+                yield item
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            for item in reversed(chunk):
+                yield item
+    def __contains__(self, val):
+        for chunk in self._chunks:
+            if val in chunk:
+                return True
+        return False
+    def __eq__(self, other):
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return False
+        for v1, v2 in zip(self, other):
+            if v1 != v2:
+                return False
+        return True
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __repr__(self):
+        return "ChunkedList(%s)" % repr(list(self))
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return list(self._islice(start, stop))
+        chunkInd, pos = self._locate(index)
+        return self._chunks[chunkInd][pos]
+    def __setitem__(self, index, val):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                raise ValueError("Extended slice assignment not supported")
+            vals = list(val)
+            if stop < start:
+                stop = start
+            # Overwrite in place where possible, then shrink or grow
+            common = min(stop-start, len(vals))
+            for i in range(common):
+                chunkInd, pos = self._locate(start+i)
+                self._chunks[chunkInd][pos] = vals[i]
+            if stop-start > common:
+                self._delete(start+common, stop)
+            elif len(vals) > common:
+                self._insertMany(start+common, vals[common:])
+        else:
+            chunkInd, pos = self._locate(index)
+            self._chunks[chunkInd][pos] = val
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                for i in sorted(range(start, stop, step), reverse = True):
+                    del self[i]
+                return
+            if stop > start:
+                self._delete(start, stop)
+        else:
+            self.pop(index)
+    def append(self, val):
+        """ Adds a value to the end of the list
+
+        Parameters
+        ----------
+        val : object
+            The value to append
+        """
+        if len(self._chunks) == 0:
+            self._insertMany(0, [val])
+            return
+        self._chunks[-1].append(val)
+        self._len += 1
+        self._treeAdd(len(self._chunks)-1, 1)
+        if len(self._chunks[-1]) > 2*self._load:
+            self._split(len(self._chunks)-1)
+    def extend(self, iterable):
+        """ Adds all values from an iterable to the end of the list
+
+        Parameters
+        ----------
+        iterable : Iterable
+            The values to append
+        """
+        self._insertMany(self._len, list(iterable))
+    def insert(self, index, val):
+        """ Inserts a value before the given position
+
+        Parameters
+        ----------
+        index : int
+            Position to insert at. Follows the semantics of list.insert
+        val : object
+            The value to insert
+        """
+        if index < 0:
+            index = max(index+self._len, 0)
+        if index >= self._len:
+            self.append(val)
+            return
+        chunkInd, pos = self._locate(index)
+        self._chunks[chunkInd].insert(pos, val)
+        self._len += 1
+        self._treeAdd(chunkInd, 1)
+        if len(self._chunks[chunkInd]) > 2*self._load:
+            self._split(chunkInd)
+    def pop(self, index = -1):
+        """ Removes and returns the value at a given position
+
+        Parameters
+        ----------
+        index : int
+            Position of the value to remove. Defaults to the last value
+
+        Raises
+        ------
+        IndexError
+            If the list is empty or the index is out of range
+
+        Returns
+        -------
+        The removed value
+        """
+        chunkInd, pos = self._locate(index)
+        val = self._chunks[chunkInd].pop(pos)
+        self._len -= 1
+        self._treeAdd(chunkInd, -1)
+        if self._fix(chunkInd):
+            self._rebuildIndex()
+        return val
+    def bisect_left(self, val, lo = 0, hi = None):
+        """ Finds where a value would be inserted into the (sorted) list
+        to keep it sorted, before any equal values, as bisect.bisect_left
+        does. The last values of the chunks are searched first and then
+        the one chunk that can hold the value, so the search costs
+        O(log n) rather than an index descent for every probe
+
+        Parameters
+        ----------
+        val : object
+            The value to locate
+        lo, hi : int, optional
+            Bounds of the part of the list to search
+
+        Returns
+        -------
+        The insertion position
+        """
+        return self._bisect(val, lo, hi, _bisectLeft)
+    def bisect_right(self, val, lo = 0, hi = None):
+        """ Finds where a value would be inserted into the (sorted) list
+        to keep it sorted, after any equal values, as bisect.bisect_right
+        does (see bisect_left)
+
+        Parameters
+        ----------
+        val : object
+            The value to locate
+        lo, hi : int, optional
+            Bounds of the part of the list to search
+
+        Returns
+        -------
+        The insertion position
+        """
+        return self._bisect(val, lo, hi, _bisectRight)
+    #####################
+    # Chunk maintenance #
+    #####################
+    def _bisect(self, val, lo, hi, search):
+        chunks = self._chunks
+        # First chunk whose last value is above val (or not below it, for
+        # bisect_left); the insertion point falls within that chunk
+        first = 0
+        last = len(chunks)
+        if search is _bisectLeft:
+            while first < last:
+                mid = (first+last)//2
+                if chunks[mid][-1] < val:
+                    first = mid+1
+                else:
+                    last = mid
+        else:
+            while first < last:
+                mid = (first+last)//2
+                if val < chunks[mid][-1]:
+                    last = mid
+                else:
+                    first = mid+1
+        if first == len(chunks):
+            pos = self._len
+        else:
+            pos = self._prefix(first)+search(chunks[first], val)
+        if hi is None:
+            hi = self._len
+        # The bounds only clip the position within a sorted list
+        return min(max(pos, lo), hi)
+    def _prefix(self, chunkInd):
+        """ Returns the number of elements in the chunks before a chunk """
+        tree = self._tree
+        total = 0
+        while chunkInd > 0:
+            total += tree[chunkInd]
+            chunkInd -= chunkInd & -chunkInd
+        return total
+    def _islice(self, start, stop):
+        if start >= stop:
+            return iter(())
+        chunkInd, pos = self._locate(start)
+        def gen(chunkInd, pos, count):
+            while count > 0:
+                chunk = self._chunks[chunkInd]
+                for item in islice(chunk, pos, min(len(chunk), pos+count)):
+                    yield item
+                count -= len(chunk)-pos
+                chunkInd += 1
+                pos = 0
+        return gen(chunkInd, pos, stop-start)
+    def _locate(self, index):
+        """ Returns the (chunk index, position within chunk) of a list index """
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("ChunkedList index out of range")
+        # Descend the Fenwick tree to find the chunk holding the index
+        tree = self._tree
+        chunkInd = 0
+        step = self._treeTop
+        while step > 0:
+            nextInd = chunkInd+step
+            if nextInd < len(tree) and tree[nextInd] <= index:
+                chunkInd = nextInd
+                index -= tree[nextInd]
+            step //= 2
+        return chunkInd, index
+    def _rebuildIndex(self):
+        tree = [0]+[len(chunk) for chunk in self._chunks]
+        for i in range(1, len(tree)):
+            parent = i+(i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        # Highest power of two within the tree, where descents start
+        self._treeTop = 1
+        while self._treeTop*2 < len(tree):
+            self._treeTop *= 2
+    def _treeAdd(self, chunkInd, delta):
+        tree = self._tree
+        i = chunkInd+1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+    def _chunked(self, vals):
+        """ Cuts values into chunks of (near) equal size, none above the
+        load unless there is only one, so no tiny chunk is left over """
+        count = max((len(vals)+self._load-1)//self._load, 1)
+        size, extra = divmod(len(vals), count)
+        chunks = []
+        start = 0
+        for i in range(count):
+            stop = start+size+(1 if i < extra else 0)
+            chunks.append(vals[start:stop])
+            start = stop
+        return chunks
+    def _split(self, chunkInd):
+        self._chunks[chunkInd:chunkInd+1] = self._chunked(self._chunks[chunkInd])
+        self._rebuildIndex()
+    def _fix(self, chunkInd):
+        """ Restores the size bounds of a chunk after it has shrunk. Returns
+        True if the chunk layout changed """
+        chunks = self._chunks
+        if chunkInd >= len(chunks):
+            return False
+        elif len(chunks[chunkInd]) == 0:
+            del chunks[chunkInd]
+            return True
+        elif len(chunks[chunkInd]) >= self._load//2 or len(chunks) == 1:
+            return False
+        # Fold into the previous chunk (or the next one into the first)
+        mergeInd = max(chunkInd, 1)
+        chunks[mergeInd-1].extend(chunks[mergeInd])
+        del chunks[mergeInd]
+        if len(chunks[mergeInd-1]) > 2*self._load:
+            chunks[mergeInd-1:mergeInd] = self._chunked(chunks[mergeInd-1])
+        return True
+    def _insertMany(self, index, vals):
+        if len(vals) == 0:
+            return
+        if index < 0:
+            index = max(index+self._len, 0)
+        chunks = self._chunks
+        if len(chunks) == 0:
+            chunks.extend(self._chunked(vals))
+            self._len += len(vals)
+            self._rebuildIndex()
+            return
+        if index >= self._len:
+            chunkInd = len(chunks)-1
+            pos = len(chunks[chunkInd])
+        else:
+            chunkInd, pos = self._locate(index)
+        chunk = chunks[chunkInd]
+        chunk[pos:pos] = vals
+        self._len += len(vals)
+        if len(chunk) > 2*self._load:
+            self._split(chunkInd)
+        else:
+            # The layout is unchanged, so only the chunk's count moves
+            self._treeAdd(chunkInd, len(vals))
+    def _delete(self, start, stop):
+        startChunk, startPos = self._locate(start)
+        stopChunk, stopPos = self._locate(stop-1)
+        chunks = self._chunks
+        self._len -= stop-start
+        if startChunk == stopChunk:
+            del chunks[startChunk][startPos:stopPos+1]
+            self._treeAdd(startChunk, startPos-stopPos-1)
+            if self._fix(startChunk):
+                self._rebuildIndex()
+            return
+        startCount = len(chunks[startChunk])-startPos
+        del chunks[startChunk][startPos:]
+        del chunks[stopChunk][:stopPos+1]
+        if stopChunk > startChunk+1:
+            del chunks[startChunk+1:stopChunk]
+            changed = True
+        else:
+            # Neighbouring chunks, so only their counts move
+            self._treeAdd(startChunk, -startCount)
+            self._treeAdd(stopChunk, -(stopPos+1))
+            changed = False
+        # Tidy up the (at most two) chunks at the edges of the deletion
+        changed = self._fix(startChunk+1) or changed
+        changed = self._fix(startChunk) or changed
+        if changed:
+            self._rebuildIndex()
+
+def bisect_left(seq, val, lo = 0, hi = None):
+    """ bisect.bisect_left for a sorted sequence, searching a ChunkedList
+    through its own O(log n) search rather than probing its elements one
+    by one """
+    if isinstance(seq, ChunkedList):
+        return seq.bisect_left(val, lo, hi)
+    return _bisectLeft(seq, val, lo, len(seq) if hi is None else hi)
+
+def bisect_right(seq, val, lo = 0, hi = None):
+    """ bisect.bisect_right for a sorted sequence, searching a ChunkedList
+    through its own O(log n) search (see bisect_left) """
+    if isinstance(seq, ChunkedList):
+        return seq.bisect_right(val, lo, hi)
+    return _bisectRight(seq, val, lo, len(seq) if hi is None else hi)
+
+# Backing stores that the range collections can be built on
+BACKENDS = {"list" : list,
+            "chunked" : ChunkedList,
+            # Cuts are held in CutArrays (see CutArray.makeCutColumns),
+            # everything else in plain lists
+            "compact" : list}
+
+def makeList(backend, iterable = None):
+    """ Creates an empty (or pre-filled) list for a collection backend
+
+    Parameters
+    ----------
+    backend : string
+        Name of the backing store, one of "list" (plain Python lists, the
+        default), "chunked" (ChunkedList, O(log n) positional inserts
+        and removals) or "compact" (plain lists for everything but the
+        cuts)
+    iterable : Iterable, optional
+        Elements to start off the list with
+
+    Raises
+    ------
+    ValueError
+        If the backend is not known
+
+    Returns
+    -------
+    The new list
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend: %s" % str(backend))
+    if iterable is None:
+        return BACKENDS[backend]()
+    else:
+        return BACKENDS[backend](iterable)
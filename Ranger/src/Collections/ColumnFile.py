@@ -0,0 +1,279 @@
+""" Binary, columnar file format for collections of disjoint ranges over an
+integer or float domain. A file holds, after a fixed header:
+
+- the points of the lower and upper cuts, as 8 byte floats or integers
+- the side codes of the lower and upper cuts (see CutArray), one byte each
+- for a RangeMap, the position of each range's item in the value table
+- for a RangeBucketMap, a CSR index of the items in each range's bucket:
+  the offset of every bucket's entries, then the entries, each the
+  position of an item in the value table
+- for an NCList, the position of each range's value in the value table,
+  then the start and the end of each range's sublist (see NCList)
+- the value table, a pickled list of the distinct items. Reading a file
+  unpickles it, so files must come from a trusted source
+
+Every column starts on an 8 byte boundary and is stored in native byte
+order, so that a loaded collection can read straight from a memory mapped
+file without copying or decoding it
+"""
+import mmap
+import struct
+import sys
+from array import array
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from Ranger.src.Collections.CutArray import CutArray, _INT_CODE
+
+MAGIC = b"RNGRCOL\x01"
+# Magic, kind, point type, byte order, number of ranges, number of bucket
+# entries (or length of the top level of an NCList), offset and length of
+# the value table
+_HEADER = struct.Struct("<8sBBBxqqqq")
+_HEADER_SIZE = 48
+
+KINDS = ("set", "map", "buckets", "nclist")
+_BYTE_ORDERS = ("little", "big")
+# Point types, with 0 for an empty collection of unknown type
+_POINT_TYPES = (None, float, int)
+
+def _align(offset):
+    return (offset+7)//8*8
+
+def _intArray(vals = ()):
+    """ Returns an array of 8 byte integers """
+    ints = array(_INT_CODE, vals)
+    if ints.itemsize != 8:
+        raise ValueError("No 8 byte integer array on this platform")
+    return ints
+
+def _toBytes(arr):
+    try:
+        return arr.tobytes()
+    except AttributeError:
+        return arr.tostring()
+
+def _fromBytes(typecode, data):
+    arr = array(typecode)
+    try:
+        arr.frombytes(data)
+    except AttributeError:
+        arr.fromstring(data)
+    return arr
+
+class MappedItems(object):
+    """ Base class of the read-only item columns of a loaded collection.
+    Collections copy them into a list before they change them
+    """
+    def __len__(self):
+        return self._len
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("item index out of range")
+        return self._item(index)
+
+class MappedValues(MappedItems):
+    """ Class used to represent the items of a loaded RangeMap: a value
+    table and the position of each range's item in it
+    """
+    def __init__(self, table, positions):
+        self.table = table
+        self.positions = positions
+        self._len = len(positions)
+    def _item(self, index):
+        return self.table[self.positions[index]]
+
+class MappedBuckets(MappedItems):
+    """ Class used to represent the items of a loaded RangeBucketMap: a
+    value table and a CSR index into it, where the bucket of range i is
+    made of the entries from offsets[i] to offsets[i+1]. Each access
+    builds the bucket as a frozenset, as it cannot be changed in place;
+    a RangeBucketMap turns them into sets once, when it is first changed
+    """
+    def __init__(self, table, offsets, entries):
+        self.table = table
+        self.offsets = offsets
+        self.entries = entries
+        self._len = len(offsets)-1
+    def _item(self, index):
+        table = self.table
+        entries = self.entries
+        return frozenset(table[entries[i]] for i in \
+                   range(self.offsets[index], self.offsets[index+1]))
+
+def _valueTable():
+    """ Returns the list of distinct values, and a function giving the
+    position of a value in it """
+    table = []
+    # Keyed by type as well, so that equal values of different types
+    # (such as 1, 1.0 and True) keep their own entries
+    positions = {}
+    def position(val):
+        key = (type(val), val)
+        try:
+            pos = positions.get(key)
+        except TypeError:
+            # Unhashable, so it gets its own entry
+            table.append(val)
+            return len(table)-1
+        if pos is None:
+            pos = positions[key] = len(table)
+            table.append(val)
+        return pos
+    return table, position
+
+def writeColumns(path, kind, lowerCuts, upperCuts, items = None,
+                 sublists = None):
+    """ Writes the columns of a collection of ranges to a file. The
+    ranges are disjoint, except in an NCList
+
+    Parameters
+    ----------
+    path : string
+        The file to write
+    kind : string
+        "set", "map", "buckets" or "nclist"
+    lowerCuts, upperCuts : Sequences of Cut objects
+        The lower and upper cuts of the ranges, in order
+    items : Sequence, optional
+        For a map or an NCList, the item of each range, and for buckets,
+        the set of items of each range
+    sublists : tuple, optional
+        For an NCList, the (start, end, top level length) of its sublists
+
+    Raises
+    ------
+    ValueError
+        If the domain is not an integer or float domain
+    """
+    if not isinstance(lowerCuts, CutArray):
+        lowerCuts = CutArray(lowerCuts)
+        upperCuts = CutArray(upperCuts)
+    nRanges = len(lowerCuts)
+    if lowerCuts.theType is None:
+        pointType = 0
+    else:
+        pointType = 1 if lowerCuts.typecode == 'd' else 2
+        if array(lowerCuts.typecode).itemsize != 8:
+            raise ValueError("No 8 byte integer array on this platform")
+    columns = [_toBytes(lowerCuts.points), _toBytes(upperCuts.points),
+               _toBytes(lowerCuts.sides), _toBytes(upperCuts.sides)]
+    nEntries = 0
+    table = []
+    if kind in ("map", "nclist"):
+        table, position = _valueTable()
+        columns.append(_toBytes(_intArray(position(val) for val in items)))
+    if kind == "nclist":
+        subStart, subEnd, nEntries = sublists
+        columns.append(_toBytes(_intArray(subStart)))
+        columns.append(_toBytes(_intArray(subEnd)))
+    elif kind == "buckets":
+        table, position = _valueTable()
+        offsets = _intArray([0])
+        entries = _intArray()
+        for bucket in items:
+            entries.extend(position(val) for val in bucket)
+            offsets.append(len(entries))
+        nEntries = len(entries)
+        columns.append(_toBytes(offsets))
+        columns.append(_toBytes(entries))
+    tableBytes = pickle.dumps(table, 2)
+    with open(path, "wb") as outFile:
+        outFile.write(b"\0"*_HEADER_SIZE)
+        offset = _HEADER_SIZE
+        for column in columns:
+            outFile.write(column)
+            offset += len(column)
+            outFile.write(b"\0"*(_align(offset)-offset))
+            offset = _align(offset)
+        outFile.write(tableBytes)
+        outFile.seek(0)
+        outFile.write(_HEADER.pack(MAGIC, KINDS.index(kind), pointType,
+                                   _BYTE_ORDERS.index(sys.byteorder),
+                                   nRanges, nEntries, offset, len(tableBytes)))
+
+def readColumns(path, useMmap = True):
+    """ Reads the columns of a collection of ranges from a file.
+    If memory mapped, the columns are read from the mapped pages as they
+    are used rather than copied in, so loading does not depend on the
+    number of ranges and processes loading the same file share its pages.
+    Otherwise, and on Pythons without memoryview.cast, they are copied
+    into arrays
+
+    Parameters
+    ----------
+    path : string
+        The file to read
+    useMmap : boolean
+        Whether to memory map the file
+
+    Raises
+    ------
+    ValueError
+        If the file is not a range column file, or was written on a
+        platform of the other byte order
+
+    Returns
+    -------
+    Tuple of (kind, lower cuts, upper cuts, items, sublists), where the
+    cuts are CutArrays, items is None for a set and sublists is the
+    (start, end, top level length) of the sublists of an NCList, or None
+    """
+    with open(path, "rb") as inFile:
+        if useMmap:
+            data = mmap.mmap(inFile.fileno(), 0, access = mmap.ACCESS_READ)
+        else:
+            data = inFile.read()
+    if len(data) < _HEADER_SIZE:
+        raise ValueError("Not a range column file")
+    (magic, kind, pointType, byteOrder, nRanges, nEntries, tableOffset,
+     tableLength) = _HEADER.unpack(data[:_HEADER.size])
+    if magic != MAGIC:
+        raise ValueError("Not a range column file")
+    elif _BYTE_ORDERS[byteOrder] != sys.byteorder:
+        raise ValueError("File written with %s endian byte order" % \
+                         _BYTE_ORDERS[byteOrder])
+    kind = KINDS[kind]
+    theType = _POINT_TYPES[pointType]
+    typecode = _INT_CODE if theType is int else 'd'
+    if useMmap and hasattr(memoryview, "cast"):
+        view = memoryview(data)
+        def column(typecode, offset, length):
+            return view[offset:offset+length*array(typecode).itemsize].cast(typecode)
+    else:
+        def column(typecode, offset, length):
+            return _fromBytes(typecode,
+                              data[offset:offset+length*array(typecode).itemsize])
+    offset = _HEADER_SIZE
+    columns = []
+    for columnType, length in ((typecode, nRanges), (typecode, nRanges),
+                               ('b', nRanges), ('b', nRanges)):
+        columns.append(column(columnType, offset, length))
+        offset = _align(offset+length*array(columnType).itemsize)
+    lowerCuts = CutArray.fromBuffers(columns[0], columns[2], theType)
+    upperCuts = CutArray.fromBuffers(columns[1], columns[3], theType)
+    items = None
+    sublists = None
+    if kind != "set":
+        table = pickle.loads(data[tableOffset:tableOffset+tableLength])
+        if kind in ("map", "nclist"):
+            items = MappedValues(table, column(_INT_CODE, offset, nRanges))
+            offset = _align(offset+nRanges*8)
+        if kind == "nclist":
+            sublists = (column(_INT_CODE, offset, nRanges),
+                        column(_INT_CODE, _align(offset+nRanges*8), nRanges),
+                        nEntries)
+        elif kind == "buckets":
+            offsets = column(_INT_CODE, offset, nRanges+1)
+            offset = _align(offset+(nRanges+1)*8)
+            items = MappedBuckets(table, offsets,
+                                  column(_INT_CODE, offset, nEntries))
+    return kind, lowerCuts, upperCuts, items, sublists
@@ -0,0 +1,325 @@
+from array import array
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.ChunkedList import makeList, bisect_left, \
+     bisect_right
+from Ranger.src.Collections.CutArray import CutArray, KeyView
+from Ranger.src.Collections.RangeSet import RangeSet
+
+class CoverageMap(object):
+    """ Class used to represent how many of a collection of possibly
+    overlapping ranges cover each point. Only the depth is kept, not which
+    ranges make it up, so the map stays small however many ranges are
+    added.
+
+    The map is held as a sorted column of breakpoint cuts and a parallel
+    column of integer depths, where each depth holds from its cut up to
+    the next one. Neighbouring segments always differ in depth, and there is
+    no coverage below the first cut or above the last one
+    """
+    def __init__(self, ranges = None, backend = "list", trusted = False):
+        """ Instantiates a CoverageMap
+
+        Parameters
+        ----------
+        ranges : Iterable of Range objects, optional
+            Ranges to start off the CoverageMap with
+        backend : string
+            Backing store for the breakpoint cuts and depths, either
+            "list", "chunked" or "compact" (see RangeMap). The compact
+            backend holds the depths in an integer array
+        trusted : boolean
+            If True, ranges added or removed are trusted to be of a type
+            compatible with the map, and are not checked
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a Range
+        ValueError
+            If the backend is not known, or the ranges are not of
+            compatible types
+        """
+        self.backend = backend
+        self.trusted = trusted
+        # Holds the breakpoint cuts and their sort keys
+        if backend == "compact":
+            self.cuts = CutArray()
+            self.keys = KeyView(self.cuts)
+        else:
+            self.cuts = makeList(backend)
+            self.keys = makeList(backend)
+        # Holds the depth from each breakpoint up to the next, in the same
+        # kind of container as the cuts so that splices cost the same
+        self.depths = array('l') if backend == "compact" else makeList(backend)
+        if ranges is not None:
+            self._build(ranges)
+    def __iter__(self):
+        return self.iteritems()
+    def __eq__(self, other):
+        if not isinstance(other, CoverageMap): return False
+        elif len(self.depths) != len(other.depths): return False
+        return list(self.keys) == list(other.keys) and \
+            list(self.depths) == list(other.depths)
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __len__(self):
+        return sum(1 for depth in self.depths if depth > 0)
+    def __repr__(self):
+        pairs = ["%s : %d" % (k,v) for k,v in self.iteritems()]
+        if len(pairs) < 5:
+            return "CoverageMap(%s)" % ", ".join(pairs)
+        else:
+            return "CoverageMap(%s, ..., %s)" % (", ".join(pairs[:2]),
+                                                 ", ".join(pairs[-2:]))
+    def add(self, aRange):
+        """ Adds one layer of coverage over a range
+
+        Parameters
+        ----------
+        aRange : Range object
+            The range to cover
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a Range
+        ValueError
+            If the range type is not compatible with the map
+        """
+        self._shift(aRange, 1)
+    def covered_length(self, min_depth = 1, distFunc = lambda x1, x2: abs(x1-x2)):
+        """ Returns the total length covered at least min_depth times
+
+        Parameters
+        ----------
+        min_depth : int
+            Minimum depth of coverage counted
+        distFunc : function
+            Function taking the two endpoints of a segment and returning
+            its length
+
+        Raises
+        ------
+        ValueError
+            If the covered part of the map is unbounded
+
+        Returns
+        -------
+        The sum of the lengths of the segments covered at least min_depth
+        times, or 0 if there are none
+        """
+        total = 0
+        cuts = self.cuts
+        for ind, depth in enumerate(self.depths):
+            if depth >= min_depth:
+                lowerCut = cuts[ind]
+                upperCut = cuts[ind+1]
+                if lowerCut.belowAll or upperCut.aboveAll:
+                    raise ValueError("Coverage is unbounded")
+                total += distFunc(lowerCut.point, upperCut.point)
+        return total
+    def depth_at(self, val):
+        """ Returns how many ranges cover a single value
+
+        Parameters
+        ----------
+        val : comparable
+            The value to look up
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        The number of ranges covering the value
+        """
+        if len(self.depths) == 0:
+            return 0
+        self.cuts[0]._validate_query_pt(val)
+        ind = bisect_right(self.keys, (1, val, 0))-1
+        return self.depths[ind] if ind >= 0 else 0
+    def iteritems(self):
+        """ Iterates over the covered segments and their depths
+
+        Returns
+        -------
+        Generator of (Range, depth) for each segment covered by at least
+        one range, ordered by start point
+        """
+        cuts = self.cuts
+        for ind, depth in enumerate(self.depths):
+            if depth > 0:
+                yield Range(cuts[ind], cuts[ind+1]), depth
+    def remove(self, aRange):
+        """ Takes away one layer of coverage from a range that was
+        previously added
+
+        Parameters
+        ----------
+        aRange : Range object
+            The range to uncover
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a Range
+        KeyError
+            If part of the range is not covered
+        ValueError
+            If the range type is not compatible with the map
+        """
+        self._shift(aRange, -1)
+    def segments(self, min_depth = 1, backend = "list"):
+        """ Returns the part of the map covered at least min_depth times
+
+        Parameters
+        ----------
+        min_depth : int
+            Minimum depth of coverage kept
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Returns
+        -------
+        RangeSet of the points covered by at least min_depth ranges
+        """
+        cuts = self.cuts
+        ranges = []
+        startInd = None
+        for ind, depth in enumerate(self.depths):
+            if depth >= min_depth:
+                if startInd is None:
+                    startInd = ind
+            elif startInd is not None:
+                ranges.append(Range(cuts[startInd], cuts[ind]))
+                startInd = None
+        newSet = RangeSet(backend = backend)
+        newSet._splice(0, 0, ranges)
+        return newSet
+    def _checkRange(self, aRange):
+        """ Checks that a range can go in the map """
+        if not isinstance(aRange, Range):
+            raise TypeError("aRange is not a Range")
+        if len(self.depths) > 0 and not self.trusted:
+            theType = self.cuts[0].theType
+            rangeType = aRange.lowerCut.theType
+            if not (issubclass(rangeType, theType) or issubclass(theType, rangeType)):
+                raise ValueError("Range not compatible with previously added ranges")
+    def _shift(self, aRange, change):
+        """ Adds change to the depth over a range. The breakpoints inside
+        the range are rebuilt in one pass and spliced back, dropping any
+        that no longer separate different depths """
+        self._checkRange(aRange)
+        lowerKey = aRange.lowerCut.key
+        upperKey = aRange.upperCut.key
+        if lowerKey == upperKey:
+            # Skip if this is an empty range
+            return
+        keys = self.keys
+        depths = self.depths
+        lo = bisect_left(keys, lowerKey)
+        hi = bisect_right(keys, upperKey)
+        # Depth just below the range, and where the range's cuts fall in
+        # the existing segments
+        prevDepth = depths[lo-1] if lo > 0 else 0
+        newCuts = []
+        newDepths = []
+        if lo == hi or keys[lo] != lowerKey:
+            newCuts.append(aRange.lowerCut)
+            newDepths.append(prevDepth+change)
+        outerDepth = prevDepth
+        for ind in range(lo, hi):
+            outerDepth = depths[ind]
+            newCuts.append(self.cuts[ind])
+            # The segment from the range's upper cut on is outside it
+            newDepths.append(outerDepth if keys[ind] == upperKey else \
+                             outerDepth+change)
+        if hi == lo or keys[hi-1] != upperKey:
+            newCuts.append(aRange.upperCut)
+            newDepths.append(outerDepth)
+        if min(newDepths) < 0:
+            raise KeyError(str(aRange))
+        # Drop breakpoints between segments of the same depth
+        keptCuts = []
+        keptDepths = []
+        for cut, depth in izip(newCuts, newDepths):
+            if depth != prevDepth:
+                keptCuts.append(cut)
+                keptDepths.append(depth)
+                prevDepth = depth
+        self._splice(lo, hi, keptCuts, keptDepths)
+    def _splice(self, lo, hi, cuts, depths):
+        """ Replaces the breakpoints at positions lo to hi, keeping the
+        cut, key and depth columns in step """
+        self.cuts[lo:hi] = cuts
+        if not isinstance(self.keys, KeyView):
+            self.keys[lo:hi] = [cut.key for cut in cuts]
+        if isinstance(self.depths, array):
+            depths = array('l', depths)
+        self.depths[lo:hi] = depths
+    def _build(self, ranges):
+        """ Loads ranges into an empty map with a single sweep over their
+        sorted +1/-1 cut events """
+        events = []
+        theType = None
+        for aRange in ranges:
+            if not isinstance(aRange, Range):
+                raise TypeError("aRange is not a Range")
+            elif aRange.lowerCut.key == aRange.upperCut.key:
+                # Skip if this is an empty range
+                continue
+            # Check for compatibility of types
+            if theType is None:
+                theType = aRange.lowerCut.theType
+            elif not (issubclass(aRange.lowerCut.theType, theType) or \
+                      issubclass(theType, aRange.lowerCut.theType)):
+                raise ValueError("Range not compatible with previously added ranges")
+            events.append((aRange.lowerCut.key, 1, aRange.lowerCut))
+            events.append((aRange.upperCut.key, -1, aRange.upperCut))
+        events.sort(key = lambda event: event[0])
+        cuts = []
+        depths = []
+        depth = 0
+        for ind, (key, change, cut) in enumerate(events):
+            depth += change
+            if ind+1 < len(events) and events[ind+1][0] == key:
+                # Wait until all the events at this cut are in
+                continue
+            if len(depths) == 0 or depths[-1] != depth:
+                cuts.append(cut)
+                depths.append(depth)
+        self._splice(0, 0, cuts, depths)
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def from_ranges(ranges, backend = "list"):
+        """ Bulk-loads a CoverageMap from an iterable of Ranges with a
+        single sweep over their cut events, giving the same map as adding
+        each range in turn
+
+        Parameters
+        ----------
+        ranges : Iterable of Range objects
+            Ranges to load into the map
+        backend : string
+            Backing store for the new map (see CoverageMap)
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a Range
+        ValueError
+            If the ranges are not of compatible types
+
+        Returns
+        -------
+        A CoverageMap of the ranges
+        """
+        return CoverageMap(ranges, backend)
@@ -0,0 +1,778 @@
+from array import array
+from numbers import Integral
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.ChunkedList import makeList, bisect_left, \
+     bisect_right
+
+# Typecode for integer points: 64 bit where the platform has it
+try:
+    array('q')
+    _INT_CODE = 'q'
+except ValueError:
+    _INT_CODE = 'l'
+
+# Side codes stored for each cut
+BELOW_ALL = -2
+BELOW = -1
+ABOVE = 1
+ABOVE_ALL = 2
+
+# A numpy batch of points this many times smaller than the collection it
+# is looked up in is searched point by point, instead of building the
+# numpy endpoint columns (see endpointColumns) for it
+SCALAR_BATCH = 64
+
+# Relations between two ranges, as given by overlapKind. The ones from
+# LEFT_OVERLAP on share at least one point
+DISJOINT = 0
+TOUCHING = 1
+LEFT_OVERLAP = 2
+RIGHT_OVERLAP = 3
+ENCLOSED = 4
+ENCLOSES = 5
+
+def _typecode(theType):
+    """ Returns the array typecode used to store points of a domain """
+    if issubclass(theType, float):
+        return 'd'
+    elif issubclass(theType, Integral):
+        return _INT_CODE
+    else:
+        raise ValueError("Compact storage requires an integer or float domain")
+
+class CutArray(object):
+    """ Class used to represent a sequence of Cuts over a numeric domain in
+    compact form. Each cut is stored as a (point, side) pair in two parallel
+    arrays, a float or integer array for the points and a byte array for the
+    side, instead of as a Cut object. Cut objects are only created when
+    elements are read back
+    """
+    def __init__(self, cuts = None, theType = None):
+        """ Instantiates a CutArray
+
+        Parameters
+        ----------
+        cuts : Iterable of Cut objects, optional
+            Cuts to start off the array with
+        theType : type, optional
+            Type of the domain. If None, it is taken from the first cut
+            stored
+
+        Raises
+        ------
+        ValueError
+            If the domain is not an integer or float domain
+        """
+        self.theType = None
+        # Placeholder until the type is known
+        self.typecode = 'd'
+        self.points = array('d')
+        self.sides = array('b')
+        if theType is not None:
+            self._setType(theType)
+        if cuts is not None:
+            self.extend(cuts)
+    def _setType(self, theType):
+        self.typecode = _typecode(theType)
+        self.points = array(self.typecode)
+        self.theType = theType
+        self._pointType = float if self.typecode == 'd' else Integral
+    def _own(self):
+        """ Copies the points and sides into arrays of this CutArray's own
+        if they are held in outside buffers (see fromBuffers), so that
+        they can be changed """
+        if not isinstance(self.sides, array):
+            self.points = array(self.typecode, self.points)
+            self.sides = array('b', self.sides)
+    def _encode(self, cuts):
+        """ Returns (points, sides) arrays for a sequence of Cuts """
+        if self.theType is None and len(cuts) > 0:
+            self._setType(cuts[0].theType)
+        points = array(self.typecode)
+        sides = array('b')
+        for cut in cuts:
+            if cut.belowAll:
+                points.append(0)
+                sides.append(BELOW_ALL)
+            elif cut.aboveAll:
+                points.append(0)
+                sides.append(ABOVE_ALL)
+            else:
+                if not isinstance(cut.point, self._pointType):
+                    raise ValueError("Cut not compatible with the array type")
+                points.append(cut.point)
+                sides.append(BELOW if cut.below else ABOVE)
+        return points, sides
+    def _decode(self, point, side):
+        if side == BELOW_ALL:
+            return Cut.belowAll(self.theType)
+        elif side == ABOVE_ALL:
+            return Cut.aboveAll(self.theType)
+        else:
+            return Cut(self.theType, point = self.theType(point),
+                       below = (side == BELOW))
+    def __len__(self):
+        return len(self.sides)
+    def __iter__(self):
+        for i in range(len(self.sides)):
+            yield self._decode(self.points[i], self.sides[i])
+    def __reversed__(self):
+        for i in range(len(self.sides)-1, -1, -1):
+            yield self._decode(self.points[i], self.sides[i])
+    def __eq__(self, other):
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return False
+        for c1, c2 in zip(self, other):
+            if c1 != c2:
+                return False
+        return True
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __repr__(self):
+        return "CutArray(%s)" % repr(list(self))
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(point, side) for point, side in \
+                    zip(self.points[index], self.sides[index])]
+        return self._decode(self.points[index], self.sides[index])
+    def __setitem__(self, index, val):
+        if isinstance(index, slice):
+            points, sides = self._encode(list(val))
+        else:
+            points, sides = self._encode([val])
+            if index < 0:
+                index += len(self)
+            if index < 0 or index >= len(self):
+                raise IndexError("CutArray index out of range")
+            index = slice(index, index+1)
+        self._own()
+        self.points[index] = points
+        self.sides[index] = sides
+    def __delitem__(self, index):
+        self._own()
+        del self.points[index]
+        del self.sides[index]
+    def keyAt(self, index):
+        """ Returns the sort key (see Cut) of the cut at a given position,
+        without creating the Cut
+
+        Parameters
+        ----------
+        index : int
+            Position of the cut
+
+        Raises
+        ------
+        IndexError
+            If the index is out of range
+
+        Returns
+        -------
+        The (rank, point, side) sort key
+        """
+        side = self.sides[index]
+        if side == BELOW_ALL:
+            return (0, None, 0)
+        elif side == ABOVE_ALL:
+            return (2, None, 0)
+        else:
+            return (1, self.points[index], side)
+    def append(self, cut):
+        """ Adds a Cut to the end of the array
+
+        Parameters
+        ----------
+        cut : Cut object
+            The cut to append
+        """
+        self[len(self):] = [cut]
+    def extend(self, cuts):
+        """ Adds Cuts to the end of the array
+
+        Parameters
+        ----------
+        cuts : Iterable of Cut objects
+            The cuts to append
+        """
+        self[len(self):] = cuts
+    def insert(self, index, cut):
+        """ Inserts a Cut before the given position
+
+        Parameters
+        ----------
+        index : int
+            Position to insert at. Follows the semantics of list.insert
+        cut : Cut object
+            The cut to insert
+        """
+        if index < 0:
+            index = max(index+len(self), 0)
+        self[index:index] = [cut]
+    def pop(self, index = -1):
+        """ Removes and returns the Cut at a given position
+
+        Parameters
+        ----------
+        index : int
+            Position of the cut to remove. Defaults to the last cut
+
+        Raises
+        ------
+        IndexError
+            If the array is empty or the index is out of range
+
+        Returns
+        -------
+        The removed Cut
+        """
+        cut = self[index]
+        del self[index]
+        return cut
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def fromBuffers(points, sides, theType):
+        """ Creates a CutArray over existing point and side buffers
+        without copying them, such as memoryviews of a mapped file. The
+        buffers are only read; they are copied the first time the
+        CutArray is changed
+
+        Parameters
+        ----------
+        points : Sequence of numbers
+            The points of the cuts, of the array typecode of the domain
+        sides : Sequence of ints
+            The side codes of the cuts
+        theType : type
+            Type of the domain
+
+        Raises
+        ------
+        ValueError
+            If the domain is not an integer or float domain
+
+        Returns
+        -------
+        A CutArray reading from the buffers
+        """
+        cuts = CutArray(theType = theType)
+        cuts.points = points
+        cuts.sides = sides
+        return cuts
+
+class RangeView(object):
+    """ Class used to represent a read-only sequence of Ranges whose cuts
+    are held in a pair of CutArrays. Range objects are created on access
+    """
+    def __init__(self, lowerCuts, upperCuts):
+        """ Instantiates a RangeView
+
+        Parameters
+        ----------
+        lowerCuts : CutArray
+            The lower cuts of the ranges
+        upperCuts : CutArray
+            The upper cuts of the ranges, parallel to lowerCuts
+        """
+        self.lowerCuts = lowerCuts
+        self.upperCuts = upperCuts
+    def __len__(self):
+        return len(self.lowerCuts)
+    def __iter__(self):
+        for lowerCut, upperCut in zip(self.lowerCuts, self.upperCuts):
+            yield Range(lowerCut, upperCut)
+    def __reversed__(self):
+        for lowerCut, upperCut in zip(reversed(self.lowerCuts),
+                                      reversed(self.upperCuts)):
+            yield Range(lowerCut, upperCut)
+    def __eq__(self, other):
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return False
+        for r1, r2 in zip(self, other):
+            if r1 != r2:
+                return False
+        return True
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __repr__(self):
+        return "RangeView(%s)" % repr(list(self))
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Range(lowerCut, upperCut) for lowerCut, upperCut in \
+                    zip(self.lowerCuts[index], self.upperCuts[index])]
+        return Range(self.lowerCuts[index], self.upperCuts[index])
+
+class KeyView(object):
+    """ Class used to represent a read-only sequence of the sort keys of
+    the cuts in a CutArray, so that it can be searched with bisect
+    """
+    def __init__(self, cuts):
+        """ Instantiates a KeyView
+
+        Parameters
+        ----------
+        cuts : CutArray
+            The cuts whose keys are viewed
+        """
+        self.cuts = cuts
+    def __len__(self):
+        return len(self.cuts)
+    def __iter__(self):
+        for i in range(len(self.cuts)):
+            yield self.cuts.keyAt(i)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.cuts.keyAt(i) for i in range(*index.indices(len(self)))]
+        return self.cuts.keyAt(index)
+
+def makeCutColumns(backend, lowerCuts = None, upperCuts = None):
+    """ Creates the lower cut, upper cut, lower key, upper key and range
+    columns of a collection
+
+    Parameters
+    ----------
+    backend : string
+        Name of the backing store (see ChunkedList.makeList). For
+        "compact", the cuts are held in CutArrays and the keys and ranges
+        are views over them
+    lowerCuts, upperCuts : CutArray objects, optional
+        For "compact", existing CutArrays to build the columns over
+
+    Raises
+    ------
+    ValueError
+        If the backend is not known
+
+    Returns
+    -------
+    Tuple of (lower cuts, upper cuts, lower keys, upper keys, ranges)
+    """
+    if backend == "compact":
+        if lowerCuts is None:
+            lowerCuts = CutArray()
+            upperCuts = CutArray()
+        return (lowerCuts, upperCuts, KeyView(lowerCuts), KeyView(upperCuts),
+                RangeView(lowerCuts, upperCuts))
+    return (makeList(backend), makeList(backend), makeList(backend),
+            makeList(backend), makeList(backend))
+
+def _endpointArrays(cuts, keys, dtype):
+    """ Returns numpy arrays of the points and side codes of a cut column """
+    if isinstance(cuts, CutArray):
+        return (numpy.frombuffer(cuts.points, dtype = cuts.typecode).copy(),
+                numpy.frombuffer(cuts.sides, dtype = numpy.int8).copy())
+    points = numpy.array([key[1] if key[0] == 1 else 0 for key in keys],
+                         dtype = dtype)
+    sides = numpy.array([key[2] if key[0] == 1 else \
+                         (BELOW_ALL if key[0] == 0 else ABOVE_ALL) for key in keys],
+                        dtype = numpy.int8)
+    return points, sides
+
+def endpointColumns(lowerCuts, upperCuts, lowerKeys, upperKeys):
+    """ Builds the numpy endpoint columns that searchPoints runs on from
+    the (non-empty) columns of a collection of disjoint ranges. These cost
+    a pass over the whole collection, so collections keep them until
+    their ranges next change
+
+    Parameters
+    ----------
+    lowerCuts, upperCuts : Sequences of Cut objects
+        The lower and upper cuts of the ranges, in order
+    lowerKeys, upperKeys : Sequences of sort keys
+        The sort keys of the cuts (see Cut)
+
+    Returns
+    -------
+    Tuple of numpy arrays (lower points, lower sides, upper points, upper
+    sides)
+    """
+    dtype = numpy.float64 if issubclass(lowerCuts[0].theType, float) \
+            else numpy.int64
+    lowerPts, lowerSides = _endpointArrays(lowerCuts, lowerKeys, dtype)
+    upperPts, upperSides = _endpointArrays(upperCuts, upperKeys, dtype)
+    # Only the first range can be unbounded below and the last unbounded
+    # above. Stand in cuts at the ends of the point type
+    if lowerSides[0] == BELOW_ALL:
+        lowerPts[0] = _lowest(lowerPts.dtype)
+        lowerSides[0] = BELOW
+    if upperSides[-1] == ABOVE_ALL:
+        upperPts[-1] = _highest(upperPts.dtype)
+        upperSides[-1] = ABOVE
+    return lowerPts, lowerSides, upperPts, upperSides
+
+def _lowest(dtype):
+    """ Returns the lowest value of a numpy dtype """
+    return -numpy.inf if dtype.kind == 'f' else numpy.iinfo(dtype).min
+
+def _highest(dtype):
+    """ Returns the highest value of a numpy dtype """
+    return numpy.inf if dtype.kind == 'f' else numpy.iinfo(dtype).max
+
+def checkPoints(theType, points):
+    """ Checks that the dtype of an array of points is compatible with a
+    domain type
+
+    Parameters
+    ----------
+    theType : type
+        The type of the ranges' points
+    points : numpy array
+        The points to look up
+
+    Raises
+    ------
+    ValueError
+        If the point type not compatible with the ranges
+    """
+    if points.dtype.kind == 'f':
+        compatible = issubclass(theType, float)
+    elif points.dtype.kind in 'iu':
+        compatible = issubclass(theType, Integral)
+    else:
+        compatible = False
+    if not compatible:
+        raise ValueError("Type is not compatible with cutpoint type")
+
+def searchPoints(columns, points):
+    """ Finds the ranges containing each of an array of points with
+    numpy.searchsorted
+
+    Parameters
+    ----------
+    columns : Tuple of numpy arrays
+        The endpoint columns of the ranges (see endpointColumns)
+    points : numpy array
+        The points to look up, of a dtype checked with checkPoints
+
+    Returns
+    -------
+    numpy array with, for each point, the index of the range containing
+    it, or -1 if there is none
+    """
+    lowerPts, lowerSides, upperPts, upperSides = columns
+    if len(points) == 0:
+        return numpy.zeros(0, dtype = numpy.intp)
+    # Last range whose lower point is <= the point. If its lower cut is
+    # above the point, the point can only be in the range before it
+    inds = numpy.searchsorted(lowerPts, points, side = 'right')-1
+    clipped = numpy.maximum(inds, 0)
+    inds -= (inds >= 0) & (lowerPts[clipped] == points) & \
+            (lowerSides[clipped] == ABOVE)
+    clipped = numpy.maximum(inds, 0)
+    inside = (inds >= 0) & ((points < upperPts[clipped]) | \
+                            ((points == upperPts[clipped]) & \
+                             (upperSides[clipped] == ABOVE)))
+    return numpy.where(inside, inds, -1)
+
+def gallopLeft(keys, key, start):
+    """ Finds bisect_left(keys, key, start) in sorted keys by probing
+    forward from start at steps of 1, 2, 4 and so on, then bisecting the
+    last step. A search moving d positions costs O(log d), so a run of
+    searches moving forward through n keys costs O(n) in all
+
+    Parameters
+    ----------
+    keys : Sequence
+        The sorted keys
+    key : object
+        The key to locate
+    start : int
+        Position to search from
+
+    Returns
+    -------
+    The insertion position of the key, at or after start
+    """
+    lo = bound = start
+    step = 1
+    while bound < len(keys) and keys[bound] < key:
+        lo = bound+1
+        bound = start+step
+        step *= 2
+    return bisect_left(keys, key, lo, min(bound, len(keys)))
+
+def gallopRight(keys, key, start):
+    """ Finds bisect_right(keys, key, start) in sorted keys by probing
+    forward from start (see gallopLeft)
+
+    Parameters
+    ----------
+    keys : Sequence
+        The sorted keys
+    key : object
+        The key to locate
+    start : int
+        Position to search from
+
+    Returns
+    -------
+    The insertion position of the key, at or after start
+    """
+    lo = bound = start
+    step = 1
+    while bound < len(keys) and not key < keys[bound]:
+        lo = bound+1
+        bound = start+step
+        step *= 2
+    return bisect_right(keys, key, lo, min(bound, len(keys)))
+
+def walkPoints(lowerCuts, lowerKeys, upperKeys, points):
+    """ Finds the ranges containing each of an iterable of single values,
+    given the (non-empty) columns of a collection of disjoint ranges. Each
+    search gallops forward from the position of the last one while the
+    values are in order (see gallopLeft), so m sorted values cost
+    O(n + m) over n ranges; out-of-order values are searched from the
+    start
+
+    Parameters
+    ----------
+    lowerCuts : Sequence of Cut objects
+        The lower cuts of the ranges, in order
+    lowerKeys, upperKeys : Sequences of sort keys
+        The sort keys of the lower and upper cuts (see Cut)
+    points : Iterable of single values
+        The values to look up
+
+    Raises
+    ------
+    ValueError
+        If a value type not compatible with the ranges
+
+    Returns
+    -------
+    Generator of the index of the range containing each value, or -1 if
+    there is none
+    """
+    theType = lowerCuts[0].theType
+    # Position of the range holding (or preceding) the last value
+    ind = 0
+    prevKey = None
+    for point in points:
+        if not isinstance(point, theType):
+            raise ValueError("Type is not compatible with cutpoint type")
+        valKey = (1, point, 0)
+        if prevKey is None or valKey < prevKey:
+            # Out of order, so search from the start
+            ind = bisect_left(lowerKeys, valKey)-1
+        elif ind < 0 or upperKeys[ind] < valKey:
+            # Moved past the last range, so search on from there
+            ind = gallopLeft(lowerKeys, valKey, max(ind,0))-1
+        prevKey = valKey
+        if ind >= 0 and upperKeys[ind] > valKey:
+            yield ind
+        else:
+            yield -1
+
+def overlapKind(lowerKey, upperKey, otherLowerKey, otherUpperKey):
+    """ Classifies how a range relates to another from the sort keys of
+    their cuts alone, without building a Range or raising
+
+    Parameters
+    ----------
+    lowerKey, upperKey : sort keys
+        The sort keys of the range's lower and upper cuts (see Cut)
+    otherLowerKey, otherUpperKey : sort keys
+        The sort keys of the other range's lower and upper cuts
+
+    Returns
+    -------
+    DISJOINT if the ranges are separated by a gap, TOUCHING if they are
+    connected but share no point (as do [1,2) and [2,3], or an empty range
+    and one it lies in), LEFT_OVERLAP if the other range covers just the
+    lower end of the range, RIGHT_OVERLAP if it covers just the upper end,
+    ENCLOSED if the range lies within the other range (including when they
+    are equal) and ENCLOSES if the other range lies within the range
+    """
+    if upperKey < otherLowerKey or otherUpperKey < lowerKey:
+        return DISJOINT
+    elif upperKey == otherLowerKey or otherUpperKey == lowerKey or \
+         lowerKey == upperKey or otherLowerKey == otherUpperKey:
+        return TOUCHING
+    elif otherLowerKey <= lowerKey and upperKey <= otherUpperKey:
+        return ENCLOSED
+    elif lowerKey <= otherLowerKey and otherUpperKey <= upperKey:
+        return ENCLOSES
+    elif otherLowerKey < lowerKey:
+        return LEFT_OVERLAP
+    else:
+        return RIGHT_OVERLAP
+
+def walkWindow(lowerCuts, upperCuts, lowerKeys, upperKeys, ranges,
+               start = None, end = None, reverse = False):
+    """ Walks the ranges of a collection of disjoint ranges that overlap
+    the window [start, end], clipping the ones at its edges. The first
+    range is found with a single bisect and the rest are produced one at
+    a time, so nothing outside the window is touched
+
+    Parameters
+    ----------
+    lowerCuts, upperCuts : Sequences of Cut objects
+        The lower and upper cuts of the ranges, in order
+    lowerKeys, upperKeys : Sequences of sort keys
+        The sort keys of the lower and upper cuts (see Cut)
+    ranges : Sequence of Range objects
+        The ranges themselves
+    start : comparable, optional
+        The start of the window, inclusive. Unbounded if None
+    end : comparable, optional
+        The end of the window, inclusive. Unbounded if None
+    reverse : boolean
+        If True, the ranges are produced from last to first
+
+    Raises
+    ------
+    ValueError
+        If start or end not compatible with the ranges
+
+    Returns
+    -------
+    Generator of (index, Range intersecting [start, end])
+    """
+    if len(lowerKeys) == 0:
+        return
+    theType = lowerCuts[0].theType
+    for point in (start, end):
+        if point is not None and not isinstance(point, theType):
+            raise ValueError("Type is not compatible with cutpoint type")
+    startCut = None if start is None else Cut.belowValue(start)
+    endCut = None if end is None else Cut.aboveValue(end)
+    if startCut is not None and endCut is not None and startCut.key > endCut.key:
+        return
+    lo = 0 if startCut is None else bisect_right(upperKeys, startCut.key)
+    hi = len(lowerKeys) if endCut is None else bisect_left(lowerKeys, endCut.key)
+    if reverse:
+        ind, stop, step = hi-1, lo-1, -1
+    else:
+        ind, stop, step = lo, hi, 1
+    while ind != stop:
+        clipLower = startCut is not None and lowerKeys[ind] < startCut.key
+        clipUpper = endCut is not None and upperKeys[ind] > endCut.key
+        if clipLower or clipUpper:
+            yield ind, Range(startCut if clipLower else lowerCuts[ind],
+                             endCut if clipUpper else upperCuts[ind])
+        else:
+            yield ind, ranges[ind]
+        ind += step
+
+def _gapPoint(cut, isLower):
+    """ Returns the point a range bounded by a cut reaches towards a gap:
+    the cut's point, or for an open bound in an integer domain, the
+    nearest integer inside it """
+    if issubclass(cut.theType, Integral):
+        if isLower and not cut.below:
+            return cut.point+1
+        elif not isLower and cut.below:
+            return cut.point-1
+    return cut.point
+
+def nearestRanges(lowerCuts, upperCuts, lowerKeys, upperKeys, query, k,
+                  distFunc, start = 0):
+    """ Finds the k ranges nearest a single value or Range, given the
+    (non-empty) columns of a collection of disjoint ranges. The ranges
+    overlapping the query are found with a bisect, and the search then
+    expands outward from them one range at a time, so it costs
+    O(log n + k). Distances to open bounds are measured to their point, or
+    in an integer domain to the nearest integer inside the bound
+
+    Parameters
+    ----------
+    lowerCuts, upperCuts : Sequences of Cut objects
+        The lower and upper cuts of the ranges, in order
+    lowerKeys, upperKeys : Sequences of sort keys
+        The sort keys of the lower and upper cuts (see Cut)
+    query : A single value or a Range object
+        What to measure distances from
+    k : int
+        Number of ranges to find
+    distFunc : callable
+        Function that calculates the distance between two points in the
+        domain of the ranges
+    start : int
+        Position to start the bisect from. Queries in sorted order can
+        pass the position returned for the previous one
+
+    Raises
+    ------
+    ValueError
+        If the query type not compatible with the ranges
+
+    Returns
+    -------
+    Tuple of the list of (index, distance) of the nearest ranges, from
+    nearest to furthest with ranges overlapping the query at distance 0,
+    and the position of the first range not below the query
+    """
+    theType = lowerCuts[0].theType
+    if isinstance(query, Range):
+        queryType = query.lowerCut.theType
+        if not (issubclass(queryType, theType) or issubclass(theType, queryType)):
+            raise ValueError("Range not compatible with previously added ranges")
+        lowerKey = query.lowerCut.key
+        upperKey = query.upperCut.key
+        # Points of the query facing ranges above and below it
+        upperPoint = None if query.upperCut.aboveAll else \
+                     _gapPoint(query.upperCut, False)
+        lowerPoint = None if query.lowerCut.belowAll else \
+                     _gapPoint(query.lowerCut, True)
+    else:
+        if not isinstance(query, theType):
+            raise ValueError("Type is not compatible with cutpoint type")
+        lowerKey = upperKey = (1, query, 0)
+        lowerPoint = upperPoint = query
+    # The ranges from lo to hi overlap the query; those before lo are
+    # below it and those from hi on are above it
+    lo = bisect_right(upperKeys, lowerKey, start)
+    hi = max(bisect_left(lowerKeys, upperKey, lo), lo)
+    found = [(ind, 0.) for ind in range(lo, min(hi, lo+k))]
+    below = lo-1
+    above = hi
+    while len(found) < k and (below >= 0 or above < len(lowerKeys)):
+        if below >= 0:
+            belowDist = distFunc(lowerPoint, _gapPoint(upperCuts[below], False))
+        if above < len(lowerKeys):
+            aboveDist = distFunc(_gapPoint(lowerCuts[above], True), upperPoint)
+        if above >= len(lowerKeys) or (below >= 0 and belowDist <= aboveDist):
+            found.append((below, belowDist))
+            below -= 1
+        else:
+            found.append((above, aboveDist))
+            above += 1
+    return found, lo
+
+def nearestRangesMany(lowerCuts, upperCuts, lowerKeys, upperKeys, queries, k,
+                      distFunc):
+    """ Batch version of nearestRanges. Each search resumes from the
+    position of the last one while the queries are in order of their
+    lower bound, so a sorted stream of queries walks forward over the
+    ranges; out-of-order queries are searched from the start
+
+    Returns
+    -------
+    Generator of the list of (index, distance) of the nearest ranges to
+    each query
+    """
+    start = 0
+    prevKey = None
+    for query in queries:
+        if isinstance(query, Range):
+            queryKey = query.lowerCut.key
+        else:
+            queryKey = (1, query, 0)
+        if prevKey is not None and queryKey < prevKey:
+            start = 0
+        prevKey = queryKey
+        found, start = nearestRanges(lowerCuts, upperCuts, lowerKeys,
+                                     upperKeys, query, k, distFunc, start)
+        yield found
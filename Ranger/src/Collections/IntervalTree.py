@@ -0,0 +1,429 @@
+from Ranger.src.Range.Range import Range
+
+class _IntervalNode(object):
+    """ Node of the interval tree, ordered by (lower cut, upper cut,
+    insertion number) and augmented with the smallest and largest lower
+    and upper cuts in its subtree """
+    __slots__ = ('range', 'value', 'lowerKey', 'upperKey', 'order',
+                 'left', 'right', 'height', 'minLower', 'maxLower',
+                 'minUpper', 'maxUpper')
+    def __init__(self, aRange, value, seq):
+        self.range = aRange
+        self.value = value
+        self.lowerKey = aRange.lowerCut.key
+        self.upperKey = aRange.upperCut.key
+        self.order = (self.lowerKey, self.upperKey, seq)
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.minLower = self.lowerKey
+        self.maxLower = self.lowerKey
+        self.minUpper = self.upperKey
+        self.maxUpper = self.upperKey
+
+# Marker for remove() being called without a value
+_ANY_VALUE = object()
+
+class IntervalTree(object):
+    """ Class used to represent a collection of possibly overlapping ranges
+    mapped to objects. Unlike the RangeMap, ranges are neither merged nor
+    fragmented: each range that is put in is stored as-is, and queries
+    return the original ranges. Ranges are kept in a balanced (AVL) tree
+    augmented with the bounds of the lower and upper cuts of each
+    subtree, so inserts and removals take O(log n), and overlap,
+    enclosing and enclosedBy queries only descend into subtrees that can
+    hold a match, taking O(log n + k)
+    """
+    def __init__(self, pairs = None):
+        """ Instantiates an IntervalTree
+
+        Parameters
+        ----------
+        pairs : Iterable of (Range, value) tuples, optional
+            Ranges and their values to start off the tree with
+        """
+        self._root = None
+        self._len = 0
+        # Insertion counter, used to order identical ranges
+        self._seq = 0
+        if pairs is not None:
+            for key, val in pairs:
+                self.put(key, val)
+    def __len__(self):
+        return self._len
+    def __iter__(self):
+        for node in self._iterNodes():
+            yield node.range
+    def __getitem__(self, key):
+        return self.get(key)
+    def __setitem__(self, key, value):
+        self.put(key, value)
+    def __delitem__(self, key):
+        self.remove(key)
+    def __repr__(self):
+        pairs = ["%s : %s" % (k,v) for k,v in self.iteritems()]
+        if len(pairs) < 5:
+            return "IntervalTree(%s)" % ", ".join(pairs)
+        else:
+            return "IntervalTree(%s, ..., %s)" % (", ".join(pairs[:2]),
+                                                  ", ".join(pairs[-2:]))
+    def iteritems(self):
+        """ Iterates over pairs of (Range, value)
+
+        Returns
+        -------
+        Generator of (Range, value), ordered by lower cut then upper cut,
+        with identical ranges in insertion order
+        """
+        for node in self._iterNodes():
+            yield node.range, node.value
+    def put(self, key, val):
+        """ Adds a Range and its value to the tree. Any existing ranges are
+        left untouched, even if they overlap with (or equal) the key
+
+        Parameters
+        ----------
+        key : Range object
+            A Range to serve as a key
+        val : value
+            Some value that the Range should map to
+
+        Raises
+        ------
+        TypeError
+            If the key is not a Range object
+        ValueError
+            If the key type not compatible with the ranges in the tree
+        """
+        if not isinstance(key, Range):
+            raise TypeError("key is not a Range")
+        elif key.isEmpty():
+            # Skip if this is an empty range
+            return
+        if self._root is not None:
+            theType = self._root.range.lowerCut.theType
+            if not (issubclass(key.lowerCut.theType, theType) or \
+                    issubclass(theType, key.lowerCut.theType)):
+                raise ValueError("Range not compatible with previously added ranges")
+        self._seq += 1
+        self._root = self._insert(self._root, _IntervalNode(key, val, self._seq))
+        self._len += 1
+    def remove(self, key, val = _ANY_VALUE):
+        """ Removes the ranges equal to a key from the tree. Without a
+        value, every range equal to the key is removed, whatever it maps
+        to (as does del tree[key]). Only exact matches are removed;
+        overlapping ranges are left untouched
+
+        Parameters
+        ----------
+        key : Range object
+            The Range to remove
+        val : value, optional
+            If given, only ranges equal to the key that map to this value
+            are removed
+
+        Raises
+        ------
+        TypeError
+            If the key is not a Range object
+        KeyError
+            If there is no matching range in the tree
+        """
+        if not isinstance(key, Range):
+            raise TypeError("key is not a Range")
+        lowerKey = key.lowerCut.key
+        upperKey = key.upperCut.key
+        matches = []
+        self._findExact(self._root, lowerKey, upperKey, matches)
+        if val is not _ANY_VALUE:
+            matches = [node for node in matches if node.value == val]
+        if len(matches) == 0:
+            raise KeyError(str(key))
+        for node in matches:
+            self._root = self._delete(self._root, node.order)
+            self._len -= 1
+    def get(self, key):
+        """ Get the item(s) of the ranges overlapping a given key. The key
+        can be a Range or a single value
+
+        Parameters
+        ----------
+        key : A single value or Range object
+
+        Raises
+        ------
+        KeyError
+            If there is no overlap with the key
+        ValueError
+            If the key type not compatible with the ranges
+
+        Returns
+        -------
+        A set containing all overlapping items
+        """
+        nodes = self._overlapNodes(key)
+        if len(nodes) == 0:
+            raise KeyError(str(key))
+        return set(node.value for node in nodes)
+    def overlaps(self, val):
+        """ Returns true if any of the ranges at least partially overlap
+        the given value, which can be a single value or a Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        true if any of the ranges overlap the given value
+        """
+        lowerKey, upperKey = self._queryKeys(val)
+        if isinstance(val, Range) and lowerKey == upperKey:
+            # Nothing overlaps an empty range
+            return False
+        node = self._root
+        # Walk down towards the leftmost overlapping range
+        while node is not None:
+            if node.left is not None and node.left.maxUpper > lowerKey:
+                node = node.left
+            elif node.lowerKey < upperKey and lowerKey < node.upperKey:
+                return True
+            elif node.lowerKey >= upperKey:
+                return False
+            else:
+                node = node.right
+        return False
+    def whichOverlaps(self, val):
+        """ Returns which of the Ranges overlap with a single value or
+        Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        set of ranges overlapping with the value
+        """
+        return set(node.range for node in self._overlapNodes(val))
+    def overlapping(self, val):
+        """ Returns the (Range, value) pairs of all ranges overlapping a
+        single value or Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        list of (Range, value) pairs, ordered as in iteritems
+        """
+        return [(node.range, node.value) for node in self._overlapNodes(val)]
+    def enclosing(self, val):
+        """ Returns the (Range, value) pairs of all ranges that enclose a
+        single value or Range object. For a single value this is the same
+        as a stabbing query
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        list of (Range, value) pairs, ordered as in iteritems
+        """
+        if not isinstance(val, Range):
+            return self.overlapping(val)
+        lowerKey, upperKey = self._queryKeys(val)
+        nodes = []
+        self._findEnclosing(self._root, lowerKey, upperKey, nodes)
+        return [(node.range, node.value) for node in nodes]
+    def enclosedBy(self, aRange):
+        """ Returns the (Range, value) pairs of all ranges that are enclosed
+        by a given Range
+
+        Parameters
+        ----------
+        aRange : A Range object
+
+        Raises
+        ------
+        TypeError
+            If not a Range
+        ValueError
+            If the range type not compatible with the ranges
+
+        Returns
+        -------
+        list of (Range, value) pairs, ordered as in iteritems
+        """
+        if not isinstance(aRange, Range):
+            raise TypeError("aRange is not a Range")
+        lowerKey, upperKey = self._queryKeys(aRange)
+        nodes = []
+        self._findEnclosed(self._root, lowerKey, upperKey, nodes)
+        return [(node.range, node.value) for node in nodes]
+    ###########
+    # Queries #
+    ###########
+    def _queryKeys(self, val):
+        """ Returns the (lower, upper) sort keys of a query. A single value
+        becomes a zero-width query that only ranges containing it overlap
+        """
+        if isinstance(val, Range):
+            return val.lowerCut.key, val.upperCut.key
+        if self._root is not None:
+            self._root.range.lowerCut._validate_query_pt(val)
+        return (1, val, 0), (1, val, 0)
+    def _overlapNodes(self, val):
+        lowerKey, upperKey = self._queryKeys(val)
+        nodes = []
+        if isinstance(val, Range) and lowerKey == upperKey:
+            # Nothing overlaps an empty range
+            return nodes
+        self._findOverlaps(self._root, lowerKey, upperKey, nodes)
+        return nodes
+    def _findOverlaps(self, node, lowerKey, upperKey, nodes):
+        if node is None or node.maxUpper <= lowerKey:
+            # Nothing in this subtree reaches the query
+            return
+        self._findOverlaps(node.left, lowerKey, upperKey, nodes)
+        if node.lowerKey < upperKey:
+            if lowerKey < node.upperKey:
+                nodes.append(node)
+            self._findOverlaps(node.right, lowerKey, upperKey, nodes)
+    def _findEnclosing(self, node, lowerKey, upperKey, nodes):
+        if node is None or node.minLower > lowerKey or \
+           node.maxUpper < upperKey:
+            # Nothing in this subtree starts early and ends late enough
+            return
+        self._findEnclosing(node.left, lowerKey, upperKey, nodes)
+        if node.lowerKey <= lowerKey and node.upperKey >= upperKey:
+            nodes.append(node)
+        self._findEnclosing(node.right, lowerKey, upperKey, nodes)
+    def _findEnclosed(self, node, lowerKey, upperKey, nodes):
+        if node is None or node.maxLower < lowerKey or \
+           node.minLower > upperKey or node.minUpper > upperKey:
+            # Nothing in this subtree starts late and ends early enough
+            return
+        self._findEnclosed(node.left, lowerKey, upperKey, nodes)
+        if node.lowerKey >= lowerKey and node.upperKey <= upperKey:
+            nodes.append(node)
+        self._findEnclosed(node.right, lowerKey, upperKey, nodes)
+    def _findExact(self, node, lowerKey, upperKey, nodes):
+        if node is None:
+            return
+        if (lowerKey, upperKey) <= node.order[:2]:
+            self._findExact(node.left, lowerKey, upperKey, nodes)
+        if node.lowerKey == lowerKey and node.upperKey == upperKey:
+            nodes.append(node)
+        if (lowerKey, upperKey) >= node.order[:2]:
+            self._findExact(node.right, lowerKey, upperKey, nodes)
+    def _iterNodes(self):
+        stack = []
+        node = self._root
+        while len(stack) > 0 or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node
+                node = node.right
+    #################
+    # AVL balancing #
+    #################
+    @staticmethod
+    def _height(node):
+        return 0 if node is None else node.height
+    @staticmethod
+    def _update(node):
+        leftHeight = 0 if node.left is None else node.left.height
+        rightHeight = 0 if node.right is None else node.right.height
+        node.height = 1+max(leftHeight, rightHeight)
+        # Lower cuts are in order, so their bounds are at the ends
+        node.minLower = node.lowerKey if node.left is None else node.left.minLower
+        node.maxLower = node.lowerKey if node.right is None else node.right.maxLower
+        minUpper = maxUpper = node.upperKey
+        for child in (node.left, node.right):
+            if child is not None:
+                if child.minUpper < minUpper:
+                    minUpper = child.minUpper
+                if child.maxUpper > maxUpper:
+                    maxUpper = child.maxUpper
+        node.minUpper = minUpper
+        node.maxUpper = maxUpper
+    def _rotateLeft(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+    def _rotateRight(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+    def _rebalance(self, node):
+        self._update(node)
+        balance = self._height(node.left)-self._height(node.right)
+        if balance > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotateLeft(node.left)
+            return self._rotateRight(node)
+        elif balance < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotateRight(node.right)
+            return self._rotateLeft(node)
+        return node
+    def _insert(self, node, newNode):
+        if node is None:
+            return newNode
+        if newNode.order < node.order:
+            node.left = self._insert(node.left, newNode)
+        else:
+            node.right = self._insert(node.right, newNode)
+        return self._rebalance(node)
+    def _delete(self, node, order):
+        if node is None:
+            return None
+        if order < node.order:
+            node.left = self._delete(node.left, order)
+        elif order > node.order:
+            node.right = self._delete(node.right, order)
+        else:
+            if node.left is None:
+                return node.right
+            elif node.right is None:
+                return node.left
+            # Replace with the in-order successor
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            successor.right = self._delete(node.right, successor.order)
+            successor.left = node.left
+            node = successor
+        return self._rebalance(node)
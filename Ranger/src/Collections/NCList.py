@@ -0,0 +1,374 @@
+from array import array
+from bisect import bisect_right
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.CutArray import CutArray
+from Ranger.src.Collections.ColumnFile import writeColumns, readColumns, \
+     _intArray
+
+class NCList(object):
+    """ Class used to represent a static, read-only set of possibly
+    overlapping ranges mapped to objects, indexed as a Nested Containment
+    List. Ranges that are not contained in any other range form the top
+    level list; the ranges contained in each range form its sublist, and so
+    on. Within a sublist both lower and upper cuts are strictly increasing,
+    so the first overlapping range can be found with a binary search.
+
+    All sublists are laid out contiguously in flat, parallel arrays rather
+    than as linked objects. Queries run on plain lists of sort keys; over
+    an integer or float domain the index pickles and saves (see save) its
+    cuts as typed CutArrays instead, and the key lists are rebuilt once
+    when it is read back
+    """
+    def __init__(self, pairs = None):
+        """ Instantiates and builds an NCList
+
+        Parameters
+        ----------
+        pairs : Iterable of (Range, value) tuples, optional
+            Ranges and their values to index. Empty ranges are skipped
+
+        Raises
+        ------
+        TypeError
+            If any of the keys is not a Range
+        ValueError
+            If the ranges are not of compatible types
+        """
+        keys = []
+        vals = []
+        theType = None
+        if pairs is not None:
+            for key, val in pairs:
+                if not isinstance(key, Range):
+                    raise TypeError("key is not a Range")
+                elif key.isEmpty():
+                    # Skip if this is an empty range
+                    continue
+                if theType is None:
+                    theType = key.lowerCut.theType
+                elif not (issubclass(key.lowerCut.theType, theType) or \
+                          issubclass(theType, key.lowerCut.theType)):
+                    raise ValueError("Range not compatible with previously added ranges")
+                keys.append(key)
+                vals.append(val)
+        self._build(keys, vals)
+    def _build(self, keys, vals):
+        lowerKeys = [key.lowerCut.key for key in keys]
+        upperKeys = [key.upperCut.key for key in keys]
+        # Order by lower cut ascending, then upper cut descending, so that
+        # every range comes after all the ranges containing it
+        order = sorted(range(len(keys)), key = upperKeys.__getitem__,
+                       reverse = True)
+        order.sort(key = lowerKeys.__getitem__)
+        # Find the innermost containing range of each range
+        children = dict()
+        topLevel = []
+        stack = []
+        for ind in order:
+            while len(stack) > 0 and upperKeys[stack[-1]] < upperKeys[ind]:
+                stack.pop()
+            if len(stack) > 0:
+                children.setdefault(stack[-1], []).append(ind)
+            else:
+                topLevel.append(ind)
+            stack.append(ind)
+        # Lay out the sublists contiguously, breadth first
+        flat = list(topLevel)
+        subStart = array('l', [-1])*len(keys)
+        subEnd = array('l', [-1])*len(keys)
+        pos = 0
+        while pos < len(flat):
+            sublist = children.get(flat[pos])
+            if sublist is not None:
+                subStart[pos] = len(flat)
+                flat.extend(sublist)
+                subEnd[pos] = len(flat)
+            pos += 1
+        ## Flat arrays, parallel to each other
+        self._ranges = [keys[ind] for ind in flat]
+        self._values = [vals[ind] for ind in flat]
+        self._lowerKeys = [lowerKeys[ind] for ind in flat]
+        self._upperKeys = [upperKeys[ind] for ind in flat]
+        ## Bounds of the sublist of each range within the flat arrays, or
+        ## -1 if nothing is contained in it
+        self._subStart = subStart
+        self._subEnd = subEnd
+        self._topLen = len(topLevel)
+    def _setColumns(self, lowerCuts, upperCuts, values, subStart, subEnd,
+                    topLen):
+        """ Sets the flat columns of the index from its cuts, rebuilding
+        the ranges and key lists that queries run on """
+        lowerCuts = list(lowerCuts)
+        upperCuts = list(upperCuts)
+        ## Flat arrays, parallel to each other
+        self._ranges = [Range(lowerCut, upperCut) for lowerCut, upperCut \
+                        in zip(lowerCuts, upperCuts)]
+        self._values = values
+        self._lowerKeys = [cut.key for cut in lowerCuts]
+        self._upperKeys = [cut.key for cut in upperCuts]
+        ## Bounds of the sublist of each range within the flat arrays, or
+        ## -1 if nothing is contained in it
+        self._subStart = subStart
+        self._subEnd = subEnd
+        self._topLen = topLen
+    def _cutColumns(self):
+        """ Returns the lower and upper cuts of the flat ranges, as
+        CutArrays if they are all over the same integer or float domain,
+        or else as lists """
+        lowerCuts = [aRange.lowerCut for aRange in self._ranges]
+        upperCuts = [aRange.upperCut for aRange in self._ranges]
+        if len(lowerCuts) > 0 and all(cut.theType is lowerCuts[0].theType \
+                                      for cut in lowerCuts):
+            try:
+                return CutArray(lowerCuts), CutArray(upperCuts)
+            except ValueError:
+                # Not a numeric domain
+                pass
+        return lowerCuts, upperCuts
+    def __getstate__(self):
+        lowerCuts, upperCuts = self._cutColumns()
+        # Columns read from a mapped file are copied out into arrays
+        return (lowerCuts, upperCuts, list(self._values),
+                _intArray(self._subStart), _intArray(self._subEnd),
+                self._topLen)
+    def __setstate__(self, state):
+        self._setColumns(*state)
+    def __len__(self):
+        return len(self._ranges)
+    def __iter__(self):
+        for ind in self._walk((0, None, 0), None):
+            yield self._ranges[ind]
+    def __getitem__(self, key):
+        return self.get(key)
+    def __repr__(self):
+        pairs = ["%s : %s" % (k,v) for k,v in self.iteritems()]
+        if len(pairs) < 5:
+            return "NCList(%s)" % ", ".join(pairs)
+        else:
+            return "NCList(%s, ..., %s)" % (", ".join(pairs[:2]),
+                                            ", ".join(pairs[-2:]))
+    def iteritems(self):
+        """ Iterates over pairs of (Range, value)
+
+        Returns
+        -------
+        Generator of (Range, value) in nesting order: each range is
+        followed by the ranges it contains
+        """
+        for ind in self._walk((0, None, 0), None):
+            yield self._ranges[ind], self._values[ind]
+    def get(self, key):
+        """ Get the item(s) of the ranges overlapping a given key. The key
+        can be a Range or a single value
+
+        Parameters
+        ----------
+        key : A single value or Range object
+
+        Raises
+        ------
+        KeyError
+            If there is no overlap with the key
+        ValueError
+            If the key type not compatible with the ranges
+
+        Returns
+        -------
+        A set containing all overlapping items
+        """
+        inds = self._query(key)
+        if len(inds) == 0:
+            raise KeyError(str(key))
+        return set(self._values[ind] for ind in inds)
+    def overlaps(self, val):
+        """ Returns true if any of the ranges at least partially overlap
+        the given value, which can be a single value or a Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        true if any of the ranges overlap the given value
+        """
+        lowerKey, upperKey = self._queryKeys(val)
+        if lowerKey is None:
+            return False
+        # Only the top level needs checking: anything overlapping a
+        # contained range also overlaps the range containing it
+        ind = bisect_right(self._upperKeys, lowerKey, 0, self._topLen)
+        return ind < self._topLen and self._lowerKeys[ind] < upperKey
+    def whichOverlaps(self, val):
+        """ Returns which of the Ranges overlap with a single value or
+        Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        set of ranges overlapping with the value
+        """
+        return set(self._ranges[ind] for ind in self._query(val))
+    def overlapping(self, val):
+        """ Returns the (Range, value) pairs of all ranges overlapping a
+        single value or Range object
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        list of (Range, value) pairs, in nesting order
+        """
+        return [(self._ranges[ind], self._values[ind]) for ind in self._query(val)]
+    def overlapping_many(self, vals):
+        """ Batch version of overlapping. Queries are answered in order of
+        their lower bound, so the top level binary searches only ever move
+        forward
+
+        Parameters
+        ----------
+        vals : Iterable of single values or Range objects
+
+        Raises
+        ------
+        ValueError
+            If a value type not compatible with the ranges
+
+        Returns
+        -------
+        list with, for each query, the list of (Range, value) pairs of
+        the ranges overlapping it
+        """
+        queries = [self._queryKeys(val) for val in vals]
+        results = [[] for query in queries]
+        order = sorted((i for i in range(len(queries)) if \
+                        queries[i][0] is not None),
+                       key = lambda i: queries[i][0])
+        start = 0
+        for i in order:
+            lowerKey, upperKey = queries[i]
+            start = bisect_right(self._upperKeys, lowerKey, start, self._topLen)
+            results[i] = [(self._ranges[ind], self._values[ind]) for ind in \
+                          self._walk(lowerKey, upperKey, start)]
+        return results
+    def save(self, path):
+        """ Writes the index to a binary, columnar file (see ColumnFile),
+        which load can memory map. The distinct values are pickled into a
+        value table, which each range refers to by position
+
+        Parameters
+        ----------
+        path : string
+            The file to write
+
+        Raises
+        ------
+        ValueError
+            If the ranges are not over an integer or float domain
+        """
+        lowerCuts, upperCuts = self._cutColumns()
+        writeColumns(path, "nclist", lowerCuts, upperCuts, self._values,
+                     (self._subStart, self._subEnd, self._topLen))
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def load(path, mmap = True):
+        """ Loads an index written by NCList.save. The values and sublist
+        bounds are read from the file as they are used, but the ranges
+        and the key lists that queries run on are rebuilt from the cut
+        columns, so loading costs O(n). On Python 2, which has no
+        memoryview.cast, the values and sublist bounds are copied into
+        arrays as well.
+
+        The values are stored with pickle, so only load files from
+        trusted sources: unpickling a crafted file can run arbitrary code
+
+        Parameters
+        ----------
+        path : string
+            The file to read
+        mmap : boolean
+            Whether to memory map the file rather than read it in
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold an NCList
+
+        Returns
+        -------
+        The NCList
+        """
+        kind, lowerCuts, upperCuts, values, sublists = readColumns(path, mmap)
+        if kind != "nclist":
+            raise ValueError("File does not hold an NCList")
+        ncList = NCList()
+        ncList._setColumns(lowerCuts, upperCuts, values, *sublists)
+        return ncList
+    ###########
+    # Queries #
+    ###########
+    def _queryKeys(self, val):
+        """ Returns the (lower, upper) sort keys of a query, or
+        (None, None) for an empty Range, which overlaps nothing. A single
+        value becomes a zero-width query that only ranges containing it
+        overlap
+        """
+        if isinstance(val, Range):
+            lowerKey = val.lowerCut.key
+            upperKey = val.upperCut.key
+            if lowerKey == upperKey:
+                return None, None
+            return lowerKey, upperKey
+        if len(self._ranges) > 0:
+            self._ranges[0].lowerCut._validate_query_pt(val)
+        return (1, val, 0), (1, val, 0)
+    def _query(self, val):
+        lowerKey, upperKey = self._queryKeys(val)
+        if lowerKey is None:
+            return []
+        return list(self._walk(lowerKey, upperKey))
+    def _walk(self, lowerKey, upperKey, start = None):
+        """ Yields the flat indices of the ranges overlapping the query
+        keys in nesting order. An upper key of None means unbounded """
+        upperKeys = self._upperKeys
+        lowerKeys = self._lowerKeys
+        subStart = self._subStart
+        subEnd = self._subEnd
+        if start is None:
+            start = bisect_right(upperKeys, lowerKey, 0, self._topLen)
+        # Stack of [next index, end] for each sublist being scanned
+        frames = [[start, self._topLen]]
+        while len(frames) > 0:
+            frame = frames[-1]
+            ind = frame[0]
+            if ind < frame[1] and (upperKey is None or lowerKeys[ind] < upperKey):
+                frame[0] = ind+1
+                yield ind
+                if subStart[ind] >= 0:
+                    frames.append([bisect_right(upperKeys, lowerKey,
+                                                subStart[ind], subEnd[ind]),
+                                   subEnd[ind]])
+            else:
+                frames.pop()
@@ -0,0 +1,564 @@
+""" Columnar array of ranges over an integer or float domain. Each range is
+stored as the points and side codes (see CutArray) of its lower and upper
+cuts, in four parallel numpy arrays, so that bulk operations run as numpy
+expressions instead of Python loops over Range objects
+"""
+from array import array
+from numbers import Integral
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.CutArray import CutArray, BELOW_ALL, BELOW, \
+     ABOVE, ABOVE_ALL, _typecode
+
+def _ranks(sides):
+    """ Returns the rank of each cut in its sort key (see Cut): 0 for
+    belowAll, 2 for aboveAll and 1 otherwise """
+    return (sides > BELOW_ALL).astype(numpy.int8) + (sides == ABOVE_ALL)
+
+def _cutLess(points, sides, otherPoints, otherSides):
+    """ Returns where the cuts given by points and side codes sort before
+    the other cuts """
+    ranks = _ranks(sides)
+    otherRanks = _ranks(otherSides)
+    return (ranks < otherRanks) | \
+           ((ranks == otherRanks) & (ranks == 1) & \
+            ((points < otherPoints) | \
+             ((points == otherPoints) & (sides < otherSides))))
+
+def _cutEqual(points, sides, otherPoints, otherSides):
+    """ Returns where the cuts are equal to the other cuts. Unbounded cuts
+    always have a point of 0, so they only need their sides compared """
+    return (points == otherPoints) & (sides == otherSides)
+
+def _checkNumpy():
+    if numpy is None:
+        raise ImportError("RangeArray requires numpy")
+
+def _toArray(typecode, values):
+    """ Copies a numpy array into an array of a typecode """
+    arr = array(typecode)
+    data = numpy.ascontiguousarray(values, dtype = typecode).tobytes()
+    try:
+        arr.frombytes(data)
+    except AttributeError:
+        arr.fromstring(data)
+    return arr
+
+class RangeArray(object):
+    """ Class used to represent an array of ranges over an integer or float
+    domain in columnar form. The lower and upper cuts of the ranges are
+    held as numpy arrays of points (lowerPoints, upperPoints) and of side
+    codes (lowerSides, upperSides): BELOW for a cut below its point, ABOVE
+    for one above it, and BELOW_ALL or ABOVE_ALL (with a point of 0) for
+    an unbounded end. A lower cut is closed where its side is BELOW, and
+    an upper cut where its side is ABOVE.
+
+    Operations taking another range accept a RangeArray of the same
+    length, compared row by row, or a single Range, compared with every
+    row. Results follow the Range methods of the same names exactly.
+    RangeArrays are immutable
+    """
+    def __init__(self, lowerPoints, lowerSides, upperPoints, upperSides):
+        """ Instantiates a RangeArray
+
+        Parameters
+        ----------
+        lowerPoints, upperPoints : numpy arrays
+            Lower and upper points of the ranges, of an integer or float
+            dtype. The points of unbounded ends are ignored
+        lowerSides, upperSides : numpy arrays
+            Side codes of the lower and upper cuts
+
+        Raises
+        ------
+        ImportError
+            If numpy is not installed
+        ValueError
+            If the arrays differ in length or dtype, a side code is not
+            valid for its end, or a lower bound is greater than its upper
+            bound
+        """
+        _checkNumpy()
+        lowerPoints = numpy.asarray(lowerPoints)
+        upperPoints = numpy.asarray(upperPoints)
+        if lowerPoints.dtype.kind == 'f' or upperPoints.dtype.kind == 'f':
+            dtype = numpy.float64
+        elif lowerPoints.dtype.kind in 'iub' and upperPoints.dtype.kind in 'iub':
+            dtype = numpy.int64
+        else:
+            raise ValueError("Points must be integers or floats")
+        lowerPoints = numpy.array(lowerPoints, dtype = dtype, ndmin = 1)
+        upperPoints = numpy.array(upperPoints, dtype = dtype, ndmin = 1)
+        lowerSides = numpy.array(lowerSides, dtype = numpy.int8, ndmin = 1)
+        upperSides = numpy.array(upperSides, dtype = numpy.int8, ndmin = 1)
+        if not (lowerPoints.shape == lowerSides.shape == upperPoints.shape == \
+                upperSides.shape) or lowerPoints.ndim != 1:
+            raise ValueError("Columns must be one dimensional and of the same length")
+        if not (numpy.isin(lowerSides, (BELOW_ALL, BELOW, ABOVE)).all() and \
+                numpy.isin(upperSides, (BELOW, ABOVE, ABOVE_ALL)).all()):
+            raise ValueError("Invalid side code")
+        lowerPoints[lowerSides == BELOW_ALL] = 0
+        upperPoints[upperSides == ABOVE_ALL] = 0
+        if _cutLess(upperPoints, upperSides, lowerPoints, lowerSides).any():
+            raise ValueError("Lower bound cannot be greater than upper bound")
+        for column in (lowerPoints, lowerSides, upperPoints, upperSides):
+            column.flags.writeable = False
+        self.lowerPoints = lowerPoints
+        self.lowerSides = lowerSides
+        self.upperPoints = upperPoints
+        self.upperSides = upperSides
+        self.theType = float if dtype is numpy.float64 else int
+    def __len__(self):
+        return len(self.lowerSides)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    def __getitem__(self, index):
+        if isinstance(index, (Integral, numpy.integer)):
+            if index < 0:
+                index += len(self)
+            if index < 0 or index >= len(self):
+                raise IndexError("RangeArray index out of range")
+            return Range(self._cut(self.lowerPoints[index], self.lowerSides[index]),
+                         self._cut(self.upperPoints[index], self.upperSides[index]))
+        return RangeArray(self.lowerPoints[index], self.lowerSides[index],
+                          self.upperPoints[index], self.upperSides[index])
+    def __eq__(self, other):
+        if not isinstance(other, RangeArray): return False
+        elif len(self) != len(other): return False
+        return bool(_cutEqual(self.lowerPoints, self.lowerSides,
+                              other.lowerPoints, other.lowerSides).all() and \
+                    _cutEqual(self.upperPoints, self.upperSides,
+                              other.upperPoints, other.upperSides).all())
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    def __repr__(self):
+        if len(self) < 6:
+            return "RangeArray(%s)" % ", ".join(map(str, self))
+        else:
+            return "RangeArray(%s, ..., %s)" % (", ".join(map(str, self[:2])),
+                                                ", ".join(map(str, self[-2:])))
+    def argsort(self, byUpper = False):
+        """ Returns the order that sorts the ranges by their cuts
+
+        Parameters
+        ----------
+        byUpper : boolean
+            If True, the ranges are sorted by upper cut and then by lower
+            cut. Otherwise, by lower cut and then by upper cut
+
+        Returns
+        -------
+        numpy array of the positions of the ranges in sorted order. The
+        sort is stable
+        """
+        # Each cut sorts by rank, then point, then side (see Cut)
+        lowerKeys = (self.lowerSides, self.lowerPoints, _ranks(self.lowerSides))
+        upperKeys = (self.upperSides, self.upperPoints, _ranks(self.upperSides))
+        if byUpper:
+            keys = lowerKeys + upperKeys
+        else:
+            keys = upperKeys + lowerKeys
+        # The last key is the primary one
+        return numpy.lexsort(keys)
+    def contains(self, points):
+        """ Returns whether each range contains a point
+
+        Parameters
+        ----------
+        points : single value or numpy array
+            A point to look up in every range, or an array with a point
+            for each range
+
+        Raises
+        ------
+        ValueError
+            If the point type is not compatible with the ranges
+
+        Returns
+        -------
+        numpy boolean array
+        """
+        points = numpy.asarray(points)
+        if points.dtype.kind == 'f':
+            compatible = self.theType is float
+        else:
+            compatible = points.dtype.kind in 'iu' and self.theType is int
+        if not compatible:
+            raise ValueError("Type is not compatible with cutpoint type")
+        lowerRanks = _ranks(self.lowerSides)
+        upperRanks = _ranks(self.upperSides)
+        aboveLower = (lowerRanks == 0) | \
+                     ((lowerRanks == 1) & \
+                      ((self.lowerPoints < points) | \
+                       ((self.lowerPoints == points) & (self.lowerSides == BELOW))))
+        belowUpper = (upperRanks == 2) | \
+                     ((upperRanks == 1) & \
+                      ((points < self.upperPoints) | \
+                       ((points == self.upperPoints) & (self.upperSides == ABOVE))))
+        return aboveLower & belowUpper
+    def encloses(self, other):
+        """ Returns whether the bounds of the other ranges do not extend
+        outside the bounds of each range
+
+        Parameters
+        ----------
+        other : RangeArray or Range object
+            The ranges to compare to
+
+        Raises
+        ------
+        ValueError
+            If other is not a compatible Range or RangeArray
+
+        Returns
+        -------
+        numpy boolean array
+        """
+        other = self._other(other)
+        return ~_cutLess(other.lowerPoints, other.lowerSides,
+                         self.lowerPoints, self.lowerSides) & \
+               ~_cutLess(self.upperPoints, self.upperSides,
+                         other.upperPoints, other.upperSides)
+    def intersection(self, other):
+        """ Returns the maximal ranges enclosed by both each range and the
+        other ranges
+
+        Parameters
+        ----------
+        other : RangeArray or Range object
+            The ranges to intersect with
+
+        Raises
+        ------
+        ValueError
+            If other is not a compatible Range or RangeArray, or any of
+            the pairs of ranges are not connected
+
+        Returns
+        -------
+        RangeArray of the intersections
+        """
+        other = self._other(other)
+        takeLower = _cutLess(self.lowerPoints, self.lowerSides,
+                             other.lowerPoints, other.lowerSides)
+        takeUpper = _cutLess(other.upperPoints, other.upperSides,
+                             self.upperPoints, self.upperSides)
+        return self._pick(other, takeLower, takeUpper)
+    def isConnected(self, other):
+        """ Returns whether there is a (possibly empty) range enclosed by
+        both each range and the other ranges
+
+        Parameters
+        ----------
+        other : RangeArray or Range object
+            The ranges to compare to
+
+        Raises
+        ------
+        ValueError
+            If other is not a compatible Range or RangeArray
+
+        Returns
+        -------
+        numpy boolean array
+        """
+        other = self._other(other)
+        return ~_cutLess(other.upperPoints, other.upperSides,
+                         self.lowerPoints, self.lowerSides) & \
+               ~_cutLess(self.upperPoints, self.upperSides,
+                         other.lowerPoints, other.lowerSides)
+    def isEmpty(self):
+        """ Returns whether each range is of form [v, v) or (v, v]
+
+        Returns
+        -------
+        numpy boolean array
+        """
+        return _cutEqual(self.lowerPoints, self.lowerSides,
+                         self.upperPoints, self.upperSides)
+    def length(self):
+        """ Returns the distance between the endpoints of each range
+
+        Raises
+        ------
+        ValueError
+            If any of the ranges is unbounded
+
+        Returns
+        -------
+        numpy array of upper point minus lower point
+        """
+        if (self.lowerSides == BELOW_ALL).any() or \
+           (self.upperSides == ABOVE_ALL).any():
+            raise ValueError("Range is unbounded")
+        return self.upperPoints - self.lowerPoints
+    def sorted(self, byUpper = False):
+        """ Returns the ranges sorted by their cuts (see argsort)
+
+        Parameters
+        ----------
+        byUpper : boolean
+            If True, the ranges are sorted by upper cut first
+
+        Returns
+        -------
+        A sorted RangeArray
+        """
+        return self[self.argsort(byUpper)]
+    def span(self, other):
+        """ Returns the minimal ranges that enclose both each range and the
+        other ranges
+
+        Parameters
+        ----------
+        other : RangeArray or Range object
+            The ranges to span with
+
+        Raises
+        ------
+        ValueError
+            If other is not a compatible Range or RangeArray
+
+        Returns
+        -------
+        RangeArray of the spans
+        """
+        other = self._other(other)
+        takeLower = _cutLess(other.lowerPoints, other.lowerSides,
+                             self.lowerPoints, self.lowerSides)
+        takeUpper = _cutLess(self.upperPoints, self.upperSides,
+                             other.upperPoints, other.upperSides)
+        return self._pick(other, takeLower, takeUpper)
+    def to_ranges(self):
+        """ Returns the ranges as a list of Range objects """
+        return list(self)
+    def _coalesced(self):
+        """ Returns the ranges as a RangeSet would hold them: sorted, with
+        empty ranges dropped and connected ranges merged """
+        rows = self[~self.isEmpty()]
+        if len(rows) == 0:
+            return rows
+        if _cutLess(rows.lowerPoints[1:], rows.lowerSides[1:],
+                    rows.lowerPoints[:-1], rows.lowerSides[:-1]).any():
+            rows = rows.sorted()
+        # The row with the highest upper cut so far, found from a running
+        # maximum of each upper cut's position in upper cut order
+        order = numpy.lexsort((rows.upperSides, rows.upperPoints,
+                               _ranks(rows.upperSides)))
+        positions = numpy.empty(len(rows), dtype = numpy.intp)
+        positions[order] = numpy.arange(len(rows))
+        highest = order[numpy.maximum.accumulate(positions)]
+        # A new range starts wherever there is a gap before the lower cut
+        starts = numpy.ones(len(rows), dtype = bool)
+        starts[1:] = _cutLess(rows.upperPoints[highest[:-1]],
+                              rows.upperSides[highest[:-1]],
+                              rows.lowerPoints[1:], rows.lowerSides[1:])
+        startInds = numpy.flatnonzero(starts)
+        ends = highest[numpy.append(startInds[1:], len(rows))-1]
+        return RangeArray(rows.lowerPoints[startInds], rows.lowerSides[startInds],
+                          rows.upperPoints[ends], rows.upperSides[ends])
+    def _isDisjoint(self):
+        """ Returns whether the ranges are non-empty, sorted and do not
+        overlap, so that they can be stored in a map as they are """
+        return not self.isEmpty().any() and \
+            not _cutLess(self.lowerPoints[1:], self.lowerSides[1:],
+                         self.upperPoints[:-1], self.upperSides[:-1]).any()
+    def _cut(self, point, side):
+        """ Returns the Cut for a point and side code """
+        if side == BELOW_ALL:
+            return Cut.belowAll(theType = self.theType)
+        elif side == ABOVE_ALL:
+            return Cut.aboveAll(theType = self.theType)
+        return Cut(self.theType, point = self.theType(point),
+                   below = (side == BELOW))
+    def _other(self, other):
+        """ Returns the other operand of a row by row operation as a
+        RangeArray """
+        if isinstance(other, Range):
+            other = RangeArray.from_ranges([other], self.theType)
+        elif not isinstance(other, RangeArray):
+            raise ValueError("Range or RangeArray required")
+        elif len(other) != len(self):
+            raise ValueError("RangeArrays differ in length")
+        if other.theType is not self.theType:
+            raise ValueError("RangeArray types not compatible")
+        return other
+    def _pick(self, other, takeLower, takeUpper):
+        """ Returns a RangeArray of cuts from this array, or from the other
+        array where take is True """
+        where = numpy.where
+        return RangeArray(where(takeLower, other.lowerPoints, self.lowerPoints),
+                          where(takeLower, other.lowerSides, self.lowerSides),
+                          where(takeUpper, other.upperPoints, self.upperPoints),
+                          where(takeUpper, other.upperSides, self.upperSides))
+    def _cutArrays(self):
+        """ Returns the lower and upper cuts as CutArrays, copying the
+        columns without creating any Cuts """
+        typecode = _typecode(self.theType)
+        return (CutArray.fromBuffers(_toArray(typecode, self.lowerPoints),
+                                     _toArray('b', self.lowerSides), self.theType),
+                CutArray.fromBuffers(_toArray(typecode, self.upperPoints),
+                                     _toArray('b', self.upperSides), self.theType))
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def _fromBounds(lowers, uppers, lowerSide, upperSide):
+        _checkNumpy()
+        lowers = numpy.asarray(lowers)
+        uppers = numpy.asarray(uppers)
+        return RangeArray(lowers, numpy.full(lowers.shape, lowerSide, numpy.int8),
+                          uppers, numpy.full(uppers.shape, upperSide, numpy.int8))
+    @staticmethod
+    def closed(lowers, uppers):
+        """ Creates an array of ranges including their endpoints
+        (i.e. [lower, upper])
+
+        Parameters
+        ----------
+        lowers, uppers : numpy arrays
+            The lower and upper points of the ranges
+
+        Raises
+        ------
+        ValueError
+            If a lower point is greater than its upper point
+
+        Returns
+        -------
+        The RangeArray
+        """
+        return RangeArray._fromBounds(lowers, uppers, BELOW, ABOVE)
+    @staticmethod
+    def closedOpen(lowers, uppers):
+        """ Creates an array of ranges including their lower endpoints
+        (i.e. [lower, upper))
+
+        Parameters
+        ----------
+        lowers, uppers : numpy arrays
+            The lower and upper points of the ranges
+
+        Raises
+        ------
+        ValueError
+            If a lower point is greater than its upper point
+
+        Returns
+        -------
+        The RangeArray
+        """
+        return RangeArray._fromBounds(lowers, uppers, BELOW, BELOW)
+    @staticmethod
+    def openClosed(lowers, uppers):
+        """ Creates an array of ranges including their upper endpoints
+        (i.e. (lower, upper])
+
+        Parameters
+        ----------
+        lowers, uppers : numpy arrays
+            The lower and upper points of the ranges
+
+        Raises
+        ------
+        ValueError
+            If a lower point is greater than its upper point
+
+        Returns
+        -------
+        The RangeArray
+        """
+        return RangeArray._fromBounds(lowers, uppers, ABOVE, ABOVE)
+    @staticmethod
+    def open(lowers, uppers):
+        """ Creates an array of ranges excluding their endpoints
+        (i.e. (lower, upper))
+
+        Parameters
+        ----------
+        lowers, uppers : numpy arrays
+            The lower and upper points of the ranges
+
+        Raises
+        ------
+        ValueError
+            If a lower point is greater than its upper point
+        TypeError
+            If a lower point is equal to its upper point
+
+        Returns
+        -------
+        The RangeArray
+        """
+        _checkNumpy()
+        if (numpy.asarray(lowers) == numpy.asarray(uppers)).any():
+            raise TypeError("Range of type (v,v) is not valid")
+        return RangeArray._fromBounds(lowers, uppers, ABOVE, BELOW)
+    @staticmethod
+    def from_ranges(ranges, theType = None):
+        """ Creates a RangeArray from Range objects
+
+        Parameters
+        ----------
+        ranges : Iterable of Range objects
+            The ranges, of an integer or float domain
+        theType : type, optional
+            The domain type, needed if there are no ranges to take it
+            from. Defaults to int
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a Range
+        ValueError
+            If the ranges are not of a single integer or float domain
+
+        Returns
+        -------
+        The RangeArray
+        """
+        lowerCuts = CutArray(theType = theType)
+        upperCuts = CutArray(theType = theType)
+        for aRange in ranges:
+            if not isinstance(aRange, Range):
+                raise TypeError("aRange is not a Range")
+            lowerCuts.append(aRange.lowerCut)
+            upperCuts.append(aRange.upperCut)
+        return RangeArray.from_cuts(lowerCuts, upperCuts)
+    @staticmethod
+    def from_cuts(lowerCuts, upperCuts):
+        """ Creates a RangeArray from the columns of lower and upper cuts of
+        a collection, without creating any Cut objects where they are
+        CutArrays
+
+        Parameters
+        ----------
+        lowerCuts, upperCuts : CutArrays or sequences of Cut objects
+            The lower and upper cuts of the ranges
+
+        Raises
+        ------
+        ValueError
+            If the cuts are not of a single integer or float domain
+
+        Returns
+        -------
+        The RangeArray
+        """
+        _checkNumpy()
+        if not isinstance(lowerCuts, CutArray):
+            lowerCuts = CutArray(lowerCuts)
+            upperCuts = CutArray(upperCuts)
+        theType = lowerCuts.theType or upperCuts.theType or int
+        dtype = _typecode(theType)
+        return RangeArray(numpy.frombuffer(lowerCuts.points, dtype = dtype) \
+                              if len(lowerCuts) else numpy.zeros(0, dtype),
+                          numpy.frombuffer(lowerCuts.sides, dtype = numpy.int8),
+                          numpy.frombuffer(upperCuts.points, dtype = dtype) \
+                              if len(upperCuts) else numpy.zeros(0, dtype),
+                          numpy.frombuffer(upperCuts.sides, dtype = numpy.int8))
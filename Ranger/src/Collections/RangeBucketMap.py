@@ -1,26 +1,42 @@
-from bisect import bisect_left
-from collections import deque, Hashable
+from collections import Hashable
 from Ranger.src.Collections.RangeMap import RangeMap
+from Ranger.src.Collections.ChunkedList import bisect_left
+from Ranger.src.Collections.CutArray import walkWindow, overlapKind, \
+     LEFT_OVERLAP
+from Ranger.src.Collections.ColumnFile import MappedItems
 from Ranger.src.Range.Range import Range
-from Ranger.src.Range.Cut import Cut
 
 class RangeBucketMap(RangeMap):
     """ Class used to represent a mapping of disjoint ranges to sets of items. Ranges
     do not coalesce. However, if a new Range is added over an existing Range, items
     belonging to the existing Range are retained in that Range
     """
-    def __init__(self, rangeDict = None):
+    # Kind of collection written by save
+    _FILE_KIND = "buckets"
+    def __init__(self, rangeDict = None, backend = "list", trusted = False,
+                 pool = None):
         """ Instantiates a RangeBucketMap
 
         Parameters
         ----------
         rangeDict : Dictionary of Range -> object
             Dictionary to start off the RangeBucketMap with
+        backend : string
+            Backing store for the map, either "list", "chunked" or
+            "compact" (see RangeMap)
+        trusted : boolean
+            If True, ranges put or removed are not checked for a
+            compatible type (see RangeMap)
+        pool : InternPool, optional
+            Pool to share the stored ranges and their cuts through (see
+            RangeMap)
         """
-        self.recurseAdd = False
-        super(RangeBucketMap, self).__init__(rangeDict)
+        super(RangeBucketMap, self).__init__(rangeDict, backend, trusted, pool)
     def iteritems(self, start = None, end = None):
-        """ Iterates over pairs of (Range, value)
+        """ Iterates over pairs of (Range, value), where each Range is a
+        maximal run of connected segments holding the value. A run is
+        produced as soon as the segment after it no longer holds its
+        value, so only the values of the current segment are tracked
 
         Parameters
         ----------
@@ -31,58 +47,32 @@ class RangeBucketMap(RangeMap):
 
         Returns
         -------
-        Generator of (Range intersecting [start,end], value), ordered by start point
+        Generator of (Range intersecting [start,end], value), ordered by
+        end point and then by start point
         """
-        if start is None:
-            start = self.lower_cuts[0]
-        else:
-            start = Cut.belowValue(start)
-        if end is None:
-            end = self.upper_cuts[-1]
-        else:
-            end = Cut.aboveValue(end)
-        bounding_range = Range(start, end)
-        # Get the bounding indices
-        ovlapLowerInd = max(bisect_left(self.lower_cuts, start)-1,0)
-        ovlapUpperInd = bisect_left(self.lower_cuts, end)
-        # Create queue of values that need to be generated
-        yield_vals = deque()
-        # Create dictionary of values to be generated -> indices containing them
-        vals_inds_dict = {}
-        for i in range(ovlapLowerInd, ovlapUpperInd):
-            # Check if anything can be released from the queue
-            while len(yield_vals) > 0:
-                if vals_inds_dict[yield_vals[0]][-1] < i-1:
-                    # Yield the full range, value. Remove value from queue
-                    val = yield_vals.popleft()
-                    yield Range(max(self.lower_cuts[vals_inds_dict[val][0]],start),
-                                min(self.upper_cuts[vals_inds_dict[val][-1]],end)), val
-                    # Remove value from dict
-                    del vals_inds_dict[val]
-                else:
-                    break
-            try:
-                # Get intersection of the ranges
-                intersect = bounding_range.intersection(self.ranges[i])
-                if not intersect.isEmpty():
-                    # If overlapping with this range, put into queue
-                    for val in self.items[i]:
-                        if val not in vals_inds_dict:
-                            yield_vals.append(val)
-                            vals_inds_dict[val] = deque()
-                        vals_inds_dict[val].append(i)
-            except ValueError:
-                # Continue if no overlap with this range
-                continue
-        ## Yield remaining values
-        while len(yield_vals) > 0:
-            # Yield the full range, value. Remove value from queue
-            val = yield_vals.popleft()
-            yield Range(max(self.lower_cuts[vals_inds_dict[val][0]],start),
-                        min(self.upper_cuts[vals_inds_dict[val][-1]],end)), val
-            # Remove value from dict
-            del vals_inds_dict[val]
-                
+        items = self.items
+        # Lower cut of the current run of each value in the last segment
+        runStarts = {}
+        lastUpper = None
+        for ind, aRange in walkWindow(self.lower_cuts, self.upper_cuts,
+                                      self.lower_keys, self.upper_keys,
+                                      self.ranges, start, end):
+            segItems = items[ind]
+            if lastUpper is not None and lastUpper.key == aRange.lowerCut.key:
+                ended = [val for val in runStarts if val not in segItems]
+            else:
+                # Not connected to the last segment, so every run ends
+                ended = list(runStarts)
+            ended.sort(key = lambda val: runStarts[val].key)
+            for val in ended:
+                yield Range(runStarts.pop(val), lastUpper), val
+            for val in segItems:
+                if val not in runStarts:
+                    runStarts[val] = aRange.lowerCut
+            lastUpper = aRange.upperCut
+        ## Yield the runs reaching the last segment
+        for val in sorted(runStarts, key = lambda val: runStarts[val].key):
+            yield Range(runStarts[val], lastUpper), val
     def get(self, key):
         """ Get the item(s) corresponding to a given key. The key can be a
         Range or a single value that is within a Range
@@ -108,26 +98,24 @@ class RangeBucketMap(RangeMap):
         elif isinstance(key, Range):
             # If this is a single value
             returnSet = set()
+            lowerKey = key.lowerCut.key
+            upperKey = key.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
             # Get the bounding indices
-            ovlapLowerInd = max(bisect_left(self.lower_cuts, key.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, key.upperCut)
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = key.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        # If overlapping with this range, put its
-                        # item in the return set
-                        returnSet = returnSet.union(self.items[i])
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
+            lo, hi = self._window(key)
+            for i in range(lo, hi):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    # If overlapping with this range, put its
+                    # items in the return set
+                    returnSet.update(self.items[i])
             # Return the set of items
             return returnSet
         else:
             # If this is a single value
             # Get the index of the range containing the value
-            lower_ind = max(bisect_left(self.lower_cuts, key)-1,0)
+            lower_ind = max(bisect_left(self.lower_keys, self._valueKey(key))-1,0)
             # Return the item at that value
             return self.items[lower_ind]  
     def put(self, key, val):
@@ -145,194 +133,203 @@ class RangeBucketMap(RangeMap):
         ------
         TypeError
             If the key is not a Range object or value is not hashable
+        ValueError
+            If the key type not compatible with previously added ranges
         """
         if not isinstance(key, Range):
             raise TypeError("key is not a Range")
-        elif not any((isinstance(val, Hashable), self.recurseAdd)):
+        elif not isinstance(val, Hashable):
             raise TypeError("value not hashable")
-        elif key.isEmpty():
-            # Skip if this is an empty range
+        elif not self._checkRange(key):
             return
-        # Figure out where to the key/value
-        if not self.overlaps(key):
-            # If this range is completely on its own, just insert
-            insertInd = bisect_left(self.lower_cuts, key.lowerCut)
-            self.ranges.insert(insertInd, key)
-            self.lower_cuts.insert(insertInd, key.lowerCut)
-            self.upper_cuts.insert(insertInd, key.upperCut)
-            if not isinstance(val, set):
-                self.items.insert(insertInd, set([val]))
+        lo, hi = self._window(key)
+        lowerKey = key.lowerCut.key
+        upperKey = key.upperCut.key
+        newRanges = []
+        newItems = []
+        # Start of the part of the key not yet placed
+        curCut = key.lowerCut
+        for i in range(lo, hi):
+            # The part of this range under the key
+            clipLower = self.lower_keys[i] < lowerKey
+            clipUpper = self.upper_keys[i] > upperKey
+            lowerCut = key.lowerCut if clipLower else self.lower_cuts[i]
+            upperCut = key.upperCut if clipUpper else self.upper_cuts[i]
+            if curCut.key < lowerCut.key:
+                # Fill the gap before this range
+                newRanges.append(Range(curCut, lowerCut))
+                newItems.append(set([val]))
+            if clipLower or clipUpper:
+                newRanges.append(Range(lowerCut, upperCut))
             else:
-                self.items.insert(insertInd, val)
-            return
-        else:
-            # If this range has some overlap with existing ranges
-            ovlapLowerInd = max(bisect_left(self.lower_cuts, key.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, key.upperCut)
-            # Create queue ranges to add
-            addRanges = deque()
-            # Create queue of items to add
-            addItems = deque()
-            # Keep track of next lower cutpoint to add
-            nextLowerCut = key.lowerCut
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = key.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        # Add in a Range between the next LowerCut and
-                        # the beginning of this intersection if necessary
-                        if nextLowerCut < intersect.lowerCut:
-                            addRanges.append(Range(nextLowerCut, intersect.lowerCut))
-                            addItems.append(val)
-                            nextLowerCut = intersect.lowerCut
-                        if intersect == self.ranges[i]:
-                            ## If key encompassing existing Range ##
-                            # Add item to this range
-                            self.items[i].add(val)
-                            # Change the next lower cut
-                            nextLowerCut = intersect.upperCut
-                        elif self.lower_cuts[i] == intersect.lowerCut:
-                            ## If key upper cutpoint enclosed by existing Range ##
-                            # Add in the rest of the original Range
-                            if self.upper_cuts[i] > intersect.upperCut:
-                                addRanges.append(Range(intersect.upperCut,
-                                                       self.upper_cuts[i]))
-                                addItems.append(set(self.items[i]))
-                            # Define original part to be shorter                            
-                            self.upper_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(self.lower_cuts[i],
-                                                   intersect.upperCut)
-                            self.items[i].add(val)
-                            # Change the next lower cut
-                            nextLowerCut = intersect.upperCut
-                        elif self.upper_cuts[i] == intersect.upperCut:
-                            ## If key lower cutpoint enclosed by existing Range ##
-                            # Add in the rest of the original Range
-                            if intersect.lowerCut > self.lower_cuts[i]:
-                                addRanges.append(Range(self.lower_cuts[i], intersect.lowerCut))
-                                addItems.append(set(self.items[i]))
-                            # Define original part to be shorter
-                            self.lower_cuts[i] = intersect.lowerCut
-                            self.ranges[i] = Range(self.lower_cuts[i],
-                                                   intersect.upperCut)
-                            self.items[i].add(val)
-                            # Change the next lower cut
-                            nextLowerCut = intersect.upperCut
-                        else:
-                            # If entire key enclosed by existing Range
-                            # Add in lower part of original Range
-                            addRanges.append(Range(self.lower_cuts[i], intersect.lowerCut))
-                            addItems.append(set(self.items[i]))
-                            # Add in upper part of original Range
-                            addRanges.append(Range(intersect.upperCut, self.upper_cuts[i]))
-                            addItems.append(set(self.items[i]))
-                            # Define original part to be middle
-                            self.lower_cuts[i] = intersect.lowerCut
-                            self.upper_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(intersect.lowerCut,intersect.upperCut)
-                            self.items[i].add(val)
-                            # Change the next lower cut
-                            nextLowerCut = intersect.upperCut
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
-            # Put in a last range if necessary
-            if nextLowerCut < key.upperCut:
-                addRanges.append(Range(nextLowerCut, key.upperCut))
-                addItems.append(val)
-            # Use recursive call to place the pairs, which now
-            # should not overlap with any other ranges
-            self.recurseAdd = True
-            while len(addRanges) > 0:
-                self.put(addRanges.pop(),addItems.pop())
-            self.recurseAdd = False
-    def remove(self, aRange):
-        """ Removes a range and its value(s) from the range set
+                newRanges.append(self.ranges[i])
+            bucket = set(self.items[i])
+            bucket.add(val)
+            newItems.append(bucket)
+            curCut = upperCut
+        if curCut.key < upperKey:
+            # Fill the rest of the key
+            newRanges.append(key if curCut is key.lowerCut else \
+                             Range(curCut, key.upperCut))
+            newItems.append(set([val]))
+        self._replaceWindow(key, lo, hi, newRanges, newItems)
+    def _copyItem(self, item):
+        """ Returns the bucket to give a second piece split off a range """
+        return set(item)
+    def _newItem(self, val):
+        """ Returns the bucket stored for a value loaded into the map """
+        if not isinstance(val, Hashable):
+            raise TypeError("value not hashable")
+        return set([val])
+    def _thaw(self):
+        """ Copies buckets read from a file (see load) into a list of
+        sets, so that they can be changed """
+        if isinstance(self.items, MappedItems):
+            self.items = [set(bucket) for bucket in self.items]
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def from_array(rangeArray, items, backend = "list"):
+        """ Bulk-loads a RangeBucketMap from a RangeArray and an item for
+        each of its ranges. If the ranges are sorted and do not overlap,
+        they are stored as they are (see RangeMap.from_array). Otherwise
+        they are loaded through from_items
 
         Parameters
         ----------
-        aRange : A Range object
-            The Range to remove
+        rangeArray : RangeArray
+            Ranges to load into the map
+        items : Iterable
+            The item for each range. Items must be hashable
+        backend : string
+            Backing store for the new map (see RangeMap)
 
         Raises
         ------
+        TypeError
+            If rangeArray is not a RangeArray or an item is not hashable
         ValueError
-            If removing range of type not compatible with previously
-            added ranges
+            If there is not one item for each range
+
+        Returns
+        -------
+        A RangeBucketMap containing the ranges and items
+        """
+        return RangeMap._fromArray(RangeBucketMap(backend = backend),
+                                   rangeArray, items, RangeBucketMap.from_items)
+    @staticmethod
+    def from_items(pairs, backend = "list"):
+        """ Bulk-loads a RangeBucketMap from an iterable of (Range, value)
+        pairs. All elementary segments and their buckets are computed in a
+        single sweep over the sorted cut points, giving the same map as
+        putting each pair in turn
+
+        Parameters
+        ----------
+        pairs : Iterable of (Range, value) tuples
+            Key/value pairs to load. Values must be hashable
+        backend : string
+            Backing store for the new map (see RangeMap)
+
+        Raises
+        ------
         TypeError
-            If not a Range
+            If any of the keys is not a Range or a value is not hashable
+        ValueError
+            If the keys are not of compatible types
+
+        Returns
+        -------
+        A RangeBucketMap containing the pairs
         """
-        if not isinstance(aRange, Range):
-            raise TypeError("aRange is not a Range")
-        elif aRange.isEmpty():
-            # Skip if this is an empty range
-            return
-        # Check for compatibility of types if necessary
-        if len(self) > 0:
-            if not (issubclass(aRange.lowerCut.theType,
-                               self.ranges[0].lowerCut.theType) or \
-                    issubclass(self.ranges[0].lowerCut.theType,
-                               aRange.lowerCut.theType)):
+        # (cut key, is upper, Cut, value) for every endpoint
+        events = []
+        theType = None
+        for key, val in pairs:
+            if not isinstance(key, Range):
+                raise TypeError("key is not a Range")
+            elif not isinstance(val, Hashable):
+                raise TypeError("value not hashable")
+            elif key.isEmpty():
+                # Skip if this is an empty range
+                continue
+            # Check for compatibility of types before the events are sorted
+            elif theType is None:
+                theType = key.lowerCut.theType
+            elif not (issubclass(key.lowerCut.theType, theType) or \
+                      issubclass(theType, key.lowerCut.theType)):
                 raise ValueError("Range not compatible with previously added ranges")
-        # Check if the range actually overlaps with the key set
-        if not self.overlaps(aRange):
-            return
-        else:
-            # There's some overlap, so deal with that
-            # Determine where overlap occurs
-            ovlapLowerInd = max(bisect_left(self.lower_cuts,
-                                            aRange.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, aRange.upperCut)
-            # Create queue of indices marked for removal
-            removeRanges = deque()
-            # Create queue of ranges to add
-            addRanges = deque()
-            # Create queue of items to add with the addRanges
-            addItems = deque()
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = aRange.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        if intersect == self.ranges[i]:
-                            # Mark range for removal
-                            removeRanges.append(i)
-                        elif self.lower_cuts[i] == intersect.lowerCut:
-                            # If equal on the left cutpoint, subtract
-                            # out left part
-                            self.lower_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(intersect.upperCut,
-                                                   self.upper_cuts[i])
-                        elif self.upper_cuts[i] == intersect.upperCut:
-                            # If equal on right cutpoint, subtract out
-                            # right part
-                            self.upper_cuts[i] = intersect.lowerCut
-                            self.ranges[i] = Range(self.lower_cuts[i],
-                                                   intersect.lowerCut)
-                        else:
-                            # If in the middle, split into two parts, putting
-                            # both in add queue and placing the old range index
-                            # into the remove queue
-                            addRanges.append(Range(self.lower_cuts[i],
-                                                   intersect.lowerCut))
-                            addItems.append(set(self.items[i]))
-                            addRanges.append(Range(intersect.upperCut,
-                                                   self.upper_cuts[i]))
-                            addItems.append(set(self.items[i]))
-                            removeRanges.append(i)
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
-            # Remove any ranges that are marked for removal
-            while len(removeRanges) > 0:
-                removeInd = removeRanges.pop()
-                self.ranges.pop(removeInd)
-                self.lower_cuts.pop(removeInd)
-                self.upper_cuts.pop(removeInd)
-                self.items.pop(removeInd)
-            # Add any pairs that need to be added
-            self.recurseAdd = True
-            while len(addRanges) > 0:
-                self.put(addRanges.pop(), addItems.pop())        
-            self.recurseAdd = False
+            events.append((key.lowerCut.key, key.lowerCut, val, False))
+            events.append((key.upperCut.key, key.upperCut, val, True))
+        events.sort(key = lambda event: event[0])
+        newRanges = []
+        newItems = []
+        # Count of covering ranges for each value in the current bucket
+        bucket = {}
+        # Set of the values in the current bucket, shared by the segments
+        # in a row that hold the same values. Buckets are never changed in
+        # place, so it is only rebuilt when a value comes or goes
+        curItems = None
+        prevCut = None
+        i = 0
+        while i < len(events):
+            curKey = events[i][0]
+            curCut = events[i][1]
+            if len(bucket) > 0:
+                # Close off the segment ending at this cut
+                if curItems is None:
+                    curItems = set(bucket)
+                newRanges.append(Range(prevCut, curCut))
+                newItems.append(curItems)
+            # Apply all events at this cut
+            while i < len(events) and events[i][0] == curKey:
+                val = events[i][2]
+                if events[i][3]:
+                    bucket[val] -= 1
+                    if bucket[val] == 0:
+                        del bucket[val]
+                        curItems = None
+                else:
+                    count = bucket.get(val, 0)
+                    if count == 0:
+                        curItems = None
+                    bucket[val] = count + 1
+                i += 1
+            prevCut = curCut
+        newMap = RangeBucketMap(backend = backend)
+        newMap._splice(0, 0, newRanges, newItems)
+        return newMap
+    @staticmethod
+    def load(path, mmap = True):
+        """ Loads a map written by RangeBucketMap.save. If memory mapped,
+        the map reads its cuts and bucket index straight from the file's
+        pages, so loading only costs unpickling the distinct items, and
+        processes loading the same file share the memory. Until the map
+        is first changed, each access to a bucket builds it from the
+        index as a frozenset; the change copies the columns out and turns
+        the buckets into sets, once. Python 2 has no memoryview.cast, so
+        there the columns are always copied into arrays and loading
+        costs O(n).
+
+        The distinct items are stored with pickle, so only load files
+        from trusted sources: unpickling a crafted file can run
+        arbitrary code
+
+        Parameters
+        ----------
+        path : string
+            The file to read
+        mmap : boolean
+            Whether to memory map the file rather than read it in
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold a RangeBucketMap
+
+        Returns
+        -------
+        The RangeBucketMap, with the "compact" backend
+        """
+        return RangeMap._load(RangeBucketMap(backend = "compact"), path, mmap)
@@ -1,13 +1,24 @@
-from bisect import bisect_left
+from heapq import heappush, heappop
 from Ranger.src.Range.Range import Range
-from collections import deque
+from Ranger.src.Collections.ChunkedList import makeList, bisect_left, \
+     bisect_right
+from Ranger.src.Collections.CutArray import makeCutColumns, RangeView, \
+     endpointColumns, checkPoints, searchPoints, walkPoints, walkWindow, \
+     nearestRanges, nearestRangesMany, overlapKind, LEFT_OVERLAP, numpy, \
+     SCALAR_BATCH
+from Ranger.src.Collections.ColumnFile import writeColumns, readColumns, \
+     MappedItems
+from Ranger.src.Collections.RangeArray import RangeArray
 
 class RangeMap(object):
     """ Class used to represent a mapping of disjoint ranges to some objects.
     Ranges do not coalesce. If a new Range is added over an existing Range,
     it overwrites the overlapping part of the existing Range
     """
-    def __init__(self, rangeDict = None):
+    # Kind of collection written by save
+    _FILE_KIND = "map"
+    def __init__(self, rangeDict = None, backend = "list", trusted = False,
+                 pool = None):
         """ Instantiates a RangeMap
         
         Parameters
@@ -16,14 +27,38 @@ class RangeMap(object):
             Dictionary to start off the RangeMap with. Note that this will
             not be traversed in any particular order, so it may result in
             unexpected behavior if instantiated with any overlapping ranges
+        backend : string
+            Backing store for the map, either "list" (plain lists),
+            "chunked" (O(log n) inserts and removals, for large maps
+            under heavy mutation) or "compact" (cuts held in numeric
+            arrays, for large maps over an integer or float domain)
+        trusted : boolean
+            If True, ranges put or removed are trusted to be of a type
+            compatible with the map, and are not checked
+        pool : InternPool, optional
+            If given, the ranges stored in the map, and their cuts, are
+            shared through the pool with other equal ranges and cuts.
+            Ignored for the "compact" backend, which does not store them
+
+        Raises
+        ------
+        ValueError
+            If the backend is not known
         """
-        # Holds lower and upper cut points of ranges
-        self.lower_cuts = []
-        self.upper_cuts = []
-        # Holds the actual range objects that are the keys
-        self.ranges = []
+        self.backend = backend
+        self.trusted = trusted
+        self.pool = pool
+        # Holds lower and upper cut points of ranges, their sort keys
+        # (which all searches run on) and the actual range objects that
+        # are the keys
+        (self.lower_cuts, self.upper_cuts, self.lower_keys, self.upper_keys,
+         self.ranges) = makeCutColumns(backend)
         # Holds items mapping to each range
-        self.items = []
+        self.items = makeList(backend)
+        # Numpy endpoint columns and item array for get_many, built on
+        # demand and dropped whenever the map changes
+        self._columns = None
+        self._itemArray = None
         if rangeDict is not None:
             for rangeKey, val in rangeDict.iteritems():
                 self.put(rangeKey, val)
@@ -35,6 +70,8 @@ class RangeMap(object):
         self.remove(key)
     def __iter__(self):
         return iter(self.ranges)
+    def __reversed__(self):
+        return reversed(self.ranges)
     def __eq__(self, other):
         if not isinstance(other, RangeMap): return False
         elif len(self) != len(other): return False
@@ -83,11 +120,12 @@ class RangeMap(object):
         # Get the index+1 of the highest lower cut <= to the value or its
         # lower cutpoint and check if the value contained
         if isinstance(val, Range):
-            lower_ind = max(bisect_left(self.lower_cuts, val.lowerCut)-1,0)
+            lower_ind = max(bisect_left(self.lower_keys, val.lowerCut.key)-1,0)
             return self.ranges[lower_ind].encloses(val)
         else:
-            lower_ind = max(bisect_left(self.lower_cuts, val)-1,0)
-            return self.ranges[lower_ind].contains(val)
+            valKey = self._valueKey(val)
+            lower_ind = max(bisect_left(self.lower_keys, valKey)-1,0)
+            return self.lower_keys[lower_ind] < valKey < self.upper_keys[lower_ind]
     def get(self, key):
         """ Get the item(s) corresponding to a given key. The key can be a
         Range or a single value that is within a Range
@@ -112,29 +150,254 @@ class RangeMap(object):
         elif isinstance(key, Range):
             # If this is a single value
             returnSet = set()
+            lowerKey = key.lowerCut.key
+            upperKey = key.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
             # Get the bounding indices
-            ovlapLowerInd = max(bisect_left(self.lower_cuts, key.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, key.upperCut)
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = key.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        # If overlapping with this range, put its
-                        # item in the return set
-                        returnSet.add(self.items[i])
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
+            lo, hi = self._window(key)
+            for i in range(lo, hi):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    # If overlapping with this range, put its
+                    # item in the return set
+                    returnSet.add(self.items[i])
             # Return the set of items
             return returnSet
         else:
             # If this is a single value
             # Get the index of the range containing the value
-            lower_ind = max(bisect_left(self.lower_cuts, key)-1,0)
+            lower_ind = max(bisect_left(self.lower_keys, self._valueKey(key))-1,0)
             # Return the item at that value
             return set([self.items[lower_ind]])
-            
+    def get_many(self, points, default = None, returnIndex = False):
+        """ Gets the item of the range containing each of a batch of
+        single values. Sorted input is answered with a single forward walk
+        over the ranges, resuming each search where the last one ended;
+        unsorted input is searched value by value. A numpy array is
+        looked up with numpy.searchsorted instead
+
+        Parameters
+        ----------
+        points : Iterable or numpy array of single values
+            The values to look up
+        default : object
+            Returned for values not in any range
+        returnIndex : boolean
+            If True, return the position of the containing range (or -1)
+            instead of its item
+
+        Raises
+        ------
+        ValueError
+            If a value type not compatible with the ranges
+
+        Returns
+        -------
+        list of items (or positions), in the order of the points. If the
+        points are a numpy array, a numpy array is returned
+        """
+        if numpy is not None and isinstance(points, numpy.ndarray):
+            if len(self) == 0:
+                inds = numpy.full(len(points), -1, dtype = numpy.intp)
+            else:
+                checkPoints(self.lower_cuts[0].theType, points)
+                columns = self._pointColumns(len(points))
+                if columns is None:
+                    inds = numpy.fromiter(walkPoints(self.lower_cuts,
+                                                     self.lower_keys,
+                                                     self.upper_keys,
+                                                     points.tolist()),
+                                          dtype = numpy.intp,
+                                          count = len(points))
+                else:
+                    inds = searchPoints(columns, points)
+            if returnIndex:
+                return inds
+            if self._itemArray is None and self._columns is None:
+                # A small batch, so pick out just its items
+                found = numpy.empty(len(points), dtype = object)
+                items = self.items
+                for i, ind in enumerate(inds):
+                    found[i] = default if ind < 0 else items[ind]
+                return found
+            if self._itemArray is None:
+                # One spare slot at the end, which index -1 picks out
+                self._itemArray = numpy.empty(len(self)+1, dtype = object)
+                for i, item in enumerate(self.items):
+                    self._itemArray[i] = item
+            items = self._itemArray
+            items[-1] = default
+            result = items[inds]
+            items[-1] = None
+            return result
+        miss = -1 if returnIndex else default
+        if len(self) == 0:
+            return [miss for point in points]
+        items = self.items
+        return [miss if ind < 0 else (ind if returnIndex else items[ind]) \
+                for ind in walkPoints(self.lower_cuts, self.lower_keys,
+                                      self.upper_keys, points)]
+    def iter_from(self, val, reverse = False):
+        """ Iterates over the part of the map from a value on, or up to it
+        if reverse is True
+
+        Parameters
+        ----------
+        val : comparable
+            The point to iterate from, inclusive
+        reverse : boolean
+            If True, iterates back from the value to the start of the map
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        Generator of (Range, item) on the value's side of it, with the
+        range clipped to it
+        """
+        if reverse:
+            return self.iter_window(None, val, True)
+        return self.iter_window(val, None)
+    def iter_window(self, start = None, end = None, reverse = False):
+        """ Iterates over the part of the map within [start, end]. The
+        first range is found with a single bisect and the rest are
+        produced lazily, so scanning a window costs nothing for the ranges
+        outside it
+
+        Parameters
+        ----------
+        start : comparable, optional
+            The starting point for iterating, inclusive. Unbounded if None
+        end : comparable, optional
+            The ending point for iterating, inclusive. Unbounded if None
+        reverse : boolean
+            If True, iterates from the end of the window to the start
+
+        Raises
+        ------
+        ValueError
+            If start or end not compatible with the ranges
+
+        Returns
+        -------
+        Generator of (Range intersecting [start,end], item), with the
+        range clipped to the window
+        """
+        items = self.items
+        for ind, aRange in walkWindow(self.lower_cuts, self.upper_cuts,
+                                      self.lower_keys, self.upper_keys,
+                                      self.ranges, start, end, reverse):
+            yield aRange, items[ind]
+    def join(self, other, how = "inner"):
+        """ Joins this map with another RangeMap (or RangeBucketMap) by
+        sweeping the ranges of both in step, so that joining maps of n
+        and m ranges costs O(n + m + output) rather than a lookup per
+        range
+
+        Parameters
+        ----------
+        other : RangeMap object
+            The map to join with
+        how : string
+            Either "inner", to produce only the parts of this map that
+            the other map covers, or "left", to also produce the parts it
+            does not cover, with a right value of None
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeMap
+        ValueError
+            If how is not known, or the ranges of the maps are not of
+            compatible types
+
+        Returns
+        -------
+        Generator of (Range, value in this map, value in the other map),
+        ordered by start point
+        """
+        if not isinstance(other, RangeMap):
+            raise TypeError("other is not a RangeMap")
+        elif how not in ("inner", "left"):
+            raise ValueError("Unknown join: %s" % how)
+        if len(self) > 0 and len(other) > 0:
+            theType = self.lower_cuts[0].theType
+            otherType = other.lower_cuts[0].theType
+            if not (issubclass(otherType, theType) or issubclass(theType, otherType)):
+                raise ValueError("Range not compatible with previously added ranges")
+        return self._join(other, how == "left")
+    def nearest(self, val, k = 1, distFunc = lambda x1, x2: abs(x1-x2)):
+        """ Finds the k ranges nearest a single value or Range object,
+        searching outward from where it falls in the map, in O(log n + k).
+        Open bounds are allowed; in an integer domain the distance to an
+        open bound is measured to the nearest integer inside it
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+            What to measure distances from
+        k : int
+            Number of ranges to find
+        distFunc : callable
+            Function that calculates the distance between two points in
+            the domain of the ranges
+
+        Raises
+        ------
+        ValueError
+            If k is less than 1, or the value type not compatible with
+            the ranges
+
+        Returns
+        -------
+        list of up to k (Range, item, distance) tuples, from nearest to
+        furthest, with ranges overlapping the value at distance 0
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if len(self) == 0:
+            return []
+        found = nearestRanges(self.lower_cuts, self.upper_cuts,
+                              self.lower_keys, self.upper_keys,
+                              val, k, distFunc)[0]
+        return [(self.ranges[ind], self.items[ind], dist) for ind, dist in found]
+    def nearest_many(self, vals, k = 1, distFunc = lambda x1, x2: abs(x1-x2)):
+        """ Batch version of nearest. Sorted queries are answered in a
+        single forward walk over the map
+
+        Parameters
+        ----------
+        vals : Iterable of single values or Range objects
+            What to measure distances from
+        k : int
+            Number of ranges to find for each value
+        distFunc : callable
+            Function that calculates the distance between two points in
+            the domain of the ranges
+
+        Raises
+        ------
+        ValueError
+            If k is less than 1, or a value type not compatible with the
+            ranges
+
+        Returns
+        -------
+        list with, for each value, the list of (Range, item, distance)
+        tuples of its nearest ranges
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if len(self) == 0:
+            return [[] for val in vals]
+        return [[(self.ranges[ind], self.items[ind], dist) for ind, dist in found] \
+                for found in nearestRangesMany(self.lower_cuts, self.upper_cuts,
+                                               self.lower_keys, self.upper_keys,
+                                               vals, k, distFunc)]
     def overlaps(self, val):
         """ Returns true if any of the ranges at least partially overlap
         the given value, which can be a single value or a Range object
@@ -156,16 +419,20 @@ class RangeMap(object):
         # Get the index+1 of the highest lower cut <= to the value or its
         # lower cutpoint and check if the value overlaps
         if isinstance(val, Range):
-            lower_ind = bisect_left(self.lower_cuts, val.lowerCut)-1
-            upper_ind = bisect_left(self.lower_cuts, val.upperCut)
-            for i in range(lower_ind,upper_ind):
-                if val.isConnected(self.ranges[i]):
-                    if not self.ranges[i].intersection(val).isEmpty():
-                        return True
+            lowerKey = val.lowerCut.key
+            upperKey = val.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
+            for i in range(bisect_right(upperKeys, lowerKey),
+                           bisect_left(lowerKeys, upperKey)):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    return True
             return False
         else:
-            lower_ind = bisect_left(self.lower_cuts,val)-1
-            return self.ranges[lower_ind].contains(val)        
+            valKey = self._valueKey(val)
+            lower_ind = bisect_left(self.lower_keys, valKey)-1
+            return lower_ind >= 0 and self.upper_keys[lower_ind] > valKey
     def put(self, key, val):
         """ Creates a mapping from a Range to a value. Note that if the
         key Range overlaps any existing ranges, it will replace those
@@ -182,78 +449,13 @@ class RangeMap(object):
         ------
         TypeError
             If the key is not a Range object
+        ValueError
+            If the key type not compatible with previously added ranges
         """
-        if not isinstance(key, Range):
-            raise TypeError("key is not a Range")
-        elif key.isEmpty():
-            # Skip if this is an empty range
-            return
-        # Figure out where to the key/value
-        if not self.overlaps(key):
-            # If this range is completely on its own, just insert
-            insertInd = bisect_left(self.lower_cuts, key.lowerCut)
-            self.ranges.insert(insertInd, key)
-            self.lower_cuts.insert(insertInd, key.lowerCut)
-            self.upper_cuts.insert(insertInd, key.upperCut)
-            self.items.insert(insertInd, val)
+        if not self._checkRange(key):
             return
-        else:
-            # If this range has some overlap with existing ranges
-            ovlapLowerInd = max(bisect_left(self.lower_cuts, key.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, key.upperCut)
-            # Create queue or indices marked for removal
-            removeRanges = deque()
-            # Create queue ranges to add
-            addRanges = deque()
-            # Create queue of items to add
-            addItems = deque()
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = key.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        if intersect == self.ranges[i]:
-                            # Mark range for removal
-                            removeRanges.append(i)
-                        elif self.lower_cuts[i] == intersect.lowerCut:
-                            # If equal on left cutpoint, subtract out left
-                            # part
-                            self.lower_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(intersect.upperCut,
-                                                   self.upper_cuts[i])
-                        elif self.upper_cuts[i] == intersect.upperCut:
-                            # If equal on right cutpoint, subtract out
-                            # right part
-                            self.upper_cuts[i] = intersect.lowerCut
-                            self.ranges[i] = Range(self.lower_cuts[i],
-                                                   intersect.lowerCut)
-                        else:
-                            # If in the middle, split into two parts, putting
-                            # both in add queue and placing the old range index
-                            # in the remove queue
-                            addRanges.append(Range(self.lower_cuts[i],
-                                                   intersect.lowerCut))
-                            addRanges.append(Range(intersect.upperCut,
-                                                   self.upper_cuts[i]))
-                            addItems.append(self.items[i])
-                            addItems.append(self.items[i])
-                            removeRanges.append(i)
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
-            # Remove any ranges that are marked for removal
-            while len(removeRanges) > 0:
-                removeInd = removeRanges.pop()
-                self.ranges.pop(removeInd)
-                self.lower_cuts.pop(removeInd)
-                self.upper_cuts.pop(removeInd)
-                self.items.pop(removeInd)
-            addItems.append(val)
-            addRanges.append(key)
-            # Use recursive call to place the pairs, which now
-            # should not overlap with any other ranges
-            while len(addRanges) > 0:
-                self.put(addRanges.pop(),addItems.pop())
+        lo, hi = self._window(key)
+        self._replaceWindow(key, lo, hi, [key], [val])
     def remove(self, aRange):
         """ Removes a range and its value from the range set
 
@@ -270,77 +472,45 @@ class RangeMap(object):
         TypeError
             If not a Range
         """
-        if not isinstance(aRange, Range):
-            raise TypeError("aRange is not a Range")
-        elif aRange.isEmpty():
-            # Skip if this is an empty range
+        if not self._checkRange(aRange):
             return
-        # Check for compatibility of types if necessary
-        if len(self) > 0:
-            if not (issubclass(aRange.lowerCut.theType,
-                               self.ranges[0].lowerCut.theType) or \
-                    issubclass(self.ranges[0].lowerCut.theType,
-                               aRange.lowerCut.theType)):
-                raise ValueError("Range not compatible with previously added ranges")
-        # Check if the range actually overlaps with the key set
-        if not self.overlaps(aRange):
-            return
-        else:
-            # There's some overlap, so deal with that
-            # Determine where overlap occurs
-            ovlapLowerInd = max(bisect_left(self.lower_cuts,
-                                            aRange.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, aRange.upperCut)
-            # Create queue of indices marked for removal
-            removeRanges = deque()
-            # Create queue of ranges to add
-            addRanges = deque()
-            # Create queue of items to add with the addRanges
-            addItems = deque()
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = aRange.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        if intersect == self.ranges[i]:
-                            # Mark range for removal
-                            removeRanges.append(i)
-                        elif self.lower_cuts[i] == intersect.lowerCut:
-                            # If equal on the left cutpoint, subtract
-                            # out left part
-                            self.lower_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(intersect.upperCut,
-                                                   self.upper_cuts[i])
-                        elif self.upper_cuts[i] == intersect.upperCut:
-                            # If equal on right cutpoint, subtract out
-                            # right part
-                            self.upper_cuts[i] = intersect.lowerCut
-                            self.ranges[i] = Range(self.lower_cuts[i],
-                                                   intersect.lowerCut)
-                        else:
-                            # If in the middle, split into two parts, putting
-                            # both in add queue and placing the old range index
-                            # into the remove queue
-                            addRanges.append(Range(self.lower_cuts[i],
-                                                   intersect.lowerCut))
-                            addItems.append(self.items[i])
-                            addRanges.append(Range(intersect.upperCut,
-                                                   self.upper_cuts[i]))
-                            addItems.append(self.items[i])
-                            removeRanges.append(i)
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
-            # Remove any ranges that are marked for removal
-            while len(removeRanges) > 0:
-                removeInd = removeRanges.pop()
-                self.ranges.pop(removeInd)
-                self.lower_cuts.pop(removeInd)
-                self.upper_cuts.pop(removeInd)
-                self.items.pop(removeInd)
-            # Add any pairs that need to be added
-            while len(addRanges) > 0:
-                self.put(addRanges.pop(), addItems.pop())
+        lo, hi = self._window(aRange)
+        if lo < hi:
+            self._replaceWindow(aRange, lo, hi, [], [])
+    def save(self, path):
+        """ Writes the map to a binary, columnar file (see ColumnFile),
+        which load can memory map. The distinct items are pickled into a
+        value table, which each range refers to by position
+
+        Parameters
+        ----------
+        path : string
+            The file to write
+
+        Raises
+        ------
+        ValueError
+            If the map is not over an integer or float domain
+        """
+        writeColumns(path, self._FILE_KIND, self.lower_cuts, self.upper_cuts,
+                     self.items)
+    def to_array(self):
+        """ Returns the ranges of the map as a RangeArray, in the same
+        order as the items. With the "compact" backend, the columns are
+        copied out without creating any Range or Cut objects
+
+        Raises
+        ------
+        ImportError
+            If numpy is not installed
+        ValueError
+            If the map is not over an integer or float domain
+
+        Returns
+        -------
+        RangeArray of the ranges, in order
+        """
+        return RangeArray.from_cuts(self.lower_cuts, self.upper_cuts)
     def whichOverlaps(self, val):
         """ Returns which of the Ranges overlap with a single value or
         Range object
@@ -364,15 +534,360 @@ class RangeMap(object):
         # to set
         overlap_set = set()
         if isinstance(val, Range):
-            lower_ind = bisect_left(self.lower_cuts, val.lowerCut)-1
-            upper_ind = bisect_left(self.lower_cuts, val.upperCut)
-            for i in range(lower_ind,upper_ind):
-                if val.isConnected(self.ranges[i]):
-                    if not self.ranges[i].intersection(val).isEmpty():
-                        overlap_set.add(self.ranges[i])
+            lowerKey = val.lowerCut.key
+            upperKey = val.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
+            for i in range(bisect_right(upperKeys, lowerKey),
+                           bisect_left(lowerKeys, upperKey)):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    overlap_set.add(self.ranges[i])
             return overlap_set
         else:
-            lower_ind = bisect_left(self.lower_cuts,val)-1
-            if self.ranges[lower_ind].contains(val):
+            valKey = self._valueKey(val)
+            lower_ind = bisect_left(self.lower_keys, valKey)-1
+            if lower_ind >= 0 and self.upper_keys[lower_ind] > valKey:
                 overlap_set.add(self.ranges[lower_ind])
             return overlap_set
+    def _checkRange(self, aRange):
+        """ Checks that a range can be put in or removed from the map,
+        returning False if it is empty and there is nothing to do """
+        if not isinstance(aRange, Range):
+            raise TypeError("aRange is not a Range")
+        elif aRange.isEmpty():
+            return False
+        if len(self) > 0 and not self.trusted:
+            theType = self.lower_cuts[0].theType
+            rangeType = aRange.lowerCut.theType
+            if not (issubclass(rangeType, theType) or issubclass(theType, rangeType)):
+                raise ValueError("Range not compatible with previously added ranges")
+        return True
+    def _copyItem(self, item):
+        """ Returns the item to give a second piece split off a range """
+        return item
+    def _join(self, other, keepUnmatched):
+        """ Generator behind join. For each range of this map, the other
+        map's ranges overlapping it are walked from the first one that
+        ends after its start, which only ever moves forward """
+        lowerKeys = self.lower_keys
+        upperKeys = self.upper_keys
+        otherLowerKeys = other.lower_keys
+        otherUpperKeys = other.upper_keys
+        otherLen = len(other)
+        # First range of the other map that may overlap the current one
+        start = 0
+        for ind in range(len(self)):
+            lowerKey = lowerKeys[ind]
+            upperKey = upperKeys[ind]
+            while start < otherLen and otherUpperKeys[start] <= lowerKey:
+                start += 1
+            # Where the part of this range not yet produced begins
+            curCut = self.lower_cuts[ind]
+            curKey = lowerKey
+            otherInd = start
+            while otherInd < otherLen and otherLowerKeys[otherInd] < upperKey:
+                otherLowerKey = otherLowerKeys[otherInd]
+                if otherLowerKey > curKey:
+                    if keepUnmatched:
+                        yield (Range(curCut, other.lower_cuts[otherInd]),
+                               self.items[ind], None)
+                    curCut = other.lower_cuts[otherInd]
+                    curKey = otherLowerKey
+                if otherUpperKeys[otherInd] < upperKey:
+                    upperCut = other.upper_cuts[otherInd]
+                else:
+                    upperCut = self.upper_cuts[ind]
+                yield (Range(curCut, upperCut), self.items[ind],
+                       other.items[otherInd])
+                curCut = upperCut
+                curKey = upperCut.key
+                otherInd += 1
+            if keepUnmatched and curKey < upperKey:
+                yield Range(curCut, self.upper_cuts[ind]), self.items[ind], None
+    def _newItem(self, val):
+        """ Returns the item stored for a value loaded into the map """
+        return val
+    def _replaceWindow(self, aRange, lo, hi, ranges, items):
+        """ Replaces the part of the map under a range, where the ranges
+        from lo to hi overlap it (see _window), with lists of ranges and
+        their items, in a single splice. The parts of the ranges at either
+        end of the window that stick out past the range are kept """
+        lowerKey = aRange.lowerCut.key
+        upperKey = aRange.upperCut.key
+        newRanges = []
+        newItems = []
+        if lo < hi and self.lower_keys[lo] < lowerKey:
+            newRanges.append(Range(self.lower_cuts[lo], aRange.lowerCut))
+            newItems.append(self.items[lo])
+        newRanges.extend(ranges)
+        newItems.extend(items)
+        if lo < hi and self.upper_keys[hi-1] > upperKey:
+            newRanges.append(Range(aRange.upperCut, self.upper_cuts[hi-1]))
+            if lo == hi-1 and self.lower_keys[lo] < lowerKey:
+                # Both ends were split off the same range
+                newItems.append(self._copyItem(self.items[lo]))
+            else:
+                newItems.append(self.items[hi-1])
+        self._splice(lo, hi, newRanges, newItems)
+    def _pointColumns(self, nPoints):
+        """ Returns the numpy endpoint columns of the (non-empty) map for a
+        batch of nPoints points, building them if needed. A batch much
+        smaller than the map is cheaper to search point by point than to
+        build the columns for, so None is returned for it unless the cuts
+        are already held in numeric arrays. The columns are kept until the
+        map next changes
+        """
+        if self._columns is None:
+            if nPoints*SCALAR_BATCH < len(self) and \
+               not isinstance(self.ranges, RangeView):
+                return None
+            self._columns = endpointColumns(self.lower_cuts, self.upper_cuts,
+                                            self.lower_keys, self.upper_keys)
+        return self._columns
+    def _splice(self, lo, hi, ranges, items):
+        """ Replaces the ranges and items at positions lo to hi with lists
+        of ranges and their items, keeping the cut and key lists in step.
+        Every change to the stored ranges goes through here, so that the
+        map works the same on any backend
+        """
+        self._columns = None
+        self._itemArray = None
+        self._thaw()
+        if self.pool is not None and not isinstance(self.ranges, RangeView):
+            # Store the shared copies of the ranges
+            pool = self.pool
+            ranges = [pool.range(aRange) for aRange in ranges]
+        lowerCuts = [aRange.lowerCut for aRange in ranges]
+        upperCuts = [aRange.upperCut for aRange in ranges]
+        self.lower_cuts[lo:hi] = lowerCuts
+        self.upper_cuts[lo:hi] = upperCuts
+        if not isinstance(self.ranges, RangeView):
+            self.lower_keys[lo:hi] = [cut.key for cut in lowerCuts]
+            self.upper_keys[lo:hi] = [cut.key for cut in upperCuts]
+            self.ranges[lo:hi] = ranges
+        self.items[lo:hi] = items
+    def _thaw(self):
+        """ Copies items read from a file (see load) into a list, so that
+        they can be changed """
+        if isinstance(self.items, MappedItems):
+            self.items = list(self.items)
+    def _valueKey(self, val):
+        """ Returns the sort key of a single value, checking once that its
+        type is compatible with the ranges """
+        self.lower_cuts[0]._validate_query_pt(val)
+        return (1, val, 0)
+    def _window(self, aRange):
+        """ Returns the positions (lo, hi) of the ranges overlapping a
+        range """
+        return (bisect_right(self.upper_keys, aRange.lowerCut.key),
+                bisect_left(self.lower_keys, aRange.upperCut.key))
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def from_array(rangeArray, items, backend = "list"):
+        """ Bulk-loads a RangeMap from a RangeArray and an item for each
+        of its ranges. If the ranges are sorted and do not overlap, as in
+        an array exported by to_array, they are stored as they are, and
+        with the "compact" backend without creating any Range or Cut
+        objects. Otherwise they are loaded through from_items, with later
+        ranges overriding earlier ones
+
+        Parameters
+        ----------
+        rangeArray : RangeArray
+            Ranges to load into the map
+        items : Iterable
+            The item for each range
+        backend : string
+            Backing store for the new map (see RangeMap)
+
+        Raises
+        ------
+        TypeError
+            If rangeArray is not a RangeArray
+        ValueError
+            If there is not one item for each range
+
+        Returns
+        -------
+        A RangeMap containing the ranges and items
+        """
+        return RangeMap._fromArray(RangeMap(backend = backend), rangeArray,
+                                   items, RangeMap.from_items)
+    @staticmethod
+    def from_items(pairs, backend = "list"):
+        """ Bulk-loads a RangeMap from an iterable of (Range, value) pairs.
+        Overlaps are resolved in a single sweep over the sorted endpoints,
+        with later pairs overriding earlier ones, so the result is the same
+        as putting each pair in turn
+
+        Parameters
+        ----------
+        pairs : Iterable of (Range, value) tuples
+            Key/value pairs to load, in the order they should be applied
+        backend : string
+            Backing store for the new map (see RangeMap)
+
+        Raises
+        ------
+        TypeError
+            If any of the keys is not a Range
+        ValueError
+            If the keys are not of compatible types
+
+        Returns
+        -------
+        A RangeMap containing the pairs
+        """
+        keys = []
+        vals = []
+        theType = None
+        for key, val in pairs:
+            if not isinstance(key, Range):
+                raise TypeError("key is not a Range")
+            elif key.isEmpty():
+                # Skip if this is an empty range
+                continue
+            # Check for compatibility of types before the keys are sorted
+            elif theType is None:
+                theType = key.lowerCut.theType
+            elif not (issubclass(key.lowerCut.theType, theType) or \
+                      issubclass(theType, key.lowerCut.theType)):
+                raise ValueError("Range not compatible with previously added ranges")
+            keys.append(key)
+            vals.append(val)
+        newRanges = []
+        newItems = []
+        RangeMap._sweepItems(keys, vals, newRanges, newItems)
+        newMap = RangeMap(backend = backend)
+        newMap._splice(0, 0, newRanges, newItems)
+        return newMap
+    @staticmethod
+    def load(path, mmap = True):
+        """ Loads a map written by RangeMap.save. If memory mapped, the
+        map reads its cuts and item positions straight from the file's
+        pages, so loading only costs unpickling the distinct items, and
+        processes loading the same file share the memory. The columns
+        are copied out the first time the map is changed. Python 2 has
+        no memoryview.cast, so there the columns are always copied into
+        arrays and loading costs O(n).
+
+        The distinct items are stored with pickle, so only load files
+        from trusted sources: unpickling a crafted file can run
+        arbitrary code
+
+        Parameters
+        ----------
+        path : string
+            The file to read
+        mmap : boolean
+            Whether to memory map the file rather than read it in
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold a RangeMap
+
+        Returns
+        -------
+        The RangeMap, with the "compact" backend
+        """
+        return RangeMap._load(RangeMap(backend = "compact"), path, mmap)
+    @staticmethod
+    def _load(theMap, path, mmap):
+        """ Fills an empty map with the columns of a file """
+        kind, lowerCuts, upperCuts, items, sublists = \
+            readColumns(path, mmap)
+        if kind != theMap._FILE_KIND:
+            raise ValueError("File does not hold a %s" % type(theMap).__name__)
+        (theMap.lower_cuts, theMap.upper_cuts, theMap.lower_keys,
+         theMap.upper_keys, theMap.ranges) = makeCutColumns("compact",
+                                                            lowerCuts, upperCuts)
+        theMap.items = items
+        return theMap
+    @staticmethod
+    def _fromArray(theMap, rangeArray, items, fromItems):
+        """ Fills an empty map from a RangeArray and its items, falling
+        back on fromItems unless the ranges are sorted and disjoint """
+        if not isinstance(rangeArray, RangeArray):
+            raise TypeError("rangeArray is not a RangeArray")
+        items = list(items)
+        if len(items) != len(rangeArray):
+            raise ValueError("Need an item for each range")
+        if not rangeArray._isDisjoint():
+            return fromItems(zip(rangeArray, items), theMap.backend)
+        items = [theMap._newItem(val) for val in items]
+        if theMap.backend == "compact":
+            (theMap.lower_cuts, theMap.upper_cuts, theMap.lower_keys,
+             theMap.upper_keys, theMap.ranges) = makeCutColumns("compact",
+                                                                *rangeArray._cutArrays())
+            theMap.items[:] = items
+        else:
+            theMap._splice(0, 0, rangeArray.to_ranges(), items)
+        return theMap
+    @staticmethod
+    def _sweepItems(keys, vals, newRanges, newItems):
+        """ Appends to newRanges and newItems the pieces of each key that
+        are not overridden by any later key. Each piece is a maximal run
+        of elementary segments (spans between consecutive distinct cuts)
+        whose latest covering key is the same
+        """
+        lowerKeys = [key.lowerCut.key for key in keys]
+        upperKeys = [key.upperCut.key for key in keys]
+        lowerOrder = sorted(range(len(keys)), key = lowerKeys.__getitem__)
+        upperOrder = sorted(range(len(keys)), key = upperKeys.__getitem__)
+        # Heap of (negated) indices of keys that have started, so the
+        # latest key is always on top. Keys that have ended are
+        # discarded lazily
+        active = []
+        ended = [False]*len(keys)
+        # Piece currently being extended
+        runInd = None
+        runLower = None
+        runUpper = None
+        prevCut = None
+        li = 0
+        ui = 0
+        while ui < len(upperOrder):
+            # Get the next cut point
+            if li < len(lowerOrder) and \
+               lowerKeys[lowerOrder[li]] <= upperKeys[upperOrder[ui]]:
+                curKey = lowerKeys[lowerOrder[li]]
+                curCut = keys[lowerOrder[li]].lowerCut
+            else:
+                curKey = upperKeys[upperOrder[ui]]
+                curCut = keys[upperOrder[ui]].upperCut
+            # Determine which key owns the segment ending at this cut
+            while len(active) > 0 and ended[-active[0]]:
+                heappop(active)
+            winner = -active[0] if len(active) > 0 else None
+            if winner is not None and winner == runInd:
+                runUpper = curCut
+            else:
+                if runInd is not None:
+                    RangeMap._appendPiece(newRanges, newItems, keys[runInd],
+                                          vals[runInd], runLower, runUpper)
+                runInd = winner
+                runLower = prevCut
+                runUpper = curCut
+            # Apply the events at this cut
+            while ui < len(upperOrder) and upperKeys[upperOrder[ui]] == curKey:
+                ended[upperOrder[ui]] = True
+                ui += 1
+            while li < len(lowerOrder) and lowerKeys[lowerOrder[li]] == curKey:
+                heappush(active, -lowerOrder[li])
+                li += 1
+            prevCut = curCut
+        if runInd is not None:
+            RangeMap._appendPiece(newRanges, newItems, keys[runInd],
+                                  vals[runInd], runLower, runUpper)
+    @staticmethod
+    def _appendPiece(newRanges, newItems, key, val, lowerCut, upperCut):
+        # Reuse the original key if the whole of it survived
+        if lowerCut == key.lowerCut and upperCut == key.upperCut:
+            newRanges.append(key)
+        else:
+            newRanges.append(Range(lowerCut, upperCut))
+        newItems.append(val)
@@ -1,6 +1,32 @@
-from bisect import bisect_left
-from collections import deque
+from heapq import merge
+from itertools import chain
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
 from Ranger.src.Range.Range import Range
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Collections.ChunkedList import bisect_left, bisect_right
+from Ranger.src.Collections.CutArray import makeCutColumns, RangeView, \
+     endpointColumns, checkPoints, searchPoints, gallopRight, walkPoints, \
+     walkWindow, nearestRanges, nearestRangesMany, overlapKind, \
+     LEFT_OVERLAP, numpy, SCALAR_BATCH
+from Ranger.src.Collections.ColumnFile import writeColumns, readColumns
+from Ranger.src.Collections.RangeArray import RangeArray
+
+# Membership tests for sweeps over two sets, given how many sets cover a
+# point and which ones do
+def _inEither(count, inside):
+    return count > 0
+
+def _inBoth(count, inside):
+    return count == 2
+
+def _inFirstOnly(count, inside):
+    return inside[0] and not inside[1]
+
+def _inExactlyOne(count, inside):
+    return count == 1
 
 class RangeSet(object):
     """ Class used to represent a set of non-overlapping ranges of the
@@ -8,19 +34,41 @@ class RangeSet(object):
     already in the set, those ranges are merged. Otherwise, it is added as
     a new range in the set
     """
-    def __init__(self, ranges = None):
+    def __init__(self, ranges = None, backend = "list", trusted = False,
+                 pool = None):
         """ Instantiates the RangeSet
 
         Parameters
         ----------
         ranges : List of Range objects
             Ranges to add to the Set
+        backend : string
+            Backing store for the set, either "list" (plain lists),
+            "chunked" (O(log n) inserts and removals, for large sets
+            under heavy mutation) or "compact" (cuts held in numeric
+            arrays, for large sets over an integer or float domain)
+        trusted : boolean
+            If True, ranges added or removed are trusted to be of a type
+            compatible with the set, and are not checked
+        pool : InternPool, optional
+            If given, the ranges stored in the set, and their cuts, are
+            shared through the pool with other equal ranges and cuts.
+            Ignored for the "compact" backend, which does not store them
+
+        Raises
+        ------
+        ValueError
+            If the backend is not known
         """
-        ## Holds lower and upper cut points of ranges
-        self.lower_cuts = []
-        self.upper_cuts = []
-        ## Holds the range objects in the set
-        self.ranges = []
+        self.backend = backend
+        self.trusted = trusted
+        self.pool = pool
+        ## Holds lower and upper cut points of ranges, their sort keys
+        ## (which all searches run on) and the range objects in the set
+        (self.lower_cuts, self.upper_cuts, self.lower_keys, self.upper_keys,
+         self.ranges) = makeCutColumns(backend)
+        # numpy endpoint columns for batch lookups, built on first use
+        self._columns = None
         if ranges is not None:
             for aRange in ranges:
                 self.add(aRange)
@@ -34,6 +82,8 @@ class RangeSet(object):
         return len(self.ranges)
     def __iter__(self):
         return iter(self.ranges)
+    def __reversed__(self):
+        return reversed(self.ranges)
     def __eq__(self, other):
         if not isinstance(other, RangeSet):
             return False
@@ -45,6 +95,42 @@ class RangeSet(object):
             return True
     def __ne__(self, other):
         return not self.__eq__(other)
+    def __or__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.union(other)
+    def __and__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.intersection(other)
+    def __sub__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.difference(other)
+    def __xor__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        return self.symmetric_difference(other)
+    def __ior__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        self.update(other)
+        return self
+    def __iand__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        self.intersection_update(other)
+        return self
+    def __isub__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        self.difference_update(other)
+        return self
+    def __ixor__(self, other):
+        if not isinstance(other, RangeSet):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
     def add(self, aRange):
         """ Adds a range to the range set. If this range is not connected
         to any current ranges, it will place the new range on its own. If
@@ -70,99 +156,67 @@ class RangeSet(object):
             # Skip if this is an empty range
             return
         # Check for compatibility of types if necessary
-        if len(self) > 0:
+        if len(self) > 0 and not self.trusted:
             if not (issubclass(aRange.lowerCut.theType,
                                self.ranges[0].lowerCut.theType) or \
                     issubclass(self.ranges[0].lowerCut.theType,
                                aRange.lowerCut.theType)):
                 raise ValueError("Range not compatible with previously added ranges")
-        # Get the insertion point (where the lower bound should go), should
-        # this range be added on its own
-        lower_ind = bisect_left(self.lower_cuts, aRange.lowerCut)
-        if len(self) == 0:
-            # Add on its own if there is nothing in the list
-            self.ranges.append(aRange)
-            self.lower_cuts.append(aRange.lowerCut)
-            self.upper_cuts.append(aRange.upperCut)
-        elif len(self) == lower_ind:
-            if not aRange.isConnected(self.ranges[max(lower_ind-1,0)]):
-                # Add on its own if not connected to previous and last
-                self.ranges.insert(lower_ind,aRange)
-                self.lower_cuts.insert(lower_ind,aRange.lowerCut)
-                self.upper_cuts.insert(lower_ind,aRange.upperCut)
-            else:
-                # If connected with the range below, replace with new range
-                newLowerCut = min(aRange.lowerCut,
-                                  self.lower_cuts[max(lower_ind-1,0)])
-                newUpperCut = max(aRange.upperCut,
-                                  self.upper_cuts[max(lower_ind-1,0)])
-                newRange = Range(newLowerCut, newUpperCut)
-                self.ranges[-1] = newRange
-                self.lower_cuts[-1] = newLowerCut
-                self.upper_cuts[-1] = newUpperCut
-        elif not any((aRange.isConnected(self.ranges[max(lower_ind-1,0)]),
-                      aRange.isConnected(self.ranges[lower_ind]))):
+        lowerKey = aRange.lowerCut.key
+        upperKey = aRange.upperCut.key
+        # The ranges connected to the new one, which it is merged with
+        lo = bisect_left(self.upper_keys, lowerKey)
+        hi = bisect_right(self.lower_keys, upperKey)
+        if lo == hi:
             # Add on its own if not connected
-            self.ranges.insert(lower_ind,aRange)
-            self.lower_cuts.insert(lower_ind,aRange.lowerCut)
-            self.upper_cuts.insert(lower_ind,aRange.upperCut)
-        elif aRange.isConnected(self.ranges[max(lower_ind-1,0)]):
-            # If connected with range below
-            newLowerCut = min(self.lower_cuts[max(lower_ind-1,0)],
-                              aRange.lowerCut)
-            newUpperCut = max(aRange.upperCut,
-                              self.upper_cuts[max(lower_ind-1,0)])
-            removeCount = 1
-            if len(self) == (lower_ind):
-                # If hitting the last range, take the maximum uppercut
-                newUpperCut = max(newUpperCut, self.upper_cuts[max(lower_ind-1,0)])
-            else:
-                # If not hitting the last range, go find the upper cut
-                for i in range(max(1,lower_ind), len(self)):
-                    if aRange.isConnected(self.ranges[i]):
-                        newUpperCut = max(newUpperCut,self.upper_cuts[i])
-                        removeCount += 1
-                    else:
-                        break
-            # Make the new range
-            newRange = Range(newLowerCut, newUpperCut)
-            # Get rid of all overlapping ranges
-            for i in range(removeCount):
-                self.ranges.pop(max(lower_ind-1,0))
-                self.lower_cuts.pop(max(lower_ind-1,0))
-                self.upper_cuts.pop(max(lower_ind-1,0))
-            # Add the new range
-            self.ranges.insert(max(lower_ind-1,0),newRange)
-            self.lower_cuts.insert(max(lower_ind-1,0),newRange.lowerCut)
-            self.upper_cuts.insert(max(lower_ind-1,0),newRange.upperCut)
-        elif aRange.isConnected(self.ranges[lower_ind]):
-            # If connected with the range above
-            newLowerCut = min(aRange.lowerCut, self.lower_cuts[lower_ind])
-            newUpperCut = max(aRange.upperCut, self.upper_cuts[lower_ind])
-            removeCount = 0
-            if len(self) == (lower_ind + 1):
-                # If hitting the last range, you're done
-                removeCount += 1
-            else:
-                # Go find the upper cut
-                for i in range(lower_ind, len(self)):
-                    if aRange.isConnected(self.ranges[i]):
-                        newUpperCut = max(newUpperCut, self.upper_cuts[i])
-                        removeCount += 1
-                    else:
-                        break
-            # Make the new range
-            newRange = Range(newLowerCut, newUpperCut)
-            # Remove the overlapping ranges
-            for i in range(removeCount):
-                self.ranges.pop(lower_ind)
-                self.lower_cuts.pop(lower_ind)
-                self.upper_cuts.pop(lower_ind)
-            # Add the new range
-            self.ranges.insert(lower_ind, newRange)
-            self.lower_cuts.insert(lower_ind, newRange.lowerCut)
-            self.upper_cuts.insert(lower_ind, newRange.upperCut)
+            self._splice(lo, lo, [aRange])
+            return
+        lowerCut = aRange.lowerCut
+        upperCut = aRange.upperCut
+        if self.lower_keys[lo] < lowerKey:
+            lowerCut = self.lower_cuts[lo]
+        if self.upper_keys[hi-1] > upperKey:
+            upperCut = self.upper_cuts[hi-1]
+        if lowerCut is aRange.lowerCut and upperCut is aRange.upperCut:
+            newRange = aRange
+        elif lo == hi-1 and lowerCut is not aRange.lowerCut and \
+             upperCut is not aRange.upperCut:
+            # Already enclosed by a range in the set
+            return
+        else:
+            newRange = Range(lowerCut, upperCut)
+        # Replace all connected ranges with the merged range
+        self._splice(lo, hi, [newRange])
+    def complement(self, within = None):
+        """ Creates a new RangeSet of everything not in this set
+
+        Parameters
+        ----------
+        within : Range object, optional
+            Range to take the complement within. If None, the complement
+            is taken over the whole domain of the set
+
+        Raises
+        ------
+        TypeError
+            If within is not a Range
+        ValueError
+            If within is not given and the set is empty, so the domain is
+            not known, or if within is of a type not compatible with the
+            set
 
+        Returns
+        -------
+        RangeSet consisting of the complement of this set
+        """
+        if within is None:
+            if len(self) == 0:
+                raise ValueError("Complement of an empty RangeSet needs a bounding range")
+            theType = self.lower_cuts[0].theType
+            within = Range(Cut.belowAll(theType), Cut.aboveAll(theType))
+        elif not isinstance(within, Range):
+            raise TypeError("within is not a Range")
+        return RangeSet([within]).difference(self)
     def contains(self, val):
         """ Returns true if any of the ranges fully enclose the given
         value, which can be a single value or a Range object
@@ -184,7 +238,7 @@ class RangeSet(object):
         # Get the index+1 of the highest lower cut <= to the value or its
         # lower cutpoint and check if the value contained
         if isinstance(val, Range):
-            lower_ind = max(bisect_left(self.lower_cuts, val.lowerCut),0)
+            lower_ind = max(bisect_left(self.lower_keys, val.lowerCut.key),0)
             if lower_ind >= len(self.lower_cuts):
                 return self.ranges[lower_ind-1].encloses(val)
             elif val.lowerCut != self.lower_cuts[lower_ind]:
@@ -192,8 +246,44 @@ class RangeSet(object):
             else:
                 return self.ranges[lower_ind].encloses(val)
         else:
-            lower_ind = max(bisect_left(self.lower_cuts, val)-1,0)
-            return self.ranges[lower_ind].contains(val)
+            valKey = self._valueKey(val)
+            lower_ind = max(bisect_left(self.lower_keys, valKey)-1,0)
+            return self.lower_keys[lower_ind] < valKey < self.upper_keys[lower_ind]
+    def contains_many(self, values):
+        """ Batch version of contains for single values. Sorted input is
+        answered with a single forward walk over the ranges; a numpy
+        array is looked up with numpy.searchsorted
+
+        Parameters
+        ----------
+        values : Iterable or numpy array of single values
+            The values to check
+
+        Raises
+        ------
+        ValueError
+            If a value type not compatible with the ranges
+
+        Returns
+        -------
+        list of booleans, true where a range contains the value. If the
+        values are a numpy array, a numpy boolean array is returned
+        """
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            if len(self) == 0:
+                return numpy.zeros(len(values), dtype = bool)
+            checkPoints(self.lower_cuts[0].theType, values)
+            columns = self._pointColumns(len(values))
+            if columns is not None:
+                return searchPoints(columns, values) >= 0
+            return numpy.array([ind >= 0 for ind in \
+                                walkPoints(self.lower_cuts, self.lower_keys,
+                                           self.upper_keys, values.tolist())],
+                               dtype = bool)
+        if len(self) == 0:
+            return [False for val in values]
+        return [ind >= 0 for ind in walkPoints(self.lower_cuts, self.lower_keys,
+                                               self.upper_keys, values)]
     def difference(self, otherSet):
         """ Creates a new RangeSet in which all elements in another RangeSet
         are taken out of this RangeSet
@@ -217,50 +307,27 @@ class RangeSet(object):
         """
         if not isinstance(otherSet, RangeSet):
             raise TypeError("otherSet is not a RangeSet")
-        newSet = RangeSet()
-        for addRange in self.ranges:
-            if otherSet.overlaps(addRange):
-                # Determine where overlap occurs
-                otherLowerInd = max(bisect_left(otherSet.lower_cuts,
-                                            addRange.lowerCut)-1,0)
-                otherUpperInd = bisect_left(otherSet.lower_cuts,
-                                            addRange.upperCut)
-                newLowerCut = addRange.lowerCut
-                newUpperCut = addRange.upperCut
-                add = True
-                for i in range(otherLowerInd, otherUpperInd):
-                    try:
-                        # Get the intersection of the ranges
-                        intersect = addRange.intersection(otherSet.ranges[i])
-                        if not intersect.isEmpty():
-                            if addRange == intersect:
-                                add = False
-                                break
-                            elif addRange.lowerCut == intersect.lowerCut:
-                                # If equal on the left cutpoint, subtract out left
-                                # part
-                                newLowerCut = intersect.upperCut
-                                addRange = Range(newLowerCut, newUpperCut)
-                            elif addRange.upperCut == intersect.upperCut:
-                                # If equal on right cutpoint, subtract out right
-                                # part
-                                newUpperCut = intersect.lowerCut
-                                addRange = Range(addRange.lowerCut, newUpperCut)
-                            else:
-                                # If in the middle, split into two parts and
-                                # add the lower one immediately
-                                newSet.add(Range(newLowerCut,
-                                                 intersect.lowerCut))
-                                newLowerCut = intersect.upperCut
-                                newUpperCut = addRange.upperCut
-                                addRange = Range(newLowerCut, newUpperCut)
-                    except ValueError:
-                        continue
-                if add:
-                    newSet.add(Range(newLowerCut, newUpperCut))
-            else:
-                newSet.add(addRange)
-        return newSet
+        return RangeSet._fromSweep([self, otherSet],
+                                   _inFirstOnly,
+                                   self.backend)
+    def difference_update(self, otherSet):
+        """ Takes all elements in another RangeSet out of this RangeSet,
+        in place
+
+        Parameters
+        ----------
+        otherSet : RangeSet object
+            The RangeSet used for this difference
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeSet
+        ValueError
+            If the value type of the ranges in the other set not compatible
+            with the range's values
+        """
+        self._sweepUpdate(otherSet, _inFirstOnly, True)
     def intersection(self, otherSet):
         """ Creates a new RangeSet that is the intersection of this and
         another RangeSet
@@ -284,24 +351,146 @@ class RangeSet(object):
         """
         if not isinstance(otherSet, RangeSet):
             raise TypeError("otherSet is not a RangeSet")
-        newSet = RangeSet()
-        for addRange in self.ranges:
-            if otherSet.overlaps(addRange):
-                # Determine where overlap occurs
-                otherLowerInd = max(bisect_left(otherSet.lower_cuts,
-                                                addRange.lowerCut)-1,0)
-                otherUpperInd = bisect_left(otherSet.lower_cuts,
-                                            addRange.upperCut)
-                for i in range(otherLowerInd, otherUpperInd):
-                    # Get the intersection of the ranges
-                    try:
-                        intersect = addRange.intersection(otherSet.ranges[i])
-                        # Add intersection if there is any overlap
-                        if not intersect.isEmpty():
-                            newSet.add(intersect)
-                    except ValueError:
-                        continue
-        return newSet
+        return RangeSet._fromSweep([self, otherSet],
+                                   _inBoth,
+                                   self.backend)
+    def intersection_update(self, otherSet):
+        """ Keeps only the elements of this RangeSet that are also in
+        another RangeSet, in place
+
+        Parameters
+        ----------
+        otherSet : RangeSet object
+            The RangeSet used for this intersection
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeSet
+        ValueError
+            If the value type of the ranges in the other set not compatible
+            with the range's values
+        """
+        self._sweepUpdate(otherSet, _inBoth, False)
+    def iter_from(self, val, reverse = False):
+        """ Iterates over the part of the set from a value on, or up to it
+        if reverse is True
+
+        Parameters
+        ----------
+        val : comparable
+            The point to iterate from, inclusive
+        reverse : boolean
+            If True, iterates back from the value to the start of the set
+
+        Raises
+        ------
+        ValueError
+            If the value type not compatible with the ranges
+
+        Returns
+        -------
+        Generator of the ranges on the value's side of it, clipped to it
+        """
+        if reverse:
+            return self.iter_window(None, val, True)
+        return self.iter_window(val, None)
+    def iter_window(self, start = None, end = None, reverse = False):
+        """ Iterates over the part of the set within [start, end]. The
+        first range is found with a single bisect and the rest are
+        produced lazily, so scanning a window costs nothing for the ranges
+        outside it
+
+        Parameters
+        ----------
+        start : comparable, optional
+            The starting point for iterating, inclusive. Unbounded if None
+        end : comparable, optional
+            The ending point for iterating, inclusive. Unbounded if None
+        reverse : boolean
+            If True, iterates from the end of the window to the start
+
+        Raises
+        ------
+        ValueError
+            If start or end not compatible with the ranges
+
+        Returns
+        -------
+        Generator of the ranges intersecting [start,end], clipped to it
+        """
+        for ind, aRange in walkWindow(self.lower_cuts, self.upper_cuts,
+                                      self.lower_keys, self.upper_keys,
+                                      self.ranges, start, end, reverse):
+            yield aRange
+    def nearest(self, val, k = 1, distFunc = lambda x1, x2: abs(x1-x2)):
+        """ Finds the k ranges nearest a single value or Range object,
+        searching outward from where it falls in the set, in O(log n + k).
+        Open bounds are allowed; in an integer domain the distance to an
+        open bound is measured to the nearest integer inside it
+
+        Parameters
+        ----------
+        val : A single value or a Range object
+            What to measure distances from
+        k : int
+            Number of ranges to find
+        distFunc : callable
+            Function that calculates the distance between two points in
+            the domain of the ranges
+
+        Raises
+        ------
+        ValueError
+            If k is less than 1, or the value type not compatible with
+            the ranges
+
+        Returns
+        -------
+        list of up to k (Range, distance) pairs, from nearest to furthest,
+        with ranges overlapping the value at distance 0
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if len(self) == 0:
+            return []
+        found = nearestRanges(self.lower_cuts, self.upper_cuts,
+                              self.lower_keys, self.upper_keys,
+                              val, k, distFunc)[0]
+        return [(self.ranges[ind], dist) for ind, dist in found]
+    def nearest_many(self, vals, k = 1, distFunc = lambda x1, x2: abs(x1-x2)):
+        """ Batch version of nearest. Sorted queries are answered in a
+        single forward walk over the set
+
+        Parameters
+        ----------
+        vals : Iterable of single values or Range objects
+            What to measure distances from
+        k : int
+            Number of ranges to find for each value
+        distFunc : callable
+            Function that calculates the distance between two points in
+            the domain of the ranges
+
+        Raises
+        ------
+        ValueError
+            If k is less than 1, or a value type not compatible with the
+            ranges
+
+        Returns
+        -------
+        list with, for each value, the list of (Range, distance) pairs of
+        its nearest ranges
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if len(self) == 0:
+            return [[] for val in vals]
+        return [[(self.ranges[ind], dist) for ind, dist in found] for found in \
+                nearestRangesMany(self.lower_cuts, self.upper_cuts,
+                                  self.lower_keys, self.upper_keys,
+                                  vals, k, distFunc)]
     def overlaps(self, val):
         """ Returns true if any of the ranges at least partially overlap
         the given value, which can be a single value or a Range object
@@ -323,16 +512,70 @@ class RangeSet(object):
         # Get the index+1 of the highest lower cut <= to the value or its
         # lower cutpoint and check if the value overlaps
         if isinstance(val, Range):
-            lower_ind = bisect_left(self.lower_cuts, val.lowerCut)-1
-            upper_ind = bisect_left(self.lower_cuts, val.upperCut)
-            for i in range(lower_ind,upper_ind):
-                if val.isConnected(self.ranges[i]):
-                    if not self.ranges[i].intersection(val).isEmpty():
-                        return True
+            lowerKey = val.lowerCut.key
+            upperKey = val.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
+            for i in range(bisect_right(upperKeys, lowerKey),
+                           bisect_left(lowerKeys, upperKey)):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    return True
             return False
         else:
-            lower_ind = bisect_left(self.lower_cuts,val)-1
-            return self.ranges[lower_ind].contains(val)
+            valKey = self._valueKey(val)
+            lower_ind = bisect_left(self.lower_keys, valKey)-1
+            return lower_ind >= 0 and self.upper_keys[lower_ind] > valKey
+    def overlaps_many(self, ranges):
+        """ Batch version of overlaps for Range objects. While the ranges
+        come in order of lower cut, each search gallops forward from where
+        the last one ended (see CutArray.gallopRight), so sorted input is
+        answered with a single O(n + m) walk over the set
+
+        Parameters
+        ----------
+        ranges : Iterable of Range objects
+            The ranges to check
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a Range
+        ValueError
+            If a range type not compatible with the set
+
+        Returns
+        -------
+        list of booleans, true where the range overlaps the set
+        """
+        results = []
+        theType = self.lower_cuts[0].theType if len(self) > 0 else None
+        lowerKeys = self.lower_keys
+        upperKeys = self.upper_keys
+        # Position of the first range ending above the last lower cut
+        ind = 0
+        prevKey = None
+        for aRange in ranges:
+            if not isinstance(aRange, Range):
+                raise TypeError("aRange is not a Range")
+            elif theType is None:
+                results.append(False)
+                continue
+            elif not (issubclass(aRange.lowerCut.theType, theType) or \
+                      issubclass(theType, aRange.lowerCut.theType)):
+                raise ValueError("Range not compatible with previously added ranges")
+            lowerKey = aRange.lowerCut.key
+            upperKey = aRange.upperCut.key
+            if prevKey is None or lowerKey < prevKey:
+                # Out of order, so search from the start
+                ind = bisect_right(upperKeys, lowerKey)
+            elif ind < len(upperKeys) and upperKeys[ind] <= lowerKey:
+                ind = gallopRight(upperKeys, lowerKey, ind)
+            prevKey = lowerKey
+            # Empty ranges overlap nothing
+            results.append(lowerKey != upperKey and ind < len(lowerKeys) and \
+                           lowerKeys[ind] < upperKey)
+        return results
     def remove(self, aRange):
         """ Removes a range from the range set. 
 
@@ -355,61 +598,100 @@ class RangeSet(object):
             # Skip if this is an empty range
             return
         # Check for compatibility of types if necessary
-        if len(self) > 0:
+        if len(self) > 0 and not self.trusted:
             if not (issubclass(aRange.lowerCut.theType,
                                self.ranges[0].lowerCut.theType) or \
                     issubclass(self.ranges[0].lowerCut.theType,
                                aRange.lowerCut.theType)):
                 raise ValueError("Range not compatible with previously added ranges")
-        # Check if the range actually overlaps with this set
-        if not self.overlaps(aRange):
+        lowerKey = aRange.lowerCut.key
+        upperKey = aRange.upperCut.key
+        # The ranges overlapping the removed one
+        lo = bisect_right(self.upper_keys, lowerKey)
+        hi = bisect_left(self.lower_keys, upperKey)
+        if lo == hi:
             return
-        else:
-            # There's some overlap, so deal with that
-            # Determine where overlap occurs
-            ovlapLowerInd = max(bisect_left(self.lower_cuts, aRange.lowerCut)-1,0)
-            ovlapUpperInd = bisect_left(self.lower_cuts, aRange.upperCut)
-            # Create queue of indices marked for removal
-            removeRanges = deque()
-            # Create queue of ranges to add
-            addRanges = deque()
-            for i in range(ovlapLowerInd, ovlapUpperInd):
-                try:
-                    # Get intersection of the ranges
-                    intersect = aRange.intersection(self.ranges[i])
-                    if not intersect.isEmpty():
-                        if intersect == self.ranges[i]:
-                            # Mark range for removal
-                            removeRanges.append(i)
-                        elif self.lower_cuts[i] == intersect.lowerCut:
-                            # If equal on the left cutpoint, subtract out left
-                            # part
-                            self.lower_cuts[i] = intersect.upperCut
-                            self.ranges[i] = Range(intersect.upperCut, self.upper_cuts[i])
-                        elif self.upper_cuts[i] == intersect.upperCut:
-                            # If equal on right cutpoint, subtract out right
-                            # part
-                            self.upper_cuts[i] = intersect.lowerCut
-                            self.ranges[i] = Range(self.lower_cuts[i], intersect.lowerCut)
-                        else:
-                            # If in the middle, split into two parts, putting both into
-                            # add queue and placing the old range index into the removal
-                            # queue
-                            addRanges.append(Range(self.lower_cuts[i], intersect.lowerCut))
-                            addRanges.append(Range(intersect.upperCut, self.upper_cuts[i]))
-                            removeRanges.append(i)
-                except ValueError:
-                    # Continue if no overlap with this range
-                    continue
-            # Remove any ranges that are marked for removal
-            while len(removeRanges) > 0:
-                removeInd = removeRanges.pop()
-                self.ranges.pop(removeInd)
-                self.lower_cuts.pop(removeInd)
-                self.upper_cuts.pop(removeInd)
-            # Add any ranges that need to be added
-            while len(addRanges) > 0:
-                self.add(addRanges.pop())
+        # Keep the parts of the ranges at the ends sticking out past it
+        newRanges = []
+        if self.lower_keys[lo] < lowerKey:
+            newRanges.append(Range(self.lower_cuts[lo], aRange.lowerCut))
+        if self.upper_keys[hi-1] > upperKey:
+            newRanges.append(Range(aRange.upperCut, self.upper_cuts[hi-1]))
+        self._splice(lo, hi, newRanges)
+    def save(self, path):
+        """ Writes the set to a binary, columnar file (see ColumnFile),
+        which RangeSet.load can memory map
+
+        Parameters
+        ----------
+        path : string
+            The file to write
+
+        Raises
+        ------
+        ValueError
+            If the set is not over an integer or float domain
+        """
+        writeColumns(path, "set", self.lower_cuts, self.upper_cuts)
+    def symmetric_difference(self, otherSet):
+        """ Creates a new RangeSet of everything in exactly one of this set
+        and another RangeSet
+
+        Parameters
+        ----------
+        otherSet : RangeSet object
+            The RangeSet used for the symmetric difference
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeSet
+        ValueError
+            If the value type of the set not compatible with the ranges
+
+        Returns
+        -------
+        RangeSet consisting of the symmetric difference of the two sets
+        """
+        if not isinstance(otherSet, RangeSet):
+            raise TypeError("otherSet is not a RangeSet")
+        return RangeSet._fromSweep([self, otherSet],
+                                   _inExactlyOne,
+                                   self.backend)
+    def symmetric_difference_update(self, otherSet):
+        """ Makes this RangeSet the symmetric difference of itself and
+        another RangeSet, in place
+
+        Parameters
+        ----------
+        otherSet : RangeSet object
+            The RangeSet used for the symmetric difference
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeSet
+        ValueError
+            If the value type of the set not compatible with the ranges
+        """
+        self._sweepUpdate(otherSet, _inExactlyOne, True)
+    def to_array(self):
+        """ Returns the ranges of the set as a RangeArray. With the
+        "compact" backend, the columns are copied out without creating
+        any Range or Cut objects
+
+        Raises
+        ------
+        ImportError
+            If numpy is not installed
+        ValueError
+            If the set is not over an integer or float domain
+
+        Returns
+        -------
+        RangeArray of the ranges, in order
+        """
+        return RangeArray.from_cuts(self.lower_cuts, self.upper_cuts)
     def union(self, otherSet):
         """ Creates a new RangeSet that is the union of this set and
         another RangeSet object
@@ -432,7 +714,26 @@ class RangeSet(object):
         """
         if not isinstance(otherSet, RangeSet):
             raise TypeError("otherSet is not a RangeSet")
-        return RangeSet(set(self.ranges+otherSet.ranges))
+        return RangeSet._fromSweep([self, otherSet],
+                                   _inEither,
+                                   self.backend)
+    def update(self, otherSet):
+        """ Adds all elements of another RangeSet to this RangeSet, in
+        place
+
+        Parameters
+        ----------
+        otherSet : RangeSet object
+            The RangeSet used for the union
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a RangeSet
+        ValueError
+            If the value type of the set not compatible with the ranges
+        """
+        self._sweepUpdate(otherSet, _inEither, True)
     def whichOverlaps(self, val):
         """ Returns which of the Ranges overlap with a single value or
         Range object
@@ -456,15 +757,397 @@ class RangeSet(object):
         # to set
         overlap_set = set()
         if isinstance(val, Range):
-            lower_ind = bisect_left(self.lower_cuts, val.lowerCut)-1
-            upper_ind = bisect_left(self.lower_cuts, val.upperCut)
-            for i in range(lower_ind,upper_ind):
-                if val.isConnected(self.ranges[i]):
-                    if not self.ranges[i].intersection(val).isEmpty():
-                        overlap_set.add(self.ranges[i])
+            lowerKey = val.lowerCut.key
+            upperKey = val.upperCut.key
+            lowerKeys = self.lower_keys
+            upperKeys = self.upper_keys
+            for i in range(bisect_right(upperKeys, lowerKey),
+                           bisect_left(lowerKeys, upperKey)):
+                if overlapKind(lowerKey, upperKey, lowerKeys[i],
+                               upperKeys[i]) >= LEFT_OVERLAP:
+                    overlap_set.add(self.ranges[i])
             return overlap_set
         else:
-            lower_ind = bisect_left(self.lower_cuts,val)-1
-            if self.ranges[lower_ind].contains(val):
+            valKey = self._valueKey(val)
+            lower_ind = bisect_left(self.lower_keys, valKey)-1
+            if lower_ind >= 0 and self.upper_keys[lower_ind] > valKey:
                 overlap_set.add(self.ranges[lower_ind])
             return overlap_set
+    def _pointColumns(self, nPoints):
+        """ Returns the numpy endpoint columns of the (non-empty) set for a
+        batch of nPoints points, building them if needed. They are kept
+        until the set next changes. Returns None rather than build them
+        for a batch much smaller than the set, which is cheaper to search
+        point by point (the compact backend copies them straight from its
+        arrays, so always builds them)
+        """
+        if self._columns is None:
+            if nPoints*SCALAR_BATCH < len(self) and \
+               not isinstance(self.ranges, RangeView):
+                return None
+            self._columns = endpointColumns(self.lower_cuts, self.upper_cuts,
+                                            self.lower_keys, self.upper_keys)
+        return self._columns
+    def _splice(self, lo, hi, ranges):
+        """ Replaces the ranges at positions lo to hi with a list of
+        ranges, keeping the cut and key lists in step. Every change to the
+        stored ranges goes through here, so that the set works the same on
+        any backend
+        """
+        self._columns = None
+        if self.pool is not None and not isinstance(self.ranges, RangeView):
+            # Store the shared copies of the ranges
+            pool = self.pool
+            ranges = [pool.range(aRange) for aRange in ranges]
+        lowerCuts = [aRange.lowerCut for aRange in ranges]
+        upperCuts = [aRange.upperCut for aRange in ranges]
+        self.lower_cuts[lo:hi] = lowerCuts
+        self.upper_cuts[lo:hi] = upperCuts
+        if not isinstance(self.ranges, RangeView):
+            self.lower_keys[lo:hi] = [cut.key for cut in lowerCuts]
+            self.upper_keys[lo:hi] = [cut.key for cut in upperCuts]
+            self.ranges[lo:hi] = ranges
+    def _sweepUpdate(self, otherSet, keep, keepOutside):
+        """ Replaces this set's contents with the sweep (see _sweepRanges)
+        of itself and another set. Only this set's ranges that touch the
+        span of the other set are swept, and the result is spliced over
+        them; the ranges outside the span are kept, or dropped if
+        keepOutside is False
+        """
+        if not isinstance(otherSet, RangeSet):
+            raise TypeError("otherSet is not a RangeSet")
+        if len(otherSet) == 0:
+            lo = hi = 0
+            newRanges = []
+        else:
+            lo = bisect_left(self.upper_keys, otherSet.lower_keys[0])
+            hi = bisect_right(self.lower_keys, otherSet.upper_keys[-1])
+            newRanges = list(RangeSet._sweepRanges([self, otherSet], keep,
+                                                   [(lo, hi), (0, None)]))
+        if keepOutside:
+            self._splice(lo, hi, newRanges)
+        else:
+            self._splice(0, len(self), newRanges)
+    def _valueKey(self, val):
+        """ Returns the sort key of a single value, checking once that its
+        type is compatible with the ranges """
+        self.lower_cuts[0]._validate_query_pt(val)
+        return (1, val, 0)
+    ##################
+    # Static methods #
+    ##################
+    @staticmethod
+    def _cutEvents(theSet, setInd, lo = 0, hi = None):
+        """ Yields (key, change, set index, Cut) for the lower (change 1)
+        and upper (change -1) cut of every range of a set, or of its ranges
+        at positions lo to hi, in order """
+        columns = (theSet.lower_keys, theSet.lower_cuts,
+                   theSet.upper_keys, theSet.upper_cuts)
+        if lo > 0 or hi is not None:
+            columns = [column[lo:hi] for column in columns]
+        for lowerKey, lowerCut, upperKey, upperCut in izip(*columns):
+            yield (lowerKey, 1, setInd, lowerCut)
+            yield (upperKey, -1, setInd, upperCut)
+    @staticmethod
+    def _sweepRanges(sets, keep, bounds = None):
+        """ Yields, in order, the coalesced ranges over which keep(count,
+        inside) holds, where inside says which of the sets cover a point
+        and count how many do. The cuts of all the sets are merged in a
+        single pass, so nothing is added range by range. If given, bounds
+        holds the (lo, hi) positions of the ranges to use from each set
+
+        Raises
+        ------
+        ValueError
+            If the sets are not of compatible types
+        """
+        theType = None
+        for theSet in sets:
+            if len(theSet) == 0:
+                continue
+            setType = theSet.lower_cuts[0].theType
+            if theType is None:
+                theType = setType
+            elif not (issubclass(setType, theType) or issubclass(theType, setType)):
+                raise ValueError("Range not compatible with previously added ranges")
+        if bounds is None:
+            bounds = [(0, None)]*len(sets)
+        events = merge(*[RangeSet._cutEvents(theSet, setInd, *bounds[setInd]) \
+                         for setInd, theSet in enumerate(sets)])
+        inside = [False]*len(sets)
+        count = 0
+        # Whether keep held after the last cut, and where that began
+        kept = False
+        startCut = None
+        curKey = None
+        curCut = None
+        # A trailing event flushes the last cut
+        for key, change, setInd, cut in chain(events, [(None, 0, None, None)]):
+            if key != curKey:
+                if curKey is not None:
+                    # All events at the current cut are in, so check it
+                    keepNow = keep(count, inside)
+                    if keepNow and not kept:
+                        startCut = curCut
+                    elif kept and not keepNow:
+                        yield Range(startCut, curCut)
+                    kept = keepNow
+                curKey = key
+                curCut = cut
+            if key is None:
+                break
+            inside[setInd] = change > 0
+            count += change
+    @staticmethod
+    def _fromSweep(sets, keep, backend):
+        """ Returns a RangeSet of the ranges from _sweepRanges """
+        newSet = RangeSet(backend = backend)
+        newSet._splice(0, 0, list(RangeSet._sweepRanges(sets, keep)))
+        return newSet
+    @staticmethod
+    def from_array(rangeArray, backend = "list"):
+        """ Bulk-loads a RangeSet from a RangeArray, sorting and merging
+        the ranges with numpy. With the "compact" backend the columns are
+        copied in without creating any Range or Cut objects
+
+        Parameters
+        ----------
+        rangeArray : RangeArray
+            Ranges to load into the set
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Raises
+        ------
+        TypeError
+            If rangeArray is not a RangeArray
+
+        Returns
+        -------
+        A RangeSet of the ranges
+        """
+        if not isinstance(rangeArray, RangeArray):
+            raise TypeError("rangeArray is not a RangeArray")
+        merged = rangeArray._coalesced()
+        newSet = RangeSet(backend = backend)
+        if backend == "compact":
+            (newSet.lower_cuts, newSet.upper_cuts, newSet.lower_keys,
+             newSet.upper_keys, newSet.ranges) = makeCutColumns("compact",
+                                                                *merged._cutArrays())
+        else:
+            newSet._splice(0, 0, merged.to_ranges())
+        return newSet
+    @staticmethod
+    def from_ranges(ranges, presorted = False, backend = "list"):
+        """ Bulk-loads a RangeSet from an iterable of Ranges. The ranges are
+        sorted once by lower cut and connected ranges are coalesced in a
+        single sweep, giving the same set as adding each range in turn
+
+        Parameters
+        ----------
+        ranges : Iterable of Range objects
+            Ranges to load into the set
+        presorted : boolean
+            If True, the ranges are assumed to already be ordered by
+            lower cut and are not sorted again
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a Range
+        ValueError
+            If the ranges are not of compatible types
+
+        Returns
+        -------
+        A RangeSet containing the ranges
+        """
+        newRanges = []
+        if not presorted:
+            # Check every range before sorting, as keys of incompatible
+            # types cannot be compared. Empty ranges are dropped here
+            theType = None
+            nonEmpty = []
+            for aRange in ranges:
+                if not isinstance(aRange, Range):
+                    raise TypeError("aRange is not a Range")
+                elif aRange.lowerCut.key == aRange.upperCut.key:
+                    continue
+                elif theType is None:
+                    theType = aRange.lowerCut.theType
+                elif not (issubclass(aRange.lowerCut.theType, theType) or \
+                          issubclass(theType, aRange.lowerCut.theType)):
+                    raise ValueError("Range not compatible with previously added ranges")
+                nonEmpty.append(aRange)
+            ranges = sorted(nonEmpty, key = lambda aRange: aRange.lowerCut.key)
+        theType = None
+        # The range currently being coalesced. curRange holds the input
+        # Range itself for as long as nothing has been merged into it
+        curRange = None
+        curLower = None
+        curUpper = None
+        curUpperKey = None
+        for aRange in ranges:
+            if not isinstance(aRange, Range):
+                raise TypeError("aRange is not a Range")
+            lowerKey = aRange.lowerCut.key
+            upperKey = aRange.upperCut.key
+            if lowerKey == upperKey:
+                # Skip if this is an empty range
+                continue
+            # Check for compatibility of types
+            if theType is None:
+                theType = aRange.lowerCut.theType
+            elif not (issubclass(aRange.lowerCut.theType, theType) or \
+                      issubclass(theType, aRange.lowerCut.theType)):
+                raise ValueError("Range not compatible with previously added ranges")
+            if curLower is not None and lowerKey <= curUpperKey:
+                # Connected with the current range, so extend it
+                if upperKey > curUpperKey:
+                    curRange = None
+                    curUpper = aRange.upperCut
+                    curUpperKey = upperKey
+                continue
+            if curLower is not None:
+                # Not connected, so close off the current range
+                newRanges.append(curRange if curRange is not None else \
+                                 Range(curLower, curUpper))
+            curRange = aRange
+            curLower = aRange.lowerCut
+            curUpper = aRange.upperCut
+            curUpperKey = upperKey
+        if curLower is not None:
+            newRanges.append(curRange if curRange is not None else \
+                             Range(curLower, curUpper))
+        newSet = RangeSet(backend = backend)
+        newSet._splice(0, 0, newRanges)
+        return newSet
+    @staticmethod
+    def load(path, mmap = True):
+        """ Loads a set written by RangeSet.save. If memory mapped, the
+        set reads its cuts straight from the file's pages, so loading
+        takes the same time however big the set is, and processes
+        loading the same file share the memory. The cuts are copied out
+        the first time the set is changed. Python 2 has no
+        memoryview.cast, so there the cuts are always copied into arrays
+        and loading costs O(n).
+
+        Only load files from trusted sources. A set file holds no
+        pickled data, but a file of another kind has its value table
+        unpickled before its kind is checked, and a crafted pickle can
+        run arbitrary code
+
+        Parameters
+        ----------
+        path : string
+            The file to read
+        mmap : boolean
+            Whether to memory map the file rather than read it in
+
+        Raises
+        ------
+        ValueError
+            If the file does not hold a RangeSet
+
+        Returns
+        -------
+        The RangeSet, with the "compact" backend
+        """
+        kind, lowerCuts, upperCuts, items, sublists = \
+            readColumns(path, mmap)
+        if kind != "set":
+            raise ValueError("File does not hold a RangeSet")
+        theSet = RangeSet(backend = "compact")
+        (theSet.lower_cuts, theSet.upper_cuts, theSet.lower_keys,
+         theSet.upper_keys, theSet.ranges) = makeCutColumns("compact",
+                                                            lowerCuts, upperCuts)
+        return theSet
+    @staticmethod
+    def union_all(sets, backend = "list"):
+        """ Creates a new RangeSet covering everything covered by any of a
+        collection of RangeSets. The cuts of all the sets are merged
+        through a heap in a single pass, so for N ranges over k sets this
+        takes O(N log k) rather than rebuilding the result for every set
+
+        Parameters
+        ----------
+        sets : Iterable of RangeSet objects
+            The RangeSets to take the union of
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a RangeSet
+        ValueError
+            If the sets are not of compatible types
+
+        Returns
+        -------
+        RangeSet consisting of the union of all the sets
+        """
+        return RangeSet.at_least(sets, 1, backend)
+    @staticmethod
+    def intersect_all(sets, backend = "list"):
+        """ Creates a new RangeSet covering what is covered by every one of
+        a collection of RangeSets, in a single O(N log k) merge of their
+        cuts. The intersection of no sets is empty
+
+        Parameters
+        ----------
+        sets : Iterable of RangeSet objects
+            The RangeSets to intersect
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a RangeSet
+        ValueError
+            If the sets are not of compatible types
+
+        Returns
+        -------
+        RangeSet consisting of the intersection of all the sets
+        """
+        sets = list(sets)
+        return RangeSet.at_least(sets, max(len(sets), 1), backend)
+    @staticmethod
+    def at_least(sets, k, backend = "list"):
+        """ Creates a new RangeSet covering what is covered by at least k of
+        a collection of RangeSets, in a single O(N log k) merge of their
+        cuts
+
+        Parameters
+        ----------
+        sets : Iterable of RangeSet objects
+            The RangeSets to count coverage over
+        k : int
+            Minimum number of sets that must cover a point
+        backend : string
+            Backing store for the new set (see RangeSet)
+
+        Raises
+        ------
+        TypeError
+            If any of the objects is not a RangeSet
+        ValueError
+            If k is less than 1, or the sets are not of compatible types
+
+        Returns
+        -------
+        RangeSet of the points covered by at least k of the sets
+        """
+        sets = list(sets)
+        for theSet in sets:
+            if not isinstance(theSet, RangeSet):
+                raise TypeError("theSet is not a RangeSet")
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        return RangeSet._fromSweep(sets,
+                                   lambda count, inside: count >= k,
+                                   backend)
@@ -1,9 +1,71 @@
 
-class Cut(object):
+# Shared aboveAll/belowAll cuts, keyed by (theType, is aboveAll)
+_SENTINELS = {}
+
+def _sentinel(theType, above):
+    """ Returns the shared aboveAll (or belowAll) Cut of a type """
+    try:
+        return _SENTINELS[(theType, above)]
+    except KeyError:
+        cut = Cut(theType, aboveAll = above, belowAll = not above)
+        _SENTINELS[(theType, above)] = cut
+        return cut
+
+def _belowAll(theType):
+    """ Create a cut point outside the lower end of the domain. The same
+    Cut object is returned for every call with the same type
+
+    Parameters
+    ----------
+    theType : type
+        Most inclusive type that can be used for comparison.
+
+    Returns
+    -------
+    The cut object
+    """
+    return _sentinel(theType, False)
+
+def _aboveAll(theType):
+    """ Create a cut point outside the upper end of the domain. The same
+    Cut object is returned for every call with the same type
+
+    Parameters
+    ----------
+    theType : type
+        Most inclusive type that can be used for comparison
+
+    Returns
+    -------
+    The cut object
+    """
+    return _sentinel(theType, True)
+
+class _CutType(type):
+    """ Metaclass of Cut. Cuts keep their aboveAll/belowAll flags in slots
+    of those names, so Cut.aboveAll and Cut.belowAll, the factories for
+    the unbounded cuts, are looked up here instead
+    """
+    @property
+    def belowAll(cls):
+        return _belowAll
+    @property
+    def aboveAll(cls):
+        return _aboveAll
+
+class Cut(_CutType("_CutBase", (object,), {"__slots__" : ()})):
     """
     Class used to represent a cutpoint in a range, such that any range can
-    be represented by 2 Cuts
+    be represented by 2 Cuts. Cuts are immutable
+
+    Each Cut carries a sort key, a tuple of (rank, point, side) that orders
+    the same way as the Cut itself: rank is 0 for belowAll, 2 for aboveAll
+    and 1 otherwise, and side is -1 for a cut below its point and 1 for a
+    cut above it. A single value v sorts as (1, v, 0), so searches over
+    cuts can run on native tuple comparisons
     """
+    __slots__ = ("theType", "aboveAll", "belowAll", "point", "below", "key",
+                 "_hash", "__weakref__")
     def __init__(self, theType, aboveAll=False, belowAll=False, point = None,
                  below = False):
         """ Instantiates a cut point
@@ -30,11 +92,13 @@ class Cut(object):
         ValueError
             If input is invalid
         """
-        self.theType = theType
-        self.aboveAll = False
-        self.belowAll = False
-        self.point = None
-        self.below = False
+        setAttr = object.__setattr__
+        setAttr(self, "theType", theType)
+        setAttr(self, "aboveAll", False)
+        setAttr(self, "belowAll", False)
+        setAttr(self, "point", None)
+        setAttr(self, "below", False)
+        setAttr(self, "key", None)
         # Validate input
         if point is None:
             if not any((aboveAll, belowAll)):
@@ -43,29 +107,45 @@ class Cut(object):
                 raise ValueError("Cannot be both aboveAll and belowAll")
             else:
                 # Correct input
-                self.aboveAll = aboveAll
-                self.belowAll = belowAll
+                setAttr(self, "aboveAll", aboveAll)
+                setAttr(self, "belowAll", belowAll)
+                setAttr(self, "key", (2, None, 0) if aboveAll else (0, None, 0))
         else:
             if any((aboveAll, belowAll)):
                 raise ValueError("Cannot be both point and above/below all")
             elif not isinstance(point, theType):
                 raise ValueError("Point must be instance of theType")
             else:
-                self.point = point
-                self.below = below
+                setAttr(self, "point", point)
+                setAttr(self, "below", below)
+                setAttr(self, "key", (1, point, -1 if below else 1))
+    def __setattr__(self, name, val):
+        raise AttributeError("Cut objects are immutable")
+    def __delattr__(self, name):
+        raise AttributeError("Cut objects are immutable")
+    def __reduce__(self):
+        if self.belowAll or self.aboveAll:
+            return (_sentinel, (self.theType, self.aboveAll))
+        return (Cut, (self.theType, False, False, self.point, self.below))
     def _validate_query_pt(self, pt):
         if not isinstance(pt, self.theType):
             raise ValueError("Type is not compatible with cutpoint type")
         return True
     def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            pass
         if self.belowAll:
-            return hash(self.theType)*31-hash(None)
+            theHash = hash(self.theType)*31-hash(None)
         elif self.aboveAll:
-            return hash(self.theType)*31+hash(None)
+            theHash = hash(self.theType)*31+hash(None)
         elif self.below:
-            return hash(self.theType)*31-hash(self.point)
+            theHash = hash(self.theType)*31-hash(self.point)
         else:
-            return hash(self.theType)*31+hash(self.point)
+            theHash = hash(self.theType)*31+hash(self.point)
+        object.__setattr__(self, "_hash", theHash)
+        return theHash
     def __repr__(self):
         if self.belowAll:
             return "Cut(Below all %s)" % str(self.theType)
@@ -83,58 +163,24 @@ class Cut(object):
         elif self > other: return 1
     def __eq__(self, other):
         """ Returns whether Cuts are at EXACT same place """
-        if not isinstance(other, Cut):
+        if self is other:
+            return True
+        elif not isinstance(other, Cut):
             return False
-        elif self.aboveAll:
-            return other.aboveAll
-        elif self.belowAll:
-            return other.belowAll
-        elif (self.point is not None) and (other.point is not None):
-            return ((self.point == other.point) and (self.below == other.below))
         else:
-            return False
+            return self.key == other.key
     def __ne__(self, other):
         return not self.__eq__(other)
     def __lt__(self, other):
         """ Returns whether cutpoint is less than a specified value """
         if isinstance(other, Cut):
-            if self.belowAll:
-                return True
-            elif self.aboveAll:
-                return False
-            elif other.belowAll:
-                return False
-            elif other.aboveAll:
-                return True
-            else:
-                if self.point < other.point:
-                    return True
-                elif self.point == other.point and self.below and \
-                  not other.below:
-                    return True
-                else:
-                    return False
+            return self.key < other.key
         else:
             return self.isLessThan(other)
     def __gt__(self, other):
         """ Returns whether cutpoint is greater than a specified value """
         if isinstance(other, Cut):
-            if self.belowAll:
-                return False
-            elif self.aboveAll:
-                return True
-            elif other.belowAll:
-                return True
-            elif other.aboveAll:
-                return False
-            else:
-                if self.point > other.point:
-                    return True
-                elif self.point == other.point and not self.below and \
-                  other.below:
-                    return True
-                else:
-                    return False
+            return self.key > other.key
         else:
             return self.isGreaterThan(other)
     def __ge__(self, other):
@@ -215,20 +261,6 @@ class Cut(object):
         else:
             return Cut(theType, point=val, below=True)
     @staticmethod
-    def belowAll(theType):
-        """ Create a cut point outside the lower end of the domain
-
-        Parameters
-        ----------
-        theType : type
-            Most inclusive type that can be used for comparison.
-         
-        Returns
-        -------
-        The cut object
-        """
-        return Cut(theType, belowAll=True)
-    @staticmethod
     def aboveValue(val, theType=None):
         """ Create a cut point, where everything above some value is
         included
@@ -249,19 +281,5 @@ class Cut(object):
             return Cut(type(val), point=val, below=False)
         else:
             return Cut(theType, point=val, below=False)
-    @staticmethod
-    def aboveAll(theType):
-        """ Create a cut point outside the upper end of the domain
-
-        Parameters
-        ----------
-        theType : type
-            Most inclusive type that can be used for comparison
-        
-        Returns
-        -------
-        The cut object
-        """
-        return Cut(theType, aboveAll=True)
 
     
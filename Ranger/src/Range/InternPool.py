@@ -0,0 +1,103 @@
+from weakref import WeakValueDictionary
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+
+def _table(tables, types):
+    """ Returns the table of shared objects for a tuple of types """
+    try:
+        return tables[types]
+    except KeyError:
+        table = tables[types] = WeakValueDictionary()
+        return table
+
+class InternPool(object):
+    """ Class used to share one Cut object between all equal cuts, and one
+    Range object between all equal ranges, passed through it. Data that
+    reuses the same endpoints many times over, such as exon boundaries
+    shared by many transcripts, then holds a single copy of each, and
+    comparisons between shared objects stop at the identity check.
+
+    The pool only holds weak references, so an object is dropped from it
+    once nothing else refers to it
+    """
+    def __init__(self):
+        """ Instantiates an empty InternPool """
+        # Shared cuts and ranges, in a table for each domain type and
+        # point type(s), so that 1 and 1.0 (which hash and compare equal)
+        # are not shared. Within a table, cuts are keyed by their own sort
+        # keys, and ranges by the sort keys of their cuts
+        self._cuts = {}
+        self._ranges = {}
+    def __len__(self):
+        return self._count(self._cuts) + self._count(self._ranges)
+    def __reduce__(self):
+        # The pool only caches objects held elsewhere, so a copy starts empty
+        return (InternPool, ())
+    def __repr__(self):
+        return "InternPool(%d cuts, %d ranges)" % (self._count(self._cuts),
+                                                   self._count(self._ranges))
+    def cut(self, aCut):
+        """ Returns the shared Cut equal to a cut, which becomes the shared
+        one if there is none yet
+
+        Parameters
+        ----------
+        aCut : Cut object
+            The cut to look up
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a Cut
+
+        Returns
+        -------
+        The shared Cut object
+        """
+        if not isinstance(aCut, Cut):
+            raise TypeError("aCut is not a Cut")
+        return self._cut(aCut)
+    def range(self, aRange):
+        """ Returns the shared Range equal to a range, which becomes the
+        shared one if there is none yet. The cuts of a new shared range
+        are themselves shared
+
+        Parameters
+        ----------
+        aRange : Range object
+            The range to look up
+
+        Raises
+        ------
+        TypeError
+            If the object passed in is not a Range
+
+        Returns
+        -------
+        The shared Range object
+        """
+        if not isinstance(aRange, Range):
+            raise TypeError("aRange is not a Range")
+        lowerCut = self._cut(aRange.lowerCut)
+        upperCut = self._cut(aRange.upperCut)
+        ranges = _table(self._ranges, (lowerCut.theType, type(lowerCut.point),
+                                       type(upperCut.point)))
+        key = (lowerCut.key, upperCut.key)
+        shared = ranges.get(key)
+        if shared is None:
+            if lowerCut is aRange.lowerCut and upperCut is aRange.upperCut:
+                shared = aRange
+            else:
+                shared = Range(lowerCut, upperCut)
+            ranges[key] = shared
+        return shared
+    def _count(self, tables):
+        """ Returns the number of objects held in a group of tables """
+        return sum(len(table) for table in tables.values())
+    def _cut(self, aCut):
+        """ Returns the shared Cut equal to a cut """
+        cuts = _table(self._cuts, (aCut.theType, type(aCut.point)))
+        shared = cuts.get(aCut.key)
+        if shared is None:
+            cuts[aCut.key] = shared = aCut
+        return shared
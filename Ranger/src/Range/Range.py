@@ -4,8 +4,9 @@ class Range(object):
     """
     Class used to represent a range along some 1-D domain. The range
     is represented by 2 cutpoints can can be unbounded by specifying an
-    aboveAll or belowAll Cut.
+    aboveAll or belowAll Cut. Ranges are immutable
     """
+    __slots__ = ("lowerCut", "upperCut", "_hash", "__weakref__")
     def __init__(self, lowerCut, upperCut):
         """ Instantiates a Range
 
@@ -25,8 +26,14 @@ class Range(object):
             raise ValueError("Bounds must be Cut objects")
         elif lowerCut > upperCut:
             raise ValueError("Lower bound cannot be greater than upper bound")
-        self.lowerCut = lowerCut
-        self.upperCut = upperCut
+        object.__setattr__(self, "lowerCut", lowerCut)
+        object.__setattr__(self, "upperCut", upperCut)
+    def __setattr__(self, name, val):
+        raise AttributeError("Range objects are immutable")
+    def __delattr__(self, name):
+        raise AttributeError("Range objects are immutable")
+    def __reduce__(self):
+        return (Range, (self.lowerCut, self.upperCut))
     def __repr__(self):
         try:
             return_str = '[' if self.isLowerBoundClosed() else '('
@@ -43,9 +50,16 @@ class Range(object):
             return_str += ')'
         return return_str
     def __hash__(self):
-        return (hash(self.lowerCut)*31 + hash(self.upperCut))
+        try:
+            return self._hash
+        except AttributeError:
+            theHash = hash(self.lowerCut)*31 + hash(self.upperCut)
+            object.__setattr__(self, "_hash", theHash)
+            return theHash
     def __eq__(self, other):
-        if not isinstance(other, Range):
+        if self is other:
+            return True
+        elif not isinstance(other, Range):
             return False
         else:
             return ((self.lowerCut == other.lowerCut) and \
@@ -0,0 +1,181 @@
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip
+from Ranger.src.Range.Cut import Cut, _belowAll, _aboveAll
+from Ranger.src.Range.Range import Range
+
+# Setters of the slots of Cut and Range objects. Calling these directly
+# skips the immutability guard in their __setattr__
+_setTheType = Cut.__dict__["theType"].__set__
+_setAboveAll = Cut.__dict__["aboveAll"].__set__
+_setBelowAll = Cut.__dict__["belowAll"].__set__
+_setPoint = Cut.__dict__["point"].__set__
+_setBelow = Cut.__dict__["below"].__set__
+_setKey = Cut.__dict__["key"].__set__
+_setLowerCut = Range.__dict__["lowerCut"].__set__
+_setUpperCut = Range.__dict__["upperCut"].__set__
+
+def _trustedCut(theType, point, below):
+    """ Builds a Cut at a point without checking it """
+    cut = object.__new__(Cut)
+    _setTheType(cut, theType)
+    _setAboveAll(cut, False)
+    _setBelowAll(cut, False)
+    _setPoint(cut, point)
+    _setBelow(cut, below)
+    _setKey(cut, (1, point, -1 if below else 1))
+    return cut
+
+def _trustedRange(lowerCut, upperCut):
+    """ Builds a Range from two cuts without checking them """
+    aRange = object.__new__(Range)
+    _setLowerCut(aRange, lowerCut)
+    _setUpperCut(aRange, upperCut)
+    return aRange
+
+class RangeFactory(object):
+    """ Class used to build many Ranges and Cuts over a single domain.
+    The domain type is checked once, when the factory is made, after which
+    ranges are built without the checks the Range and Cut factories make
+    on every call. Points are trusted to be instances of the type, and the
+    lower point of a range to be no greater than its upper point (and less
+    than it for an open range)
+    """
+    def __init__(self, theType, pool = None):
+        """ Instantiates a RangeFactory
+
+        Parameters
+        ----------
+        theType : type
+            The type of the points of every range built
+        pool : InternPool, optional
+            If given, every range and cut built is shared through the pool
+
+        Raises
+        ------
+        TypeError
+            If theType is not a type
+        ValueError
+            If the type is not comparable
+        """
+        if not isinstance(theType, type):
+            raise TypeError("theType must be a type")
+        Range._validate_cutpoints(theType)
+        self.theType = theType
+        self._belowAll = _belowAll(theType)
+        self._aboveAll = _aboveAll(theType)
+        self.pool = pool
+        if pool is None:
+            self._cut = _trustedCut
+            self._range = _trustedRange
+        else:
+            self._cut = lambda theType, point, below: \
+                pool.cut(_trustedCut(theType, point, below))
+            self._range = lambda lowerCut, upperCut: \
+                pool.range(_trustedRange(lowerCut, upperCut))
+    def __repr__(self):
+        return "RangeFactory(%s)" % self.theType.__name__
+    ########
+    # Cuts #
+    ########
+    def belowAll(self):
+        """ Returns the cut below all values of the domain """
+        return self._belowAll
+    def aboveAll(self):
+        """ Returns the cut above all values of the domain """
+        return self._aboveAll
+    def belowValue(self, val):
+        """ Returns the cut just below a value """
+        return self._cut(self.theType, val, True)
+    def aboveValue(self, val):
+        """ Returns the cut just above a value """
+        return self._cut(self.theType, val, False)
+    ##########
+    # Ranges #
+    ##########
+    def closed(self, lower, upper):
+        """ Creates a range including the endpoints (i.e. [lower, upper]) """
+        theType = self.theType
+        makeCut = self._cut
+        return self._range(makeCut(theType, lower, True),
+                           makeCut(theType, upper, False))
+    def closedOpen(self, lower, upper):
+        """ Creates a range including the lower endpoint
+        (i.e. [lower, upper)) """
+        theType = self.theType
+        makeCut = self._cut
+        return self._range(makeCut(theType, lower, True),
+                           makeCut(theType, upper, True))
+    def openClosed(self, lower, upper):
+        """ Creates a range including the upper endpoint
+        (i.e. (lower, upper]) """
+        theType = self.theType
+        makeCut = self._cut
+        return self._range(makeCut(theType, lower, False),
+                           makeCut(theType, upper, False))
+    def open(self, lower, upper):
+        """ Creates a range excluding the endpoints (i.e. (lower, upper)) """
+        theType = self.theType
+        makeCut = self._cut
+        return self._range(makeCut(theType, lower, False),
+                           makeCut(theType, upper, True))
+    def lessThan(self, val):
+        """ Creates a range of all values less than some value
+        (i.e. (-inf, val)) """
+        return self._range(self._belowAll,
+                           self._cut(self.theType, val, True))
+    def atMost(self, val):
+        """ Creates a range of all values less than or equal to some value
+        (i.e. (-inf, val]) """
+        return self._range(self._belowAll,
+                           self._cut(self.theType, val, False))
+    def greaterThan(self, val):
+        """ Creates a range of all values greater than some value
+        (i.e. (val, inf)) """
+        return self._range(self._cut(self.theType, val, False),
+                           self._aboveAll)
+    def atLeast(self, val):
+        """ Creates a range of all values greater than or equal to some
+        value (i.e. [val, inf)) """
+        return self._range(self._cut(self.theType, val, True),
+                           self._aboveAll)
+    def from_bounds(self, lowers, uppers, lowerClosed = True,
+                    upperClosed = True):
+        """ Creates a range for each pair of a lower and an upper point
+
+        Parameters
+        ----------
+        lowers : Sequence of points
+            The lower point of each range
+        uppers : Sequence of points
+            The upper point of each range, paired with lowers
+        lowerClosed : boolean
+            Whether the ranges include their lower points
+        upperClosed : boolean
+            Whether the ranges include their upper points
+
+        Raises
+        ------
+        ValueError
+            If the sequences differ in length
+
+        Returns
+        -------
+        List of Range objects, in the order of the points
+        """
+        if len(lowers) != len(uppers):
+            raise ValueError("lowers and uppers differ in length")
+        # Arrays (such as numpy's) give back plain points
+        if hasattr(lowers, "tolist"):
+            lowers = lowers.tolist()
+        if hasattr(uppers, "tolist"):
+            uppers = uppers.tolist()
+        theType = self.theType
+        lowerBelow = lowerClosed
+        upperBelow = not upperClosed
+        makeCut = self._cut
+        makeRange = self._range
+        return [makeRange(makeCut(theType, lower, lowerBelow),
+                          makeCut(theType, upper, upperBelow))
+                for lower, upper in izip(lowers, uppers)]
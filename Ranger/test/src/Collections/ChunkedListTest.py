@@ -0,0 +1,95 @@
+import bisect
+import unittest
+from Ranger.src.Collections.ChunkedList import ChunkedList, makeList, \
+     bisect_left, bisect_right
+
+debug = False
+
+class ChunkedListTest(unittest.TestCase):
+    """ Unit Tests for ChunkedList.py """
+    def test_insert(self):
+        if debug: print("Testing insert")
+        theList = ChunkedList(load = 4)
+        expected = []
+        for i in range(50):
+            theList.insert(i//2, i)
+            expected.insert(i//2, i)
+        self.assertEqual(len(theList), 50)
+        self.assertEqual(list(theList), expected)
+        self.assertEqual(theList[0], expected[0])
+        self.assertEqual(theList[-1], expected[-1])
+        self.assertEqual(theList[10:20], expected[10:20])
+        self.assertEqual(list(reversed(theList)), expected[::-1])
+        theList.insert(-1, 'a')
+        expected.insert(-1, 'a')
+        theList.insert(1000, 'b')
+        expected.insert(1000, 'b')
+        self.assertEqual(theList, expected)
+    def test_pop(self):
+        if debug: print("Testing pop")
+        theList = ChunkedList(range(40), load = 4)
+        expected = list(range(40))
+        self.assertEqual(theList.pop(), expected.pop())
+        self.assertEqual(theList.pop(0), expected.pop(0))
+        while len(expected) > 0:
+            ind = len(expected)//3
+            self.assertEqual(theList.pop(ind), expected.pop(ind))
+            self.assertEqual(list(theList), expected)
+        with self.assertRaises(IndexError):
+            theList.pop()
+    def test_slices(self):
+        if debug: print("Testing slice assignment and deletion")
+        theList = ChunkedList(range(30), load = 4)
+        expected = list(range(30))
+        theList[5:20] = ['a','b']
+        expected[5:20] = ['a','b']
+        self.assertEqual(list(theList), expected)
+        theList[2:3] = range(10)
+        expected[2:3] = range(10)
+        self.assertEqual(list(theList), expected)
+        del theList[1:-1]
+        del expected[1:-1]
+        self.assertEqual(list(theList), expected)
+        theList[1] = 'c'
+        expected[1] = 'c'
+        self.assertEqual(list(theList), expected)
+    def test_chunk_sizes(self):
+        if debug: print("Testing chunk sizes")
+        theList = ChunkedList(range(512), load = 16)
+        expected = list(range(512))
+        for i in range(5000):
+            theList[len(theList)//2:len(theList)//2] = [i]
+            expected[len(expected)//2:len(expected)//2] = [i]
+        sizes = [len(chunk) for chunk in theList._chunks]
+        self.assertTrue(min(sizes) >= 8 and max(sizes) <= 32)
+        self.assertEqual(list(theList), expected)
+        while len(expected) > 100:
+            mid = len(expected)//2
+            del theList[mid-3:mid]
+            del expected[mid-3:mid]
+        sizes = [len(chunk) for chunk in theList._chunks]
+        self.assertTrue(min(sizes) >= 8 and max(sizes) <= 32)
+        self.assertEqual(list(theList), expected)
+        self.assertEqual([theList[i] for i in range(len(expected))], expected)
+    def test_bisect(self):
+        if debug: print("Testing bisect")
+        values = sorted([i//3 for i in range(100)])
+        theList = ChunkedList(values, load = 4)
+        for val in range(-1, 36):
+            for lo, hi in ((0, None), (10, 50), (40, 45)):
+                end = len(values) if hi is None else hi
+                self.assertEqual(theList.bisect_left(val, lo, hi),
+                                 bisect.bisect_left(values, val, lo, end))
+                self.assertEqual(bisect_right(theList, val, lo, hi),
+                                 bisect.bisect_right(values, val, lo, end))
+        self.assertEqual(bisect_left([1,2,3], 2), 1)
+        self.assertEqual(ChunkedList().bisect_right(5), 0)
+    def test_makeList(self):
+        if debug: print("Testing makeList")
+        self.assertEqual(makeList("list", [1,2]), [1,2])
+        self.assertTrue(isinstance(makeList("chunked"), ChunkedList))
+        with self.assertRaises(ValueError):
+            makeList("foo")
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
@@ -1,12 +1,24 @@
 import unittest
 from Ranger.test.src.Collections.RangeSetTest import RangeSetTest
 from Ranger.test.src.Collections.RangeMapTest import RangeMapTest
+from Ranger.test.src.Collections.ChunkedListTest import ChunkedListTest
+from Ranger.test.src.Collections.CutArrayTest import CutArrayTest
+from Ranger.test.src.Collections.IntervalTreeTest import IntervalTreeTest
+from Ranger.test.src.Collections.NCListTest import NCListTest
+from Ranger.test.src.Collections.CoverageMapTest import CoverageMapTest
+from Ranger.test.src.Collections.RangeArrayTest import RangeArrayTest
 
 class CollectionsTestSuite(unittest.TestSuite):
     def __init__(self):
         super(CollectionsTestSuite, self).__init__()
         self.addTest(unittest.makeSuite(RangeSetTest))
         self.addTest(unittest.makeSuite(RangeMapTest))
+        self.addTest(unittest.makeSuite(ChunkedListTest))
+        self.addTest(unittest.makeSuite(CutArrayTest))
+        self.addTest(unittest.makeSuite(IntervalTreeTest))
+        self.addTest(unittest.makeSuite(NCListTest))
+        self.addTest(unittest.makeSuite(CoverageMapTest))
+        self.addTest(unittest.makeSuite(RangeArrayTest))
 
 if __name__ == "__main__":
     runner = unittest.TextTestRunner()
@@ -0,0 +1,79 @@
+import unittest
+from Ranger.src.Collections.CoverageMap import CoverageMap
+from Ranger.src.Collections.RangeSet import RangeSet
+from Ranger.src.Range.Range import Range
+
+debug = False
+
+class CoverageMapTest(unittest.TestCase):
+    """ Unit Tests for CoverageMap.py """
+    def makeMap(self, backend = "list"):
+        return CoverageMap([Range.closed(1,10), Range.closedOpen(3,6),
+                            Range.open(5,12), Range.closedOpen(4,4)],
+                           backend = backend)
+    def test_build(self):
+        if debug: print("Testing build")
+        coverage = self.makeMap()
+        self.assertEqual(list(coverage), [
+            (Range.closedOpen(1,3),1), (Range.closed(3,5),2),
+            (Range.open(5,6),3), (Range.closed(6,10),2),
+            (Range.open(10,12),1)])
+        self.assertEqual(len(coverage), 5)
+        self.assertEqual(len(CoverageMap()), 0)
+        with self.assertRaises(TypeError):
+            CoverageMap([3])
+        with self.assertRaises(ValueError):
+            CoverageMap([Range.closed(1,2), Range.closed('a','b')])
+    def test_add_remove(self):
+        if debug: print("Testing add and remove")
+        for backend in ("list", "chunked", "compact"):
+            coverage = CoverageMap(backend = backend)
+            coverage.add(Range.closed(1,10))
+            coverage.add(Range.closedOpen(3,6))
+            coverage.add(Range.open(5,12))
+            coverage.add(Range.closedOpen(4,4))
+            self.assertEqual(coverage, self.makeMap())
+            coverage.remove(Range.closedOpen(3,6))
+            self.assertEqual(list(coverage), [
+                (Range.closed(1,5),1), (Range.openClosed(5,10),2),
+                (Range.open(10,12),1)])
+            self.assertEqual(coverage, CoverageMap([Range.closed(1,10),
+                                                    Range.open(5,12)]))
+            with self.assertRaises(KeyError):
+                coverage.remove(Range.closed(0,2))
+            coverage.remove(Range.closed(1,10))
+            coverage.remove(Range.open(5,12))
+            self.assertEqual(len(coverage), 0)
+            self.assertEqual(len(coverage.depths), 0)
+            with self.assertRaises(TypeError):
+                coverage.add(3)
+    def test_depth_at(self):
+        if debug: print("Testing depth_at")
+        coverage = self.makeMap()
+        self.assertEqual([coverage.depth_at(val) for val in
+                          [0,1,3,4,5,6,10,11,12]],
+                         [0,1,2,2,2,2,2,1,0])
+        coverage.add(Range.atLeast(12))
+        self.assertEqual(coverage.depth_at(100), 1)
+        self.assertEqual(CoverageMap().depth_at(3), 0)
+        with self.assertRaises(ValueError):
+            coverage.depth_at('a')
+    def test_segments(self):
+        if debug: print("Testing segments and covered_length")
+        coverage = self.makeMap()
+        self.assertEqual(coverage.segments(),
+                         RangeSet([Range.closedOpen(1,12)]))
+        self.assertEqual(coverage.segments(2), RangeSet([Range.closed(3,10)]))
+        self.assertEqual(coverage.segments(3), RangeSet([Range.open(5,6)]))
+        self.assertEqual(len(coverage.segments(4)), 0)
+        self.assertEqual(coverage.covered_length(), 11)
+        self.assertEqual(coverage.covered_length(2), 7)
+        self.assertEqual(CoverageMap().covered_length(), 0)
+        coverage.add(Range.lessThan(0))
+        with self.assertRaises(ValueError):
+            coverage.covered_length()
+        self.assertEqual(coverage.covered_length(2), 7)
+
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
@@ -0,0 +1,66 @@
+import unittest
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.CutArray import CutArray, RangeView, overlapKind, \
+     DISJOINT, TOUCHING, LEFT_OVERLAP, RIGHT_OVERLAP, ENCLOSED, ENCLOSES
+
+debug = False
+
+class CutArrayTest(unittest.TestCase):
+    """ Unit Tests for CutArray.py """
+    def test_cuts(self):
+        if debug: print("Testing cuts")
+        cuts = [Cut.belowAll(theType=int), Cut.belowValue(1), Cut.aboveValue(1),
+                Cut.belowValue(4), Cut.aboveAll(theType=int)]
+        theArray = CutArray()
+        for cut in cuts:
+            theArray.append(cut)
+        self.assertEqual(theArray.points.typecode in ('q','l'), True)
+        self.assertEqual(len(theArray), 5)
+        self.assertEqual(list(theArray), cuts)
+        self.assertEqual(theArray[1:3], cuts[1:3])
+        self.assertEqual(list(reversed(theArray)), cuts[::-1])
+        theArray.insert(3, Cut.aboveValue(2))
+        self.assertEqual(theArray[3], Cut.aboveValue(2))
+        self.assertEqual(theArray.pop(3), Cut.aboveValue(2))
+        theArray[1:3] = [Cut.aboveValue(0)]
+        self.assertEqual(theArray, [cuts[0], Cut.aboveValue(0)]+cuts[3:])
+        del theArray[0]
+        self.assertEqual(theArray[0], Cut.aboveValue(0))
+        floatArray = CutArray([Cut.belowValue(1.5)])
+        self.assertEqual(floatArray.points.typecode, 'd')
+        self.assertEqual(floatArray[0], Cut.belowValue(1.5))
+        with self.assertRaises(ValueError):
+            CutArray([Cut.belowValue("a")])
+        with self.assertRaises(ValueError):
+            theArray.append(Cut.belowValue(2.5))
+    def test_range_view(self):
+        if debug: print("Testing range view")
+        ranges = [Range.lessThan(0), Range.closed(1,2), Range.openClosed(3,4),
+                  Range.atLeast(5)]
+        lowerCuts = CutArray([aRange.lowerCut for aRange in ranges])
+        upperCuts = CutArray([aRange.upperCut for aRange in ranges])
+        theView = RangeView(lowerCuts, upperCuts)
+        self.assertEqual(len(theView), 4)
+        self.assertEqual(list(theView), ranges)
+        self.assertEqual(theView[1], ranges[1])
+        self.assertEqual(theView[-2:], ranges[-2:])
+        self.assertEqual(list(reversed(theView)), ranges[::-1])
+    def test_overlap_kind(self):
+        if debug: print("Testing overlap kind")
+        def kind(aRange, other):
+            return overlapKind(aRange.lowerCut.key, aRange.upperCut.key,
+                               other.lowerCut.key, other.upperCut.key)
+        self.assertEqual(kind(Range.closed(1,2), Range.closed(3,4)), DISJOINT)
+        self.assertEqual(kind(Range.closed(3,4), Range.open(1,3)), TOUCHING)
+        self.assertEqual(kind(Range.closedOpen(1,3), Range.closed(3,4)), TOUCHING)
+        self.assertEqual(kind(Range.closedOpen(2,2), Range.closed(1,4)), TOUCHING)
+        self.assertEqual(kind(Range.closed(3,6), Range.closed(1,3)), LEFT_OVERLAP)
+        self.assertEqual(kind(Range.closed(1,3), Range.closed(3,6)), RIGHT_OVERLAP)
+        self.assertEqual(kind(Range.closed(2,3), Range.atLeast(2)), ENCLOSED)
+        self.assertEqual(kind(Range.closed(2,3), Range.closed(2,3)), ENCLOSED)
+        self.assertEqual(kind(Range.lessThan(5), Range.lessThan(4)), ENCLOSES)
+        self.assertEqual(kind(Range.closed(1,6), Range.open(1,6)), ENCLOSES)
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
@@ -0,0 +1,112 @@
+import unittest
+from Ranger.src.Collections.IntervalTree import IntervalTree
+from Ranger.src.Range.Range import Range
+
+debug = False
+
+class IntervalTreeTest(unittest.TestCase):
+    """ Unit Tests for IntervalTree.py """
+    def makeTree(self):
+        tree = IntervalTree()
+        tree.put(Range.closed(1,10),'a')
+        tree.put(Range.closed(3,5),'b')
+        tree.put(Range.closedOpen(5,8),'c')
+        tree.put(Range.closed(3,5),'d')
+        tree.put(Range.atLeast(12),'e')
+        return tree
+    def test_put(self):
+        if debug: print("Testing put")
+        tree = self.makeTree()
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(list(tree.iteritems()), [
+            (Range.closed(1,10),'a'), (Range.closed(3,5),'b'),
+            (Range.closed(3,5),'d'), (Range.closedOpen(5,8),'c'),
+            (Range.atLeast(12),'e')])
+        tree.put(Range.closedOpen(4,4),'empty')
+        self.assertEqual(len(tree), 5)
+        with self.assertRaises(TypeError):
+            tree.put(4,'f')
+        with self.assertRaises(ValueError):
+            tree.put(Range.closed('a','b'),'f')
+    def test_overlaps(self):
+        if debug: print("Testing overlaps")
+        tree = self.makeTree()
+        self.assertTrue(tree.overlaps(4))
+        self.assertTrue(tree.overlaps(100))
+        self.assertFalse(tree.overlaps(11))
+        self.assertFalse(tree.overlaps(0))
+        self.assertTrue(tree.overlaps(Range.open(10,13)))
+        self.assertFalse(tree.overlaps(Range.open(10,12)))
+        self.assertFalse(tree.overlaps(Range.closedOpen(4,4)))
+    def test_whichOverlaps(self):
+        if debug: print("Testing whichOverlaps")
+        tree = self.makeTree()
+        self.assertEqual(tree.whichOverlaps(5), set([
+            Range.closed(1,10), Range.closed(3,5), Range.closedOpen(5,8)]))
+        self.assertEqual(tree.whichOverlaps(Range.open(8,20)), set([
+            Range.closed(1,10), Range.atLeast(12)]))
+        self.assertEqual(tree.whichOverlaps(Range.open(10,12)), set())
+        self.assertEqual(tree.overlapping(Range.closed(5,5)), [
+            (Range.closed(1,10),'a'), (Range.closed(3,5),'b'),
+            (Range.closed(3,5),'d'), (Range.closedOpen(5,8),'c')])
+    def test_get(self):
+        if debug: print("Testing get")
+        tree = self.makeTree()
+        self.assertEqual(tree.get(4), set(['a','b','d']))
+        self.assertEqual(tree[Range.closed(7,12)], set(['a','c','e']))
+        with self.assertRaises(KeyError):
+            tree.get(11)
+    def test_enclosing(self):
+        if debug: print("Testing enclosing and enclosedBy")
+        tree = self.makeTree()
+        self.assertEqual(tree.enclosing(Range.closed(4,5)), [
+            (Range.closed(1,10),'a'), (Range.closed(3,5),'b'),
+            (Range.closed(3,5),'d')])
+        self.assertEqual(tree.enclosing(6), [
+            (Range.closed(1,10),'a'), (Range.closedOpen(5,8),'c')])
+        self.assertEqual(tree.enclosedBy(Range.closed(3,8)), [
+            (Range.closed(3,5),'b'), (Range.closed(3,5),'d'),
+            (Range.closedOpen(5,8),'c')])
+        self.assertEqual(tree.enclosedBy(Range.closed(2,7)), [
+            (Range.closed(3,5),'b'), (Range.closed(3,5),'d')])
+    def test_enclosing_many(self):
+        if debug: print("Testing enclosing and enclosedBy on a large tree")
+        pairs = [(Range.closed(i % 97, i % 97 + i % 13), i) for i in range(1000)]
+        tree = IntervalTree(pairs)
+        for lower, upper in [(0,5), (10,20), (40,41), (90,110), (50,50)]:
+            query = Range.closed(lower, upper)
+            self.assertEqual(sorted(val for aRange, val in tree.enclosing(query)),
+                             [val for aRange, val in pairs if aRange.encloses(query)])
+            self.assertEqual(sorted(val for aRange, val in tree.enclosedBy(query)),
+                             [val for aRange, val in pairs if query.encloses(aRange)])
+    def test_remove(self):
+        if debug: print("Testing remove")
+        tree = self.makeTree()
+        tree.remove(Range.closed(3,5),'b')
+        self.assertEqual(tree.get(4), set(['a','d']))
+        tree.remove(Range.closed(1,10))
+        self.assertEqual(tree.get(4), set(['d']))
+        del tree[Range.closed(3,5)]
+        self.assertFalse(tree.overlaps(4))
+        self.assertEqual(len(tree), 2)
+        with self.assertRaises(KeyError):
+            tree.remove(Range.closed(3,5))
+        with self.assertRaises(KeyError):
+            tree.remove(Range.closedOpen(5,8),'a')
+        # Without a value, every equal range goes
+        tree.put(Range.closedOpen(5,8),'f')
+        tree.remove(Range.closedOpen(5,8))
+        self.assertEqual(list(tree), [Range.atLeast(12)])
+    def test_balance(self):
+        if debug: print("Testing balance under sorted inserts")
+        tree = IntervalTree((Range.closed(i,i+5), i) for i in range(1000))
+        self.assertTrue(tree._root.height <= 15)
+        self.assertEqual(tree.get(Range.closed(500,500)),
+                         set(range(495,501)))
+        for i in range(0,1000,2):
+            tree.remove(Range.closed(i,i+5))
+        self.assertTrue(tree._root.height <= 14)
+        self.assertEqual(tree.get(500), set([495,497,499]))
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
@@ -0,0 +1,107 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from array import array
+from Ranger.src.Collections.NCList import NCList
+from Ranger.src.Collections.RangeMap import RangeMap
+from Ranger.src.Range.Range import Range
+
+debug = False
+
+class NCListTest(unittest.TestCase):
+    """ Unit Tests for NCList.py """
+    def makeList(self):
+        return NCList([(Range.closed(1,10),'a'), (Range.closed(3,5),'b'),
+                       (Range.closedOpen(5,8),'c'), (Range.closed(2,12),'d'),
+                       (Range.closed(3,5),'e'), (Range.atLeast(20),'f'),
+                       (Range.closedOpen(4,4),'empty')])
+    def test_build(self):
+        if debug: print("Testing build")
+        ncList = self.makeList()
+        self.assertEqual(len(ncList), 6)
+        self.assertEqual(ncList._topLen, 3)
+        self.assertEqual(list(ncList), [
+            Range.closed(1,10), Range.closed(2,12), Range.closed(3,5),
+            Range.closed(3,5), Range.closedOpen(5,8), Range.atLeast(20)])
+        with self.assertRaises(TypeError):
+            NCList([(4,'a')])
+        with self.assertRaises(ValueError):
+            NCList([(Range.closed(1,2),'a'), (Range.closed('a','b'),'b')])
+    def test_overlaps(self):
+        if debug: print("Testing overlaps")
+        ncList = self.makeList()
+        self.assertTrue(ncList.overlaps(4))
+        self.assertTrue(ncList.overlaps(Range.open(12,21)))
+        self.assertFalse(ncList.overlaps(Range.open(12,20)))
+        self.assertFalse(ncList.overlaps(0))
+        self.assertFalse(ncList.overlaps(Range.closedOpen(4,4)))
+    def test_whichOverlaps(self):
+        if debug: print("Testing whichOverlaps")
+        ncList = self.makeList()
+        self.assertEqual(ncList.whichOverlaps(5), set([
+            Range.closed(1,10), Range.closed(3,5), Range.closedOpen(5,8),
+            Range.closed(2,12)]))
+        self.assertEqual(ncList.whichOverlaps(Range.open(8,11)), set([
+            Range.closed(1,10), Range.closed(2,12)]))
+        self.assertEqual(ncList.get(Range.closed(11,30)), set(['d','f']))
+        with self.assertRaises(KeyError):
+            ncList.get(15)
+        # Matches RangeMap on disjoint data
+        rangeMap = RangeMap()
+        rangeMap.put(Range.closed(1,10),'foo')
+        rangeMap.put(Range.open(3,6),'bar')
+        rangeMap.put(Range.open(10,20),'foo')
+        ncList = NCList(zip(rangeMap.ranges, rangeMap.items))
+        for query in (Range.closed(5,15), Range.closed(6,6), 3, 20):
+            self.assertEqual(ncList.whichOverlaps(query),
+                             rangeMap.whichOverlaps(query))
+    def test_overlapping_many(self):
+        if debug: print("Testing overlapping_many")
+        ncList = self.makeList()
+        queries = [Range.closed(11,30), 4, 15, Range.closed(7,9)]
+        self.assertEqual(ncList.overlapping_many(queries),
+                         [ncList.overlapping(query) for query in queries])
+        self.assertEqual(ncList.overlapping_many([4])[0], [
+            (Range.closed(1,10),'a'), (Range.closed(2,12),'d'),
+            (Range.closed(3,5),'b'), (Range.closed(3,5),'e')])
+    def test_pickle(self):
+        if debug: print("Testing pickling")
+        ncList = self.makeList()
+        copied = pickle.loads(pickle.dumps(ncList, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(list(copied.iteritems()), list(ncList.iteritems()))
+        self.assertEqual(copied.get(6), set(['a','c','d']))
+    def test_save_load(self):
+        if debug: print("Testing save and load")
+        ncList = self.makeList()
+        self.assertTrue(isinstance(ncList._subStart, array))
+        path = os.path.join(tempfile.mkdtemp(), "index.rng")
+        try:
+            ncList.save(path)
+            for useMmap in (True, False):
+                loaded = NCList.load(path, mmap = useMmap)
+                self.assertEqual(list(loaded.iteritems()),
+                                 list(ncList.iteritems()))
+                self.assertEqual(loaded.get(6), set(['a','c','d']))
+                queries = [Range.closed(11,30), 4, 15, Range.open(8,11)]
+                self.assertEqual(loaded.overlapping_many(queries),
+                                 ncList.overlapping_many(queries))
+                self.assertTrue(loaded.overlaps(Range.open(12,21)))
+                copied = pickle.loads(pickle.dumps(loaded,
+                                                   pickle.HIGHEST_PROTOCOL))
+                self.assertEqual(copied.get(4), set(['a','b','d','e']))
+            NCList().save(path)
+            self.assertEqual(len(NCList.load(path)), 0)
+            with self.assertRaises(ValueError):
+                RangeMap.load(path)
+            RangeMap().save(path)
+            with self.assertRaises(ValueError):
+                NCList.load(path)
+            with self.assertRaises(ValueError):
+                NCList([(Range.closed('a','b'),1)]).save(path)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
@@ -0,0 +1,105 @@
+import unittest
+from Ranger.src.Range.Range import Range
+from Ranger.src.Collections.RangeArray import RangeArray
+from Ranger.src.Collections.RangeSet import RangeSet
+from Ranger.src.Collections.RangeMap import RangeMap
+from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+debug = False
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class RangeArrayTest(unittest.TestCase):
+    """ Unit Tests for RangeArray.py """
+    def setUp(self):
+        self.ranges = [Range.closed(1,3), Range.closedOpen(2,2),
+                       Range.atLeast(5), Range.lessThan(0), Range.open(3,6)]
+        self.theArray = RangeArray.from_ranges(self.ranges)
+    def test_init(self):
+        if debug: print("Testing init")
+        self.assertEqual(len(self.theArray), 5)
+        self.assertEqual(self.theArray.theType, int)
+        self.assertEqual(self.theArray.to_ranges(), self.ranges)
+        self.assertEqual(self.theArray[-1], Range.open(3,6))
+        self.assertEqual(self.theArray[1:3].to_ranges(), self.ranges[1:3])
+        self.assertEqual(RangeArray.closedOpen(numpy.array([1.,2.]), [2.,4.]),
+                         RangeArray.from_ranges([Range.closedOpen(1.,2.),
+                                                 Range.closedOpen(2.,4.)]))
+        self.assertEqual(len(RangeArray.from_ranges([])), 0)
+        with self.assertRaises(ValueError):
+            RangeArray.closed([3], [1])
+        with self.assertRaises(ValueError):
+            RangeArray.closed([1,2], [3])
+        with self.assertRaises(TypeError):
+            RangeArray.open([1], [1])
+        with self.assertRaises(ValueError):
+            RangeArray.from_ranges([Range.closed("a","b")])
+    def test_predicates(self):
+        if debug: print("Testing predicates")
+        self.assertEqual(list(self.theArray.contains(3)),
+                         [True, False, False, False, False])
+        self.assertEqual(list(self.theArray.contains(numpy.array([1,2,9,-4,6]))),
+                         [True, False, True, True, False])
+        self.assertEqual(list(self.theArray.isEmpty()),
+                         [False, True, False, False, False])
+        other = Range.closed(0,5)
+        self.assertEqual(list(self.theArray.isConnected(other)),
+                         [r.isConnected(other) for r in self.ranges])
+        self.assertEqual(list(self.theArray.encloses(other)),
+                         [r.encloses(other) for r in self.ranges])
+        with self.assertRaises(ValueError):
+            self.theArray.contains(1.5)
+        with self.assertRaises(ValueError):
+            self.theArray.isConnected(Range.closed(1.,2.))
+    def test_combine(self):
+        if debug: print("Testing intersection and span")
+        others = RangeArray.closed([2,0,6,-5,4], [4,9,8,-1,4])
+        self.assertEqual(self.theArray.intersection(others).to_ranges(),
+                         [r.intersection(o) for r, o in \
+                          zip(self.ranges, others.to_ranges())])
+        self.assertEqual(self.theArray.span(Range.closed(2,4)).to_ranges(),
+                         [r.span(Range.closed(2,4)) for r in self.ranges])
+        with self.assertRaises(ValueError):
+            self.theArray.intersection(Range.closed(10,11))
+    def test_length(self):
+        if debug: print("Testing length")
+        self.assertEqual(list(self.theArray[[0,1,4]].length()), [2,0,3])
+        with self.assertRaises(ValueError):
+            self.theArray.length()
+    def test_sort(self):
+        if debug: print("Testing sort")
+        self.assertEqual(self.theArray.sorted().to_ranges(),
+                         [Range.lessThan(0), Range.closed(1,3),
+                          Range.closedOpen(2,2), Range.open(3,6),
+                          Range.atLeast(5)])
+        self.assertEqual(list(self.theArray.argsort(byUpper = True)),
+                         [3, 1, 0, 4, 2])
+    def test_collections(self):
+        if debug: print("Testing collections")
+        for backend in ("list", "compact"):
+            theSet = RangeSet.from_array(self.theArray, backend = backend)
+            self.assertEqual(theSet, RangeSet(self.ranges))
+            self.assertEqual(theSet.to_array().to_ranges(), list(theSet))
+            disjoint = theSet.to_array()
+            theMap = RangeMap.from_array(disjoint, "ab", backend = backend)
+            self.assertEqual(list(theMap.items), ["a","b"])
+            self.assertEqual(theMap.to_array(), disjoint)
+            theMap.put(Range.closed(2,3), "c")
+            self.assertEqual(theMap.get(2), set(["c"]))
+            # Overlapping ranges go through from_items
+            theMap = RangeMap.from_array(RangeArray.closed([1,2], [5,3]), "ab",
+                                         backend = backend)
+            self.assertEqual(list(theMap.items), ["a","b","a"])
+            buckets = RangeBucketMap.from_array(RangeArray.closed([1,2], [5,3]),
+                                                "ab", backend = backend)
+            self.assertEqual(list(buckets.items),
+                             [set(["a"]), set(["a","b"]), set(["a"])])
+            with self.assertRaises(ValueError):
+                RangeMap.from_array(disjoint, "a")
+
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
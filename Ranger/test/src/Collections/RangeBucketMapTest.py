@@ -1,6 +1,7 @@
 import unittest
 from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
 from Ranger.src.Range.Range import Range
+from Ranger.src.Range.InternPool import InternPool
 
 debug = False
 
@@ -106,6 +107,99 @@ class RangeBucketMapTest(unittest.TestCase):
         self.assertEquals(next(iterator), (Range.closed(7,8), 'b'))
         with self.assertRaises(StopIteration):
             next(iterator)        
+        # Runs end at gaps and where a value drops out, even while a
+        # longer run is still going
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(1,10),'a')
+        buckets.put(Range.closed(2,3),'b')
+        buckets.put(Range.closed(6,7),'b')
+        buckets.put(Range.closed(12,14),'a')
+        self.assertEqual(list(buckets.iteritems()), [
+            (Range.closed(2,3),'b'), (Range.closed(6,7),'b'),
+            (Range.closed(1,10),'a'), (Range.closed(12,14),'a')])
+        self.assertEqual(list(RangeBucketMap().iteritems()), [])
+    def test_from_items(self):
+        if debug: print("Testing from_items")
+        pairs = [(Range.closed(3,5),'a'), (Range.closed(7,10),'b'),
+                 (Range.closed(4,8),'c'), (Range.closed(4,5),'a'),
+                 (Range.closedOpen(6,6),'d')]
+        buckets = RangeBucketMap.from_items(pairs)
+        expected = RangeBucketMap()
+        for key, val in pairs:
+            expected.put(key, val)
+        self.assertEqual(buckets, expected)
+        self.assertEqual(len(buckets),5)
+        self.assertEqual(buckets.ranges[0], Range.closedOpen(3,4))
+        self.assertEqual(buckets.ranges[1], Range.closed(4,5))
+        self.assertEqual(buckets.ranges[2], Range.open(5,7))
+        self.assertEqual(buckets.ranges[3], Range.closed(7,8))
+        self.assertEqual(buckets.ranges[4], Range.openClosed(8,10))
+        self.assertEqual(buckets.items[0], set(['a']))
+        self.assertEqual(buckets.items[1], set(['a','c']))
+        self.assertEqual(buckets.items[2], set(['c']))
+        self.assertEqual(buckets.items[3], set(['b','c']))
+        self.assertEqual(buckets.items[4], set(['b']))
+        # Buckets are independent of each other
+        buckets.put(Range.closed(3,3),'e')
+        self.assertEqual(buckets.items[1], set(['a']))
+        with self.assertRaises(TypeError):
+            RangeBucketMap.from_items([(Range.closed(1,2),['a'])])
+        with self.assertRaises(ValueError):
+            RangeBucketMap.from_items([(Range.closed(1,2),'a'),
+                                       (Range.closed('a','b'),'b')])
+        # Segments holding the same values share their bucket until one
+        # of them is changed
+        buckets = RangeBucketMap.from_items([(Range.closed(1,10),'a'),
+                                             (Range.closed(5,15),'a')])
+        self.assertEqual(list(buckets.items), [set(['a'])]*3)
+        buckets.put(Range.closed(6,6),'b')
+        self.assertEqual(list(buckets.items), [set(['a']), set(['a']),
+                                               set(['a','b']), set(['a']),
+                                               set(['a'])])
+    def test_iter_window(self):
+        if debug: print("Testing iter_window")
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(1,10), 'a')
+        buckets.put(Range.closed(5,15), 'b')
+        self.assertEqual(list(buckets.iter_window(3,7)),
+                         [(Range.closedOpen(3,5),set(['a'])),
+                          (Range.closed(5,7),set(['a','b']))])
+        self.assertEqual(list(buckets.iter_from(12, reverse = True))[0],
+                         (Range.openClosed(10,12),set(['b'])))
+    def test_put_split(self):
+        if debug: print("Testing put splitting and spanning ranges")
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(1,10),'a')
+        buckets.put(Range.closed(4,5),'b')
+        buckets.put(Range.closed(8,9),'c')
+        self.assertEqual(buckets.get(2), set(['a']))
+        self.assertEqual(buckets.get(6), set(['a']))
+        buckets.put(Range.closed(0,20),'d')
+        self.assertEqual(list(buckets.ranges), [
+            Range.closedOpen(0,1), Range.closedOpen(1,4), Range.closed(4,5),
+            Range.open(5,8), Range.closed(8,9), Range.openClosed(9,10),
+            Range.openClosed(10,20)])
+        self.assertEqual([sorted(bucket) for bucket in buckets.items], [
+            ['d'], ['a','d'], ['a','b','d'], ['a','d'], ['a','c','d'],
+            ['a','d'], ['d']])
+        with self.assertRaises(TypeError):
+            buckets.put(Range.closed(1,2), ['unhashable'])
+        with self.assertRaises(ValueError):
+            buckets.put(Range.closed(1.5,2.5), 'e')
+    def test_pool(self):
+        if debug: print("Testing pool")
+        pool = InternPool()
+        buckets = RangeBucketMap(pool = pool)
+        buckets.put(Range.closedOpen(1,6), 'a')
+        buckets.put(Range.closedOpen(3,9), 'b')
+        self.assertEqual(list(buckets.ranges),
+                         [Range.closedOpen(1,3), Range.closedOpen(3,6),
+                          Range.closedOpen(6,9)])
+        # Back to back segments share their boundary cuts
+        for ind in range(2):
+            self.assertIs(buckets.upper_cuts[ind], buckets.lower_cuts[ind+1])
+        self.assertIs(buckets.ranges[1], pool.range(Range.closedOpen(3,6)))
+        self.assertEqual(buckets.get(4), set(['a','b']))
 if __name__ == "__main__":
     debug = True
     unittest.main(exit = False)
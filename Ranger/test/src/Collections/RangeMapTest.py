@@ -1,6 +1,15 @@
+import os
+import shutil
+import tempfile
 import unittest
 from Ranger.src.Collections.RangeMap import RangeMap
+from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
 from Ranger.src.Range.Range import Range
+from Ranger.src.Range.RangeFactory import RangeFactory
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 debug = False
 
@@ -112,6 +121,219 @@ class RangeMapTest(unittest.TestCase):
                          set([]))
         self.assertEqual(theMap.whichOverlaps(Range.closed(4,11)),
                          set([Range.closed(3,5), Range.closed(7,10)]))        
+    def test_from_items(self):
+        if debug: print("Testing from_items")
+        pairs = [(Range.closed(1,10),'foo'), (Range.open(3,6),'bar'),
+                 (Range.open(10,20),'foo'), (Range.closed(5,12),'baz'),
+                 (Range.closedOpen(4,4),'empty'), (Range.closed(4,4),'bar')]
+        rangeMap = RangeMap.from_items(pairs)
+        expected = RangeMap()
+        for key, val in pairs:
+            expected.put(key, val)
+        self.assertEqual(rangeMap, expected)
+        self.assertEqual(rangeMap.ranges, [Range.closed(1,3), Range.open(3,4),
+                                           Range.closed(4,4), Range.open(4,5),
+                                           Range.closed(5,12), Range.open(12,20)])
+        self.assertEqual(rangeMap.items, ['foo','bar','bar','bar','baz','foo'])
+        self.assertEqual(len(RangeMap.from_items([])), 0)
+        with self.assertRaises(TypeError):
+            RangeMap.from_items([(3,'foo')])
+        with self.assertRaises(ValueError):
+            RangeMap.from_items([(Range.closed(1,2),'foo'),
+                                 (Range.closed('a','b'),'bar')])
+    def test_chunked_backend(self):
+        if debug: print("Testing chunked backend")
+        rangeMap = RangeMap(backend = "chunked")
+        rangeMap.put(Range.closed(1,10),'foo')
+        rangeMap.put(Range.open(3,6), 'bar')
+        rangeMap.put(Range.open(10,20), 'foo')
+        rangeMap.remove(Range.closed(5,11))
+        self.assertEqual(list(rangeMap.ranges), [Range.closed(1,3), Range.open(3,5),
+                                                 Range.open(11,20)])
+        self.assertEqual(list(rangeMap.items), ['foo','bar','foo'])
+        self.assertEqual(rangeMap.get(4), set(['bar']))
+    def test_compact_backend(self):
+        if debug: print("Testing compact backend")
+        rangeMap = RangeMap(backend = "compact")
+        rangeMap.put(Range.closed(1.,10.),'foo')
+        rangeMap.put(Range.open(3.,6.), 'bar')
+        rangeMap.put(Range.open(10.,20.), 'foo')
+        rangeMap.remove(Range.closed(5.,11.))
+        self.assertEqual(list(rangeMap.ranges), [Range.closed(1.,3.), Range.open(3.,5.),
+                                                 Range.open(11.,20.)])
+        self.assertEqual(list(rangeMap.items), ['foo','bar','foo'])
+        self.assertEqual(rangeMap.get(4.), set(['bar']))
+    def test_get_many(self):
+        if debug: print("Testing get_many")
+        theMap = RangeMap.from_items([(Range.closed(1,3),'a'),
+                                      (Range.openClosed(3,5),'b'),
+                                      (Range.atLeast(10),'c')])
+        points = [0,1,3,4,5,6,10,100]
+        expected = [None,'a','a','b','b',None,'c','c']
+        self.assertEqual(theMap.get_many(points), expected)
+        self.assertEqual(theMap.get_many(points[::-1]), expected[::-1])
+        self.assertEqual(theMap.get_many(points, default = 'x')[0], 'x')
+        self.assertEqual(theMap.get_many(points, returnIndex = True),
+                         [-1,0,0,1,1,-1,2,2])
+        self.assertEqual(RangeMap().get_many(points), [None]*len(points))
+        with self.assertRaises(ValueError):
+            theMap.get_many([1,'a'])
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_get_many_numpy(self):
+        if debug: print("Testing get_many with numpy")
+        for backend in ("list", "compact"):
+            theMap = RangeMap.from_items([(Range.closed(1,3),'a'),
+                                          (Range.openClosed(3,5),'b'),
+                                          (Range.atLeast(10),'c')],
+                                         backend = backend)
+            points = numpy.array([6,0,1,3,4,5,10,100])
+            self.assertEqual(list(theMap.get_many(points)),
+                             [None,None,'a','a','b','b','c','c'])
+            self.assertEqual(list(theMap.get_many(points, returnIndex = True)),
+                             [-1,-1,0,0,1,1,2,2])
+            with self.assertRaises(ValueError):
+                theMap.get_many(numpy.array([1.5]))
+            # Cached columns and items are dropped when the map changes
+            theMap.put(Range.closed(4,10), 'd')
+            self.assertEqual(list(theMap.get_many(points)),
+                             ['d',None,'a','a','d','d','d','c'])
+            # A batch much smaller than the map is searched point by point
+            bigMap = RangeMap.from_items([(Range.closedOpen(2*i,2*i+1),i)
+                                          for i in range(1000)],
+                                         backend = backend)
+            self.assertEqual(list(bigMap.get_many(numpy.array([9,10,1998]),
+                                                  default = -1)),
+                             [-1,5,999])
+            self.assertEqual(list(bigMap.get_many(numpy.array([10]),
+                                                  returnIndex = True)), [5])
+    def test_iter_window(self):
+        if debug: print("Testing iter_window, iter_from and reversed")
+        for backend in ("list", "chunked", "compact"):
+            theMap = RangeMap.from_items([(Range.closed(1,3),'a'),
+                                          (Range.openClosed(3,5),'b'),
+                                          (Range.atLeast(10),'c')],
+                                         backend = backend)
+            self.assertEqual(list(reversed(theMap)), [Range.atLeast(10),
+                                                      Range.openClosed(3,5),
+                                                      Range.closed(1,3)])
+            self.assertEqual(list(theMap.iter_window(2,4)),
+                             [(Range.closed(2,3),'a'), (Range.openClosed(3,4),'b')])
+            self.assertEqual(list(theMap.iter_window(4,20, reverse = True)),
+                             [(Range.closed(10,20),'c'), (Range.closed(4,5),'b')])
+            self.assertEqual(list(theMap.iter_from(5)),
+                             [(Range.closed(5,5),'b'), (Range.atLeast(10),'c')])
+            self.assertEqual(list(theMap.iter_from(3, reverse = True)),
+                             [(Range.closed(1,3),'a')])
+            with self.assertRaises(ValueError):
+                list(theMap.iter_from(1.5))
+    def test_join(self):
+        if debug: print("Testing join")
+        genes = RangeMap.from_items([(Range.closed(1,10),'g1'),
+                                     (Range.closed(20,30),'g2'),
+                                     (Range.closed(40,50),'g3')])
+        regions = RangeMap.from_items([(Range.closedOpen(0,3),'r1'),
+                                       (Range.closed(5,6),'r2'),
+                                       (Range.closed(8,25),'r3')])
+        self.assertEqual(list(genes.join(regions)), [
+            (Range.closedOpen(1,3),'g1','r1'), (Range.closed(5,6),'g1','r2'),
+            (Range.closed(8,10),'g1','r3'), (Range.closed(20,25),'g2','r3')])
+        self.assertEqual(list(genes.join(regions, how = "left")), [
+            (Range.closedOpen(1,3),'g1','r1'), (Range.closedOpen(3,5),'g1',None),
+            (Range.closed(5,6),'g1','r2'), (Range.open(6,8),'g1',None),
+            (Range.closed(8,10),'g1','r3'), (Range.closed(20,25),'g2','r3'),
+            (Range.openClosed(25,30),'g2',None), (Range.closed(40,50),'g3',None)])
+        self.assertEqual(list(genes.join(RangeMap(), how = "left")),
+                         [(key,val,None) for key,val in zip(genes.ranges, genes.items)])
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(2,4),'b1')
+        buckets.put(Range.closed(3,22),'b2')
+        self.assertEqual(list(buckets.join(genes)), [
+            (Range.closedOpen(2,3),set(['b1']),'g1'),
+            (Range.closed(3,4),set(['b1','b2']),'g1'),
+            (Range.openClosed(4,10),set(['b2']),'g1'),
+            (Range.closed(20,22),set(['b2']),'g2')])
+        with self.assertRaises(TypeError):
+            list(genes.join(Range.closed(1,2)))
+        with self.assertRaises(ValueError):
+            genes.join(regions, how = "outer")
+        with self.assertRaises(ValueError):
+            genes.join(RangeMap.from_items([(Range.closed(1.,2.), 'x')]))
+    def test_nearest(self):
+        if debug: print("Testing nearest and nearest_many")
+        theMap = RangeMap.from_items([(Range.closed(1,3),'a'),
+                                      (Range.openClosed(3,5),'b'),
+                                      (Range.atLeast(10),'c')])
+        self.assertEqual(theMap.nearest(7, k = 2),
+                         [(Range.openClosed(3,5),'b',2), (Range.atLeast(10),'c',3)])
+        self.assertEqual(theMap.nearest(Range.closed(3,4), k = 3),
+                         [(Range.closed(1,3),'a',0), (Range.openClosed(3,5),'b',0),
+                          (Range.atLeast(10),'c',6)])
+        self.assertEqual(theMap.nearest_many([0,100]),
+                         [[(Range.closed(1,3),'a',1)], [(Range.atLeast(10),'c',0)]])
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(1,10),'x')
+        buckets.put(Range.closed(5,15),'y')
+        self.assertEqual(buckets.nearest(20),
+                         [(Range.openClosed(10,15),set(['y']),5)])
+    def test_save_load(self):
+        if debug: print("Testing save and load")
+        theMap = RangeMap.from_items([(Range.closed(1.,3.),'a'),
+                                      (Range.openClosed(3.,5.),['b']),
+                                      (Range.atLeast(10.),'a')])
+        buckets = RangeBucketMap()
+        buckets.put(Range.closed(1,10),'x')
+        buckets.put(Range.closed(5,15),'y')
+        path = os.path.join(tempfile.mkdtemp(), "map.rng")
+        try:
+            theMap.save(path)
+            for useMmap in (True, False):
+                loaded = RangeMap.load(path, mmap = useMmap)
+                self.assertEqual(loaded, theMap)
+                self.assertEqual(loaded.get_many([2.,4.,11.]), ['a',['b'],'a'])
+                loaded.put(Range.closed(2.,4.),'c')
+                self.assertEqual(list(loaded.items), ['a','c',['b'],'a'])
+            with self.assertRaises(ValueError):
+                RangeBucketMap.load(path)
+            buckets.save(path)
+            for useMmap in (True, False):
+                loaded = RangeBucketMap.load(path, mmap = useMmap)
+                self.assertEqual(loaded, buckets)
+                self.assertEqual(loaded.get(7), set(['x','y']))
+                self.assertEqual(loaded.items[1], frozenset(['x','y']))
+                loaded.put(Range.closed(0,20),'z')
+                self.assertEqual(loaded.get(7), set(['x','y','z']))
+                self.assertEqual([type(bucket) for bucket in loaded.items],
+                                 [set]*len(loaded))
+            with self.assertRaises(ValueError):
+                RangeMap.load(path)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+    def test_save_load_types(self):
+        if debug: print("Testing save and load of equal values of other types")
+        values = [1, True, 1.0, 0, False]
+        theMap = RangeMap.from_items([(Range.closedOpen(i,i+1), val)
+                                      for i, val in enumerate(values)])
+        path = os.path.join(tempfile.mkdtemp(), "map.rng")
+        try:
+            theMap.save(path)
+            for useMmap in (True, False):
+                loaded = list(RangeMap.load(path, mmap = useMmap).items)
+                self.assertEqual(loaded, values)
+                self.assertEqual([type(val) for val in loaded],
+                                 [int, bool, float, int, bool])
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+    def test_trusted(self):
+        if debug: print("Testing trusted")
+        factory = RangeFactory(int)
+        theMap = RangeMap(trusted = True)
+        for aRange, val in zip(factory.from_bounds([1,4], [6,8]), "ab"):
+            theMap.put(aRange, val)
+        self.assertEqual(list(theMap.ranges),
+                         [Range.closedOpen(1,4), Range.closed(4,8)])
+        self.assertEqual(list(theMap.items), ["a","b"])
+        with self.assertRaises(TypeError):
+            theMap.put(1, "c")
 if __name__ == "__main__":
     debug = True
     unittest.main(exit = False)
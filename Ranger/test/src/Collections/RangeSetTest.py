@@ -1,7 +1,15 @@
+import os
+import shutil
+import tempfile
 import unittest
 from Ranger.src.Collections.RangeSet import RangeSet
 from Ranger.src.Range.Range import Range
+from Ranger.src.Range.RangeFactory import RangeFactory
 from Ranger.src.Range.Cut import Cut
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 debug = False
 
@@ -206,6 +214,266 @@ class RangeSetTest(unittest.TestCase):
                          set([]))
         self.assertEqual(theSet.whichOverlaps(Range.closed(4,11)),
                          set([Range.closed(3,5), Range.closed(7,10)]))
+    def test_from_ranges(self):
+        if debug: print("Testing from_ranges")
+        ranges = [Range.closed(7,10), Range.closed(2,3), Range.closedOpen(12,14),
+                  Range.closed(3,5), Range.closedOpen(6,6), Range.closed(9,11),
+                  Range.closed(14,15)]
+        theSet = RangeSet.from_ranges(ranges)
+        self.assertEqual(theSet, RangeSet(ranges))
+        self.assertEqual(theSet, RangeSet([Range.closed(2,5), Range.closed(7,11),
+                                           Range.closed(12,15)]))
+        self.assertEqual(theSet.lower_cuts, [Cut.belowValue(2), Cut.belowValue(7),
+                                             Cut.belowValue(12)])
+        self.assertEqual(theSet.upper_cuts, [Cut.aboveValue(5), Cut.aboveValue(11),
+                                             Cut.aboveValue(15)])
+        presorted = RangeSet.from_ranges([Range.closed(1,2), Range.open(2,4)],
+                                         presorted = True)
+        self.assertEqual(presorted, RangeSet([Range.closedOpen(1,4)]))
+        self.assertEqual(len(RangeSet.from_ranges([])), 0)
+        with self.assertRaises(TypeError):
+            RangeSet.from_ranges([Range.closed(1,2), 3])
+        with self.assertRaises(ValueError):
+            RangeSet.from_ranges([Range.closed(1,2), Range.closed('a','b')])
+    def test_chunked_backend(self):
+        if debug: print("Testing chunked backend")
+        ranges = [Range.closed(3,5), Range.closed(7,10), Range.closed(2,3),
+                  Range.closed(9,11), Range.closed(6,12)]
+        theSet = RangeSet(backend = "chunked")
+        listSet = RangeSet()
+        for aRange in ranges:
+            theSet.add(aRange)
+            listSet.add(aRange)
+            self.assertEqual(theSet, listSet)
+        theSet.remove(Range.closed(4,7))
+        listSet.remove(Range.closed(4,7))
+        self.assertEqual(theSet, listSet)
+        self.assertEqual(theSet.union(RangeSet([Range.closed(20,21)])).backend,
+                         "chunked")
+        with self.assertRaises(ValueError):
+            RangeSet(backend = "foo")
+    def test_compact_backend(self):
+        if debug: print("Testing compact backend")
+        ranges = [Range.closed(3,5), Range.closed(7,10), Range.closed(2,3),
+                  Range.closed(9,11), Range.atLeast(20)]
+        theSet = RangeSet(backend = "compact")
+        listSet = RangeSet()
+        for aRange in ranges:
+            theSet.add(aRange)
+            listSet.add(aRange)
+            self.assertEqual(theSet, listSet)
+        theSet.remove(Range.closed(4,7))
+        listSet.remove(Range.closed(4,7))
+        self.assertEqual(theSet, listSet)
+        self.assertTrue(theSet.contains(8))
+        self.assertEqual(RangeSet.from_ranges(ranges, backend = "compact"),
+                         RangeSet.from_ranges(ranges))
+        with self.assertRaises(ValueError):
+            RangeSet([Range.closed("a","b")], backend = "compact")
+    def test_keys(self):
+        if debug: print("Testing keys")
+        for backend in ("list", "compact"):
+            theSet = RangeSet([Range.closed(3,5), Range.open(7,10),
+                               Range.atLeast(20)], backend = backend)
+            theSet.remove(Range.closed(8,9))
+            self.assertEqual(list(theSet.lower_keys),
+                             [aRange.lowerCut.key for aRange in theSet])
+            self.assertEqual(list(theSet.upper_keys),
+                             [aRange.upperCut.key for aRange in theSet])
+            self.assertTrue(theSet.overlaps(5))
+            self.assertFalse(theSet.overlaps(8))
+            with self.assertRaises(ValueError):
+                theSet.overlaps("a")
+    def test_contains_many(self):
+        if debug: print("Testing contains_many")
+        theSet = RangeSet([Range.closed(1,3), Range.open(5,7), Range.atLeast(10)])
+        values = [0,1,3,4,5,6,7,10,100]
+        expected = [False,True,True,False,False,True,False,True,True]
+        self.assertEqual(theSet.contains_many(values), expected)
+        self.assertEqual(theSet.contains_many(values[::-1]), expected[::-1])
+        self.assertEqual(RangeSet().contains_many(values), [False]*len(values))
+        with self.assertRaises(ValueError):
+            theSet.contains_many([1,'a'])
+        if numpy is not None:
+            self.assertEqual(list(theSet.contains_many(numpy.array(values))),
+                             expected)
+            theSet.add(Range.closed(4,5))
+            self.assertEqual(list(theSet.contains_many(numpy.array(values))),
+                             [False,True,True,True,True,True,False,True,True])
+            bigSet = RangeSet.from_ranges([Range.closedOpen(2*i,2*i+1)
+                                           for i in range(1000)])
+            self.assertEqual(list(bigSet.contains_many(numpy.array([9,10]))),
+                             [False,True])
+    def test_overlaps_many(self):
+        if debug: print("Testing overlaps_many")
+        theSet = RangeSet([Range.closed(1,3), Range.open(5,7), Range.atLeast(10)])
+        ranges = [Range.lessThan(1), Range.atMost(1), Range.open(3,5),
+                  Range.closed(3,5), Range.closed(7,9), Range.closedOpen(6,6),
+                  Range.closed(50,60)]
+        expected = [False,True,False,True,False,False,True]
+        self.assertEqual(theSet.overlaps_many(ranges), expected)
+        self.assertEqual(theSet.overlaps_many(ranges[::-1]), expected[::-1])
+        with self.assertRaises(TypeError):
+            theSet.overlaps_many([1])
+        with self.assertRaises(ValueError):
+            theSet.overlaps_many([Range.closed('a','b')])
+    def test_symmetric_difference(self):
+        if debug: print("Testing symmetric_difference")
+        firstSet = RangeSet([Range.closed(3,5), Range.closed(7,10)])
+        secondSet = RangeSet([Range.closed(4,8), Range.closed(12,13)])
+        self.assertEqual(firstSet.symmetric_difference(secondSet),
+                         RangeSet([Range.closedOpen(3,4), Range.open(5,7),
+                                   Range.openClosed(8,10), Range.closed(12,13)]))
+        self.assertEqual(firstSet.symmetric_difference(firstSet), RangeSet())
+        with self.assertRaises(TypeError):
+            firstSet.symmetric_difference([Range.closed(1,2)])
+    def test_complement(self):
+        if debug: print("Testing complement")
+        theSet = RangeSet([Range.closed(3,5), Range.open(7,10)])
+        self.assertEqual(theSet.complement(),
+                         RangeSet([Range.lessThan(3), Range.openClosed(5,7),
+                                   Range.atLeast(10)]))
+        self.assertEqual(theSet.complement(Range.closed(0,8)),
+                         RangeSet([Range.closedOpen(0,3), Range.openClosed(5,7)]))
+        self.assertEqual(RangeSet().complement(Range.closed(0,8)),
+                         RangeSet([Range.closed(0,8)]))
+        with self.assertRaises(ValueError):
+            RangeSet().complement()
+        with self.assertRaises(TypeError):
+            theSet.complement(3)
+    def test_in_place(self):
+        if debug: print("Testing in place operators")
+        firstSet = RangeSet([Range.closed(3,5), Range.closed(7,10),
+                             Range.closed(20,30)])
+        secondSet = RangeSet([Range.closed(4,8)])
+        theSet = RangeSet(firstSet)
+        theSet |= secondSet
+        self.assertEqual(theSet, firstSet.union(secondSet))
+        theSet = RangeSet(firstSet)
+        theSet &= secondSet
+        self.assertEqual(theSet, firstSet.intersection(secondSet))
+        theSet = RangeSet(firstSet)
+        theSet -= secondSet
+        self.assertEqual(theSet, firstSet.difference(secondSet))
+        theSet = RangeSet(firstSet, backend = "compact")
+        theSet ^= secondSet
+        self.assertEqual(theSet, firstSet.symmetric_difference(secondSet))
+        theSet = RangeSet(firstSet)
+        theSet.update(RangeSet())
+        self.assertEqual(theSet, firstSet)
+        theSet.intersection_update(RangeSet())
+        self.assertEqual(theSet, RangeSet())
+        self.assertEqual(firstSet | secondSet, firstSet.union(secondSet))
+        self.assertEqual(firstSet - secondSet, firstSet.difference(secondSet))
+        with self.assertRaises(TypeError):
+            theSet |= [Range.closed(1,2)]
+        with self.assertRaises(TypeError):
+            theSet.update([Range.closed(1,2)])
+    def test_union_all(self):
+        if debug: print("Testing union_all, intersect_all and at_least")
+        sets = [RangeSet([Range.closed(1,5), Range.closed(10,15)]),
+                RangeSet([Range.closedOpen(3,8), Range.closed(12,20)]),
+                RangeSet([Range.open(4,11)])]
+        self.assertEqual(RangeSet.union_all(sets),
+                         RangeSet([Range.closed(1,20)]))
+        self.assertEqual(RangeSet.intersect_all(sets),
+                         RangeSet([Range.openClosed(4,5)]))
+        self.assertEqual(RangeSet.at_least(sets, 2),
+                         RangeSet([Range.closedOpen(3,8), Range.closedOpen(10,11),
+                                   Range.closed(12,15)]))
+        self.assertEqual(RangeSet.at_least(iter(sets), 4), RangeSet())
+        self.assertEqual(len(RangeSet.union_all([])), 0)
+        self.assertEqual(len(RangeSet.intersect_all([])), 0)
+        self.assertEqual(RangeSet.intersect_all(sets[:1]), sets[0])
+        with self.assertRaises(TypeError):
+            RangeSet.union_all([sets[0], Range.closed(1,2)])
+        with self.assertRaises(ValueError):
+            RangeSet.at_least(sets, 0)
+    def test_iter_window(self):
+        if debug: print("Testing iter_window, iter_from and reversed")
+        for backend in ("list", "chunked", "compact"):
+            theSet = RangeSet([Range.closed(1.,3.), Range.open(5.,8.),
+                               Range.atLeast(10.)], backend = backend)
+            self.assertEqual(list(reversed(theSet)), [Range.atLeast(10.),
+                                                      Range.open(5.,8.),
+                                                      Range.closed(1.,3.)])
+            self.assertEqual(list(theSet.iter_window(2.,6.)),
+                             [Range.closed(2.,3.), Range.openClosed(5.,6.)])
+            self.assertEqual(list(theSet.iter_window(2.,6., reverse = True)),
+                             [Range.openClosed(5.,6.), Range.closed(2.,3.)])
+            self.assertEqual(list(theSet.iter_window(3.,5.)),
+                             [Range.closed(3.,3.)])
+            self.assertEqual(list(theSet.iter_window(4.,5.)), [])
+            self.assertEqual(list(theSet.iter_window(6.,2.)), [])
+            self.assertEqual(list(theSet.iter_window()), list(theSet))
+            self.assertEqual(list(theSet.iter_from(7.)),
+                             [Range.closedOpen(7.,8.), Range.atLeast(10.)])
+            self.assertEqual(list(theSet.iter_from(7., reverse = True)),
+                             [Range.openClosed(5.,7.), Range.closed(1.,3.)])
+            with self.assertRaises(ValueError):
+                list(theSet.iter_window('a'))
+        self.assertEqual(list(RangeSet().iter_window(1,2)), [])
+    def test_nearest(self):
+        if debug: print("Testing nearest and nearest_many")
+        theSet = RangeSet([Range.closed(1,3), Range.closedOpen(10,20),
+                           Range.open(30,40)])
+        self.assertEqual(theSet.nearest(2), [(Range.closed(1,3),0)])
+        self.assertEqual(theSet.nearest(5), [(Range.closed(1,3),2)])
+        # Open bounds count from the nearest integer inside them
+        self.assertEqual(theSet.nearest(25, k = 2),
+                         [(Range.closedOpen(10,20),6), (Range.open(30,40),6)])
+        self.assertEqual(theSet.nearest(Range.closed(21,28), k = 5),
+                         [(Range.closedOpen(10,20),2), (Range.open(30,40),3),
+                          (Range.closed(1,3),18)])
+        self.assertEqual(theSet.nearest(Range.closed(2,15), k = 2),
+                         [(Range.closed(1,3),0), (Range.closedOpen(10,20),0)])
+        self.assertEqual(theSet.nearest(Range.atLeast(35)),
+                         [(Range.open(30,40),0)])
+        self.assertEqual(theSet.nearest_many([0,25,50,5], k = 1),
+                         [[(Range.closed(1,3),1)], [(Range.closedOpen(10,20),6)],
+                          [(Range.open(30,40),11)], [(Range.closed(1,3),2)]])
+        floats = RangeSet([Range.closedOpen(1.,2.)])
+        self.assertEqual(floats.nearest(3.), [(Range.closedOpen(1.,2.),1.)])
+        self.assertEqual(RangeSet().nearest(3), [])
+        with self.assertRaises(ValueError):
+            theSet.nearest(2.5)
+        with self.assertRaises(ValueError):
+            theSet.nearest(2, k = 0)
+    def test_save_load(self):
+        if debug: print("Testing save and load")
+        theSet = RangeSet([Range.closed(1,3), Range.open(5,8), Range.atLeast(10)])
+        path = os.path.join(tempfile.mkdtemp(), "set.rng")
+        try:
+            theSet.save(path)
+            for useMmap in (True, False):
+                loaded = RangeSet.load(path, mmap = useMmap)
+                self.assertEqual(loaded, theSet)
+                self.assertTrue(loaded.contains(6))
+                self.assertFalse(loaded.overlaps(Range.closed(8,9)))
+                loaded.add(Range.closed(3,5))
+                self.assertEqual(list(loaded), [Range.closedOpen(1,8),
+                                                Range.atLeast(10)])
+            self.assertEqual(RangeSet.load(path), theSet)
+            RangeSet().save(path)
+            self.assertEqual(len(RangeSet.load(path)), 0)
+            with self.assertRaises(ValueError):
+                RangeSet([Range.closed('a','b')]).save(path)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+    def test_trusted(self):
+        if debug: print("Testing trusted")
+        factory = RangeFactory(int)
+        theSet = RangeSet(factory.from_bounds([1,3,10], [4,6,12]),
+                          trusted = True)
+        self.assertEqual(theSet, RangeSet([Range.closed(1,6),
+                                           Range.closed(10,12)]))
+        theSet.remove(factory.open(2,11))
+        self.assertEqual(list(theSet), [Range.closed(1,2), Range.closed(11,12)])
+        # Type checks are skipped, but not the check for a Range
+        with self.assertRaises(TypeError):
+            theSet.add(1)
+        with self.assertRaises(ValueError):
+            RangeSet([Range.closed(1,2)]).add(Range.closed("a","b"))
 if __name__ == "__main__":
     debug = True
     unittest.main(exit = False)
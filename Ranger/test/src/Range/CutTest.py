@@ -1,4 +1,5 @@
 import unittest
+import pickle
 from Ranger.src.Range.Cut import Cut
 
 debug = False
@@ -52,6 +53,30 @@ class CutTest(unittest.TestCase):
         self.assertFalse(theCut.belowAll)
         self.assertTrue(theCut.aboveAll)
         self.assertIsNone(theCut.point)        
+    def test_immutable(self):
+        if debug: print("Testing immutable")
+        theCut = Cut.belowValue(2)
+        with self.assertRaises(AttributeError):
+            theCut.point = 3
+        with self.assertRaises(AttributeError):
+            theCut.foo = 3
+        self.assertEqual(hash(theCut), hash(Cut.belowValue(2)))
+        self.assertIs(Cut.belowAll(int), Cut.belowAll(int))
+        self.assertIs(Cut.aboveAll(int), Cut.aboveAll(int))
+        self.assertIsNot(Cut.aboveAll(int), Cut.aboveAll(float))
+        self.assertEqual(pickle.loads(pickle.dumps(theCut, 2)), theCut)
+        self.assertIs(pickle.loads(pickle.dumps(Cut.aboveAll(int))),
+                      Cut.aboveAll(int))
+    def test_key(self):
+        if debug: print("Testing key")
+        cuts = [Cut.belowAll(int), Cut.belowValue(1), Cut.aboveValue(1),
+                Cut.belowValue(2), Cut.aboveAll(int)]
+        self.assertEqual(sorted(cuts[::-1], key = lambda cut: cut.key), cuts)
+        self.assertEqual(Cut.belowValue(1).key, (1, 1, -1))
+        self.assertTrue(Cut.belowValue(1).key < (1, 1, 0) < Cut.aboveValue(1).key)
+        for cut1 in cuts:
+            for cut2 in cuts:
+                self.assertEqual(cut1 < cut2, cut1.key < cut2.key)
 if __name__ == "__main__":
     debug = True
     unittest.main(exit=False)
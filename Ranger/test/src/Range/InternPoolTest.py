@@ -0,0 +1,59 @@
+import gc
+import unittest
+import pickle
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+from Ranger.src.Range.InternPool import InternPool
+from Ranger.src.Range.RangeFactory import RangeFactory
+
+debug = False
+
+class InternPoolTest(unittest.TestCase):
+    """ Unit Tests for InternPool.py """
+    def test_cut(self):
+        if debug: print("Testing cut")
+        pool = InternPool()
+        cut = pool.cut(Cut.belowValue(3))
+        self.assertIs(pool.cut(Cut.belowValue(3)), cut)
+        self.assertIsNot(pool.cut(Cut.aboveValue(3)), cut)
+        # Equal points of different types are kept apart
+        self.assertIsNot(pool.cut(Cut.belowValue(3.)), cut)
+        self.assertIs(pool.cut(Cut.belowValue(3.)).point.__class__, float)
+        with self.assertRaises(TypeError):
+            pool.cut(3)
+    def test_range(self):
+        if debug: print("Testing range")
+        pool = InternPool()
+        first = pool.range(Range.closedOpen(1,3))
+        self.assertIs(pool.range(Range.closedOpen(1,3)), first)
+        self.assertEqual(first, Range.closedOpen(1,3))
+        # Cuts are shared between ranges
+        second = pool.range(Range.closed(3,5))
+        self.assertIs(second.lowerCut, first.upperCut)
+        self.assertIs(pool.range(Range.atLeast(2)).upperCut,
+                      Cut.aboveAll(theType = int))
+        self.assertIsNot(pool.range(Range.closedOpen(1.,3.)), first)
+        with self.assertRaises(TypeError):
+            pool.range(Cut.belowValue(1))
+    def test_weak(self):
+        if debug: print("Testing weak references")
+        pool = InternPool()
+        aRange = pool.range(Range.closed(1,2))
+        self.assertEqual(len(pool), 3)
+        del aRange
+        gc.collect()
+        self.assertEqual(len(pool), 0)
+    def test_factory(self):
+        if debug: print("Testing factory")
+        pool = InternPool()
+        factory = RangeFactory(int, pool = pool)
+        ranges = factory.from_bounds([1,1,4], [4,4,6], upperClosed = False)
+        self.assertIs(ranges[0], ranges[1])
+        self.assertIs(ranges[0].upperCut, ranges[2].lowerCut)
+        self.assertIs(factory.closedOpen(1,4), ranges[0])
+        self.assertIs(factory.belowValue(4), ranges[2].lowerCut)
+        self.assertEqual(len(pickle.loads(pickle.dumps(pool))), 0)
+
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
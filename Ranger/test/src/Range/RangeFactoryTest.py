@@ -0,0 +1,57 @@
+import unittest
+import pickle
+from Ranger.src.Range.Cut import Cut
+from Ranger.src.Range.Range import Range
+from Ranger.src.Range.RangeFactory import RangeFactory
+
+debug = False
+
+class RangeFactoryTest(unittest.TestCase):
+    """ Unit Tests for RangeFactory.py """
+    def test_init(self):
+        if debug: print("Testing init")
+        with self.assertRaises(TypeError):
+            RangeFactory(1)
+        self.assertEqual(RangeFactory(int).theType, int)
+    def test_cuts(self):
+        if debug: print("Testing cuts")
+        factory = RangeFactory(int)
+        self.assertEqual(factory.belowValue(3), Cut.belowValue(3))
+        self.assertEqual(factory.aboveValue(3), Cut.aboveValue(3))
+        self.assertEqual(factory.belowValue(3).key, (1, 3, -1))
+        self.assertIs(factory.belowAll(), Cut.belowAll(theType = int))
+        self.assertIs(factory.aboveAll(), Cut.aboveAll(theType = int))
+        with self.assertRaises(AttributeError):
+            factory.belowValue(3).point = 4
+    def test_ranges(self):
+        if debug: print("Testing ranges")
+        factory = RangeFactory(float)
+        self.assertEqual(factory.closed(1.,2.), Range.closed(1.,2.))
+        self.assertEqual(factory.closedOpen(1.,2.), Range.closedOpen(1.,2.))
+        self.assertEqual(factory.openClosed(1.,2.), Range.openClosed(1.,2.))
+        self.assertEqual(factory.open(1.,2.), Range.open(1.,2.))
+        self.assertEqual(factory.lessThan(1.), Range.lessThan(1.))
+        self.assertEqual(factory.atMost(1.), Range.atMost(1.))
+        self.assertEqual(factory.greaterThan(1.), Range.greaterThan(1.))
+        self.assertEqual(factory.atLeast(1.), Range.atLeast(1.))
+        aRange = factory.closedOpen(1.,2.)
+        self.assertEqual(hash(aRange), hash(Range.closedOpen(1.,2.)))
+        self.assertTrue(aRange.contains(1.5))
+        self.assertFalse(aRange.contains(2.))
+        self.assertEqual(pickle.loads(pickle.dumps(aRange)), aRange)
+        with self.assertRaises(AttributeError):
+            aRange.lowerCut = Cut.belowValue(0.)
+    def test_from_bounds(self):
+        if debug: print("Testing from_bounds")
+        factory = RangeFactory(int)
+        self.assertEqual(factory.from_bounds([1,5], [3,8]),
+                         [Range.closed(1,3), Range.closed(5,8)])
+        self.assertEqual(factory.from_bounds((1,5), (3,8), upperClosed = False),
+                         [Range.closedOpen(1,3), Range.closedOpen(5,8)])
+        self.assertEqual(factory.from_bounds([], []), [])
+        with self.assertRaises(ValueError):
+            factory.from_bounds([1,2], [3])
+
+if __name__ == "__main__":
+    debug = True
+    unittest.main(exit = False)
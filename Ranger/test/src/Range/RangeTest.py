@@ -1,4 +1,5 @@
 import unittest
+import pickle
 from Ranger.src.Range.Range import Range
 
 debug = False
@@ -256,6 +257,17 @@ class RangeTest(unittest.TestCase):
         self.assertAlmostEqual(range1.getDistanceFromRange(Range.closed(1.5,2.1)),0.)
         with self.assertRaises(TypeError):
             range1.getDistanceFromRange(Range.closedOpen(1.5,2.1))
+    def test_immutable(self):
+        if debug: print("Testing immutable")
+        theRange = Range.closedOpen(1,5)
+        with self.assertRaises(AttributeError):
+            theRange.lowerCut = theRange.upperCut
+        with self.assertRaises(AttributeError):
+            theRange.foo = 3
+        self.assertEqual(hash(theRange), hash(Range.closedOpen(1,5)))
+        self.assertEqual(pickle.loads(pickle.dumps(theRange)), theRange)
+        self.assertEqual(pickle.loads(pickle.dumps(Range.atLeast(2), 2)),
+                         Range.atLeast(2))
 if __name__ == "__main__":
     debug = True
     unittest.main(exit = False)
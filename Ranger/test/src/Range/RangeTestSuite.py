@@ -1,12 +1,16 @@
 import unittest
 from Ranger.test.src.Range.CutTest import CutTest
 from Ranger.test.src.Range.RangeTest import RangeTest
+from Ranger.test.src.Range.RangeFactoryTest import RangeFactoryTest
+from Ranger.test.src.Range.InternPoolTest import InternPoolTest
 
 class RangeTestSuite(unittest.TestSuite):
     def __init__(self):
         super(RangeTestSuite, self).__init__()
         self.addTest(unittest.makeSuite(CutTest))
         self.addTest(unittest.makeSuite(RangeTest))
+        self.addTest(unittest.makeSuite(RangeFactoryTest))
+        self.addTest(unittest.makeSuite(InternPoolTest))
 
 if __name__ == "__main__":
     runner = unittest.TextTestRunner()
@@ -0,0 +1,44 @@
+""" Times RangeBucketMap.iteritems over a map of about a million segments.
+
+One value covers the whole map, so it stays in a run for the entire scan,
+while short-lived values start and end underneath it. Run from the top of
+the repository with
+
+    python benchmarks/bucket_iteritems.py [number of segments]
+"""
+import random
+import sys
+import time
+from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
+from Ranger.src.Range.Range import Range
+
+def makeMap(nSegments):
+    """ Builds a map of back to back segments, each holding the long-lived
+    value and one of a few short-lived ones """
+    rand = random.Random(0)
+    pairs = []
+    pos = 0
+    for i in range(nSegments):
+        length = rand.randint(1, 10)
+        pairs.append((Range.closedOpen(pos, pos+length), rand.randint(0, 50)))
+        pos += length
+    pairs.append((Range.closedOpen(0, pos), 'all'))
+    return RangeBucketMap.from_items(pairs)
+
+def main(nSegments):
+    start = time.time()
+    buckets = makeMap(nSegments)
+    print("Built %d segments in %.2fs" % (len(buckets), time.time()-start))
+    start = time.time()
+    nRuns = 0
+    for aRange, val in buckets.iteritems():
+        nRuns += 1
+    print("iteritems: %d runs in %.2fs" % (nRuns, time.time()-start))
+    start = time.time()
+    nRuns = 0
+    for aRange, val in buckets.iteritems(nSegments, 2*nSegments):
+        nRuns += 1
+    print("iteritems over a window: %d runs in %.2fs" % (nRuns, time.time()-start))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10**6)
@@ -0,0 +1,78 @@
+""" Measures the memory an InternPool saves on a gene annotation.
+
+Each synthetic gene has a set of exons, and each of its transcripts keeps
+most of them, so the same exon boundaries turn up in many transcripts, as
+they do in real annotations. The exons of every transcript are built as a
+list of Ranges and loaded into a RangeBucketMap of exon -> transcript, once
+without a pool and once through one. Needs tracemalloc (Python 3.4 on).
+Run from the top of the repository with
+
+    python benchmarks/intern_memory.py [number of genes]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from Ranger.src.Collections.RangeBucketMap import RangeBucketMap
+from Ranger.src.Range.InternPool import InternPool
+from Ranger.src.Range.RangeFactory import RangeFactory
+
+def makeAnnotation(nGenes):
+    """ Returns a list of (transcript name, exon bounds) """
+    rand = random.Random(0)
+    transcripts = []
+    pos = 0
+    for gene in range(nGenes):
+        pos += rand.randint(1000, 20000)
+        exons = []
+        for i in range(rand.randint(4, 15)):
+            start = pos + rand.randint(100, 5000)
+            pos = start + rand.randint(50, 500)
+            exons.append((start, pos))
+        for transcript in range(rand.randint(1, 8)):
+            kept = [exon for exon in exons if rand.random() < 0.8]
+            transcripts.append(("g%d.t%d" % (gene, transcript), kept or exons))
+    return transcripts
+
+def load(transcripts, pool):
+    """ Builds the exon ranges of every transcript and a bucket map of
+    them """
+    factory = RangeFactory(int, pool = pool)
+    exons = {}
+    buckets = RangeBucketMap(pool = pool)
+    for name, bounds in transcripts:
+        ranges = factory.from_bounds([start for start, end in bounds],
+                                     [end for start, end in bounds],
+                                     upperClosed = False)
+        exons[name] = ranges
+        for aRange in ranges:
+            buckets.put(aRange, name)
+    return exons, buckets
+
+def measure(transcripts, pool):
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    loaded = load(transcripts, pool)
+    elapsed = time.time() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, elapsed, loaded
+
+def main(nGenes):
+    transcripts = makeAnnotation(nGenes)
+    nExons = sum(len(bounds) for name, bounds in transcripts)
+    print("%d transcripts with %d exons" % (len(transcripts), nExons))
+    plainSize, plainTime, plain = measure(transcripts, None)
+    del plain
+    pool = InternPool()
+    pooledSize, pooledTime, pooled = measure(transcripts, pool)
+    print("Without a pool: %.1f MB in %.2fs" % (plainSize/1e6, plainTime))
+    print("With a pool:    %.1f MB in %.2fs (%r)" % (pooledSize/1e6,
+                                                     pooledTime, pool))
+    print("Saved %.0f%%" % (100.*(plainSize-pooledSize)/plainSize))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -30,6 +30,7 @@ bounded or unbounded. Ranger also includes tools for managing collections
     platforms = ['Linux','Mac OSX','Windows','Unix'],
     url = 'https://github.com/er432/Ranger',
     test_suite = 'Ranger.test',
+    extras_require = {'numpy' : ['numpy']},
     classifiers = [
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',